@@ -0,0 +1,47 @@
+"""resumen diario por restaurante
+
+Revision ID: 3c1e7a9b2d41
+Revises: 0a2f425d6fdc
+Create Date: 2025-07-14 10:12:03.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1e7a9b2d41'
+down_revision = '0a2f425d6fdc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resumen_diario',
+    sa.Column('restaurante_id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('total_ventas', sa.Float(), nullable=False),
+    sa.Column('total_gastos', sa.Float(), nullable=False),
+    sa.Column('num_ventas', sa.Integer(), nullable=False),
+    sa.Column('num_gastos', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['restaurante_id'], ['restaurantes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('restaurante_id', 'fecha')
+    )
+    # Rellenar con los datos existentes
+    op.execute("""
+        INSERT INTO resumen_diario (restaurante_id, fecha, total_ventas, total_gastos, num_ventas, num_gastos)
+        SELECT restaurante_id, fecha, SUM(total_ventas), SUM(total_gastos), SUM(num_ventas), SUM(num_gastos)
+        FROM (
+            SELECT restaurante_id, fecha, SUM(monto) AS total_ventas, 0 AS total_gastos,
+                   COUNT(*) AS num_ventas, 0 AS num_gastos
+            FROM ventas GROUP BY restaurante_id, fecha
+            UNION ALL
+            SELECT restaurante_id, fecha, 0, SUM(monto), 0, COUNT(*)
+            FROM gastos GROUP BY restaurante_id, fecha
+        ) AS movimientos
+        GROUP BY restaurante_id, fecha
+    """)
+
+
+def downgrade():
+    op.drop_table('resumen_diario')
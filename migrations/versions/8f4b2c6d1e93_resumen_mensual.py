@@ -0,0 +1,57 @@
+"""resumen mensual por restaurante, categoria y proveedor
+
+Revision ID: 8f4b2c6d1e93
+Revises: 3c1e7a9b2d41
+Create Date: 2025-07-16 18:40:27.502113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f4b2c6d1e93'
+down_revision = '3c1e7a9b2d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    resumen_mensual = op.create_table('resumen_mensual',
+    sa.Column('tipo', sa.Enum('venta', 'gasto', name='tipos_resumen'), nullable=False),
+    sa.Column('restaurante_id', sa.Integer(), nullable=False),
+    sa.Column('anio', sa.Integer(), nullable=False),
+    sa.Column('mes', sa.Integer(), nullable=False),
+    sa.Column('categoria', sa.String(length=100), nullable=False),
+    sa.Column('proveedor_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['restaurante_id'], ['restaurantes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('tipo', 'restaurante_id', 'anio', 'mes', 'categoria', 'proveedor_id')
+    )
+
+    # Rellenar con los datos existentes
+    ventas = sa.table('ventas', sa.column('restaurante_id'), sa.column('fecha'), sa.column('monto'))
+    gastos = sa.table('gastos', sa.column('restaurante_id'), sa.column('fecha'), sa.column('monto'),
+                      sa.column('categoria'), sa.column('proveedor_id'))
+    columnas = ['tipo', 'restaurante_id', 'anio', 'mes', 'categoria', 'proveedor_id', 'total', 'cantidad']
+
+    anio = sa.cast(sa.extract('year', ventas.c.fecha), sa.Integer)
+    mes = sa.cast(sa.extract('month', ventas.c.fecha), sa.Integer)
+    op.execute(resumen_mensual.insert().from_select(columnas, sa.select(
+        sa.literal('venta'), ventas.c.restaurante_id, anio, mes, sa.literal(''), sa.literal(0),
+        sa.func.sum(ventas.c.monto), sa.func.count()
+    ).group_by(ventas.c.restaurante_id, anio, mes)))
+
+    anio = sa.cast(sa.extract('year', gastos.c.fecha), sa.Integer)
+    mes = sa.cast(sa.extract('month', gastos.c.fecha), sa.Integer)
+    categoria = sa.func.coalesce(gastos.c.categoria, '')
+    op.execute(resumen_mensual.insert().from_select(columnas, sa.select(
+        sa.literal('gasto'), gastos.c.restaurante_id, anio, mes, categoria, gastos.c.proveedor_id,
+        sa.func.sum(gastos.c.monto), sa.func.count()
+    ).group_by(gastos.c.restaurante_id, anio, mes, categoria, gastos.c.proveedor_id)))
+
+
+def downgrade():
+    op.drop_table('resumen_mensual')
+    sa.Enum(name='tipos_resumen').drop(op.get_bind(), checkfirst=True)
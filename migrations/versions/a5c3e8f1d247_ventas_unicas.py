@@ -0,0 +1,93 @@
+"""una venta por restaurante, fecha y turno
+
+Revision ID: a5c3e8f1d247
+Revises: f2a7d9c4e806
+Create Date: 2025-08-04 11:26:37.508912
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c3e8f1d247'
+down_revision = 'f2a7d9c4e806'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+CLAVE = "restaurante_id, fecha, coalesce(turno, '')"
+
+
+def upgrade():
+    conexion = op.get_bind()
+    duplicadas = conexion.execute(sa.text(
+        f"SELECT count(*) FROM (SELECT 1 FROM ventas GROUP BY {CLAVE} HAVING count(*) > 1) d"
+    )).scalar()
+
+    if duplicadas:
+        # De cada grupo de ventas repetidas se conserva la más antigua tal
+        # cual y se borran las demás; cada venta borrada queda en el log con
+        # su importe por si hay que revisarla a mano.
+        borradas = conexion.execute(sa.text(f"""
+            SELECT v.id, v.restaurante_id, v.fecha, v.turno, v.monto, m.conservada
+            FROM ventas v JOIN (
+                SELECT min(id) AS conservada, restaurante_id, fecha, coalesce(turno, '') AS turno
+                FROM ventas GROUP BY {CLAVE} HAVING count(*) > 1
+            ) m ON m.restaurante_id = v.restaurante_id AND m.fecha = v.fecha
+               AND m.turno = coalesce(v.turno, '')
+            WHERE v.id <> m.conservada
+            ORDER BY v.id
+        """)).all()
+        for id_, restaurante_id, fecha, turno, monto, conservada in borradas:
+            log.info("ventas: borrada la venta %d (restaurante %d, %s, turno %r, %.2f €), "
+                     "repetida de la venta %d", id_, restaurante_id, fecha, turno, monto, conservada)
+        log.info("ventas: %d ventas repetidas borradas, %.2f € en total",
+                 len(borradas), sum(fila.monto for fila in borradas))
+        op.execute(f"DELETE FROM ventas WHERE id NOT IN (SELECT min(id) FROM ventas GROUP BY {CLAVE})")
+
+        # Los totales de ventas de los resúmenes se recalculan desde ventas
+        op.execute("""
+            UPDATE resumen_diario SET
+                total_ventas = coalesce((
+                    SELECT sum(v.monto) FROM ventas v
+                    WHERE v.restaurante_id = resumen_diario.restaurante_id AND v.fecha = resumen_diario.fecha
+                ), 0),
+                num_ventas = (
+                    SELECT count(*) FROM ventas v
+                    WHERE v.restaurante_id = resumen_diario.restaurante_id AND v.fecha = resumen_diario.fecha
+                )
+        """)
+        ventas = sa.table('ventas', sa.column('restaurante_id'), sa.column('fecha'), sa.column('monto'))
+        mensual = sa.table('resumen_mensual', sa.column('tipo'), sa.column('restaurante_id'),
+                           sa.column('anio'), sa.column('mes'), sa.column('total'), sa.column('cantidad'))
+        del_mes = sa.and_(
+            ventas.c.restaurante_id == mensual.c.restaurante_id,
+            sa.cast(sa.extract('year', ventas.c.fecha), sa.Integer) == mensual.c.anio,
+            sa.cast(sa.extract('month', ventas.c.fecha), sa.Integer) == mensual.c.mes
+        )
+        op.execute(mensual.update().where(mensual.c.tipo == 'venta').values(
+            total=sa.select(sa.func.coalesce(sa.func.sum(ventas.c.monto), 0)).where(del_mes).scalar_subquery(),
+            cantidad=sa.select(sa.func.count()).where(del_mes).scalar_subquery()
+        ))
+        # Los resúmenes han cambiado por debajo del ORM, sin pasar por
+        # version_datos: se sube la versión global, que entra en todas las
+        # sumas, para que los ETags y las entradas de la caché (también las
+        # de Redis) de antes de la migración dejen de valer.
+        global_ = "restaurante_id = 0 AND anio = 0 AND mes = 0"
+        op.execute(f"UPDATE version_datos SET version = version + 1 WHERE {global_}")
+        op.execute(f"""
+            INSERT INTO version_datos (restaurante_id, anio, mes, version)
+            SELECT 0, 0, 0, 1 WHERE NOT EXISTS (SELECT 1 FROM version_datos WHERE {global_})
+        """)
+
+    op.create_index('ux_ventas_restaurante_fecha_turno', 'ventas',
+                    ['restaurante_id', 'fecha', sa.text("coalesce(turno, '')")], unique=True)
+
+
+def downgrade():
+    op.drop_index('ux_ventas_restaurante_fecha_turno', table_name='ventas')
@@ -0,0 +1,44 @@
+"""indices por restaurante/proveedor y fecha
+
+Revision ID: b7d93e0f5a12
+Revises: 8f4b2c6d1e93
+Create Date: 2025-07-21 09:05:48.311520
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d93e0f5a12'
+down_revision = '8f4b2c6d1e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # En Postgres los índices incluyen el monto (y demás columnas agregadas)
+    # para que las sumas por periodo se resuelvan solo con el índice.
+    op.create_index('ix_ventas_restaurante_fecha', 'ventas', ['restaurante_id', 'fecha'],
+                    postgresql_include=['monto'])
+    op.create_index('ix_ventas_fecha', 'ventas', ['fecha'])
+    op.create_index('ix_gastos_restaurante_fecha', 'gastos', ['restaurante_id', 'fecha'],
+                    postgresql_include=['monto', 'categoria', 'proveedor_id'])
+    op.create_index('ix_gastos_proveedor_fecha', 'gastos', ['proveedor_id', 'fecha'],
+                    postgresql_include=['monto'])
+    op.create_index('ix_gastos_fecha', 'gastos', ['fecha'])
+    op.create_index('ix_facturas_restaurante_fecha', 'facturas_albaranes', ['restaurante_id', 'fecha'],
+                    postgresql_include=['monto'])
+    op.create_index('ix_facturas_proveedor_fecha', 'facturas_albaranes', ['proveedor_id', 'fecha'],
+                    postgresql_include=['monto'])
+    op.create_index('ix_resumen_diario_fecha', 'resumen_diario', ['fecha'])
+
+
+def downgrade():
+    op.drop_index('ix_resumen_diario_fecha', table_name='resumen_diario')
+    op.drop_index('ix_facturas_proveedor_fecha', table_name='facturas_albaranes')
+    op.drop_index('ix_facturas_restaurante_fecha', table_name='facturas_albaranes')
+    op.drop_index('ix_gastos_fecha', table_name='gastos')
+    op.drop_index('ix_gastos_proveedor_fecha', table_name='gastos')
+    op.drop_index('ix_gastos_restaurante_fecha', table_name='gastos')
+    op.drop_index('ix_ventas_fecha', table_name='ventas')
+    op.drop_index('ix_ventas_restaurante_fecha', table_name='ventas')
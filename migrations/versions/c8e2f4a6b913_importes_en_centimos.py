@@ -0,0 +1,137 @@
+"""importes en céntimos enteros
+
+Revision ID: c8e2f4a6b913
+Revises: a5c3e8f1d247
+Create Date: 2025-08-11 10:02:19.640371
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e2f4a6b913'
+down_revision = 'a5c3e8f1d247'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+# (tabla, columna en euros, columna en céntimos)
+IMPORTES = [
+    ('ventas', 'monto', 'monto_cent'),
+    ('gastos', 'monto', 'monto_cent'),
+    ('facturas_albaranes', 'monto', 'monto_cent'),
+    ('resumen_diario', 'total_ventas', 'total_ventas_cent'),
+    ('resumen_diario', 'total_gastos', 'total_gastos_cent'),
+    ('resumen_mensual', 'total', 'total_cent'),
+]
+
+# Índices que incluyen el importe (INCLUDE en Postgres): se rehacen con la columna nueva
+INDICES = [
+    ('ix_ventas_restaurante_fecha', 'ventas', ['restaurante_id', 'fecha'], ['{}']),
+    ('ix_gastos_restaurante_fecha', 'gastos', ['restaurante_id', 'fecha'],
+     ['{}', 'categoria', 'proveedor_id']),
+    ('ix_gastos_proveedor_fecha', 'gastos', ['proveedor_id', 'fecha'], ['{}']),
+    ('ix_facturas_restaurante_fecha', 'facturas_albaranes', ['restaurante_id', 'fecha'], ['{}']),
+    ('ix_facturas_proveedor_fecha', 'facturas_albaranes', ['proveedor_id', 'fecha'], ['{}']),
+]
+
+
+def _a_centimos(columna):
+    # Redondeo al céntimo sobre el decimal del float (12.345 -> 1235), como api/dinero.py
+    if op.get_bind().dialect.name == 'postgresql':
+        return f"CAST(round(CAST({columna} AS numeric), 2) * 100 AS BIGINT)"
+    return f"CAST(round(round({columna}, 2) * 100) AS INTEGER)"
+
+
+def _quitar_indices():
+    for nombre, tabla, _, _ in INDICES:
+        op.drop_index(nombre, table_name=tabla)
+    # El índice por expresión no sobrevive a la copia de tabla de SQLite
+    op.drop_index('ux_ventas_restaurante_fecha_turno', table_name='ventas')
+
+
+def _crear_indices(importe):
+    for nombre, tabla, columnas, incluidas in INDICES:
+        op.create_index(nombre, tabla, columnas,
+                        postgresql_include=[c.format(importe) for c in incluidas])
+    op.create_index('ux_ventas_restaurante_fecha_turno', 'ventas',
+                    ['restaurante_id', 'fecha', sa.text("coalesce(turno, '')")], unique=True)
+
+
+def _comprobar_totales(conexion):
+    """Compara, tabla por tabla, la suma antigua en euros con la nueva en céntimos."""
+    for tabla, euros, centimos in IMPORTES:
+        viejo, nuevo, filas, fraccion = conexion.execute(sa.text(f"""
+            SELECT sum({euros}), sum({centimos}), count(*),
+                   sum(CASE WHEN abs({euros} * 100 - {centimos}) > 0.001 THEN 1 ELSE 0 END)
+            FROM {tabla}
+        """)).one()
+        viejo, nuevo, fraccion = float(viejo or 0), int(nuevo or 0), int(fraccion or 0)
+        log.info("%s.%s: %d filas, %.4f € -> %.2f €%s", tabla, euros, filas, viejo, nuevo / 100,
+                 f" ({fraccion} con fracciones de céntimo redondeadas)" if fraccion else "")
+        # Cada fila se redondea como mucho medio céntimo: una diferencia mayor
+        # significa que la conversión ha perdido datos
+        if abs(viejo * 100 - nuevo) > fraccion * 0.5 + 0.01:
+            raise RuntimeError(f"Los totales de {tabla}.{euros} no coinciden: {viejo} € != {nuevo / 100} €")
+
+
+def upgrade():
+    conexion = op.get_bind()
+    _quitar_indices()
+
+    for tabla, euros, centimos in IMPORTES:
+        op.add_column(tabla, sa.Column(centimos, sa.BigInteger(), nullable=True))
+        op.execute(f"UPDATE {tabla} SET {centimos} = {_a_centimos(euros)}")
+    _comprobar_totales(conexion)
+
+    # Los resúmenes se recalculan en céntimos desde ventas y gastos, así los
+    # errores de redondeo que hubieran acumulado las sumas en float desaparecen
+    op.execute("""
+        UPDATE resumen_diario SET
+            total_ventas_cent = coalesce((SELECT sum(v.monto_cent) FROM ventas v
+                WHERE v.restaurante_id = resumen_diario.restaurante_id AND v.fecha = resumen_diario.fecha), 0),
+            total_gastos_cent = coalesce((SELECT sum(g.monto_cent) FROM gastos g
+                WHERE g.restaurante_id = resumen_diario.restaurante_id AND g.fecha = resumen_diario.fecha), 0)
+    """)
+    ventas = sa.table('ventas', sa.column('restaurante_id'), sa.column('fecha'), sa.column('monto_cent'))
+    gastos = sa.table('gastos', sa.column('restaurante_id'), sa.column('fecha'), sa.column('monto_cent'),
+                      sa.column('categoria'), sa.column('proveedor_id'))
+    mensual = sa.table('resumen_mensual', sa.column('tipo'), sa.column('restaurante_id'),
+                       sa.column('anio'), sa.column('mes'), sa.column('categoria'),
+                       sa.column('proveedor_id'), sa.column('total_cent'))
+
+    def del_mes(t):
+        return (t.c.restaurante_id == mensual.c.restaurante_id,
+                sa.cast(sa.extract('year', t.c.fecha), sa.Integer) == mensual.c.anio,
+                sa.cast(sa.extract('month', t.c.fecha), sa.Integer) == mensual.c.mes)
+
+    op.execute(mensual.update().where(mensual.c.tipo == 'venta').values(
+        total_cent=sa.func.coalesce(sa.select(sa.func.sum(ventas.c.monto_cent)).where(
+            *del_mes(ventas)).scalar_subquery(), 0)))
+    op.execute(mensual.update().where(mensual.c.tipo == 'gasto').values(
+        total_cent=sa.func.coalesce(sa.select(sa.func.sum(gastos.c.monto_cent)).where(
+            *del_mes(gastos),
+            sa.func.coalesce(gastos.c.categoria, '') == mensual.c.categoria,
+            gastos.c.proveedor_id == mensual.c.proveedor_id).scalar_subquery(), 0)))
+
+    for tabla, euros, centimos in IMPORTES:
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.alter_column(centimos, existing_type=sa.BigInteger(), nullable=False)
+            batch_op.drop_column(euros)
+    _crear_indices('monto_cent')
+
+
+def downgrade():
+    _quitar_indices()
+    for tabla, euros, centimos in IMPORTES:
+        op.add_column(tabla, sa.Column(euros, sa.Float(), nullable=True))
+        op.execute(f"UPDATE {tabla} SET {euros} = {centimos} / 100.0")
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.alter_column(euros, existing_type=sa.Float(), nullable=False)
+            batch_op.drop_column(centimos)
+    _crear_indices('monto')
@@ -0,0 +1,30 @@
+"""version de los datos por restaurante y mes
+
+Revision ID: d4e8a1c7b3f5
+Revises: b7d93e0f5a12
+Create Date: 2025-07-24 11:32:07.118904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e8a1c7b3f5'
+down_revision = 'b7d93e0f5a12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('version_datos',
+    sa.Column('restaurante_id', sa.Integer(), nullable=False),
+    sa.Column('anio', sa.Integer(), nullable=False),
+    sa.Column('mes', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('restaurante_id', 'anio', 'mes')
+    )
+
+
+def downgrade():
+    op.drop_table('version_datos')
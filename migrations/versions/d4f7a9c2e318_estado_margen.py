@@ -0,0 +1,84 @@
+"""estado de la banda de margen por restaurante y mes
+
+Revision ID: d4f7a9c2e318
+Revises: c8e2f4a6b913
+Create Date: 2025-08-18 09:41:52.118204
+
+"""
+import logging
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f7a9c2e318'
+down_revision = 'c8e2f4a6b913'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def _estado(ventas, gastos, banda):
+    # Misma regla que api/margenes.clasificar, con el porcentaje redondeado
+    # a centésimas en enteros como api/analitica.porcentaje
+    if banda is None:
+        return 'sin_objetivo'
+    if ventas <= 0:
+        return 'sin_ventas'
+    centesimas = (abs(gastos) * 20000 + ventas) // (2 * ventas)
+    porcentaje = (centesimas if gastos >= 0 else -centesimas) / 100
+    if porcentaje < banda[0]:
+        return 'por_debajo'
+    if porcentaje > banda[1]:
+        return 'por_encima'
+    return 'dentro'
+
+
+def upgrade():
+    estado_margen = op.create_table('estado_margen',
+    sa.Column('restaurante_id', sa.Integer(), nullable=False),
+    sa.Column('anio', sa.Integer(), nullable=False),
+    sa.Column('mes', sa.Integer(), nullable=False),
+    sa.Column('ventas_cent', sa.BigInteger(), nullable=False),
+    sa.Column('gastos_cent', sa.BigInteger(), nullable=False),
+    sa.Column('estado', sa.String(length=20), nullable=False),
+    sa.Column('cambiado', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['restaurante_id'], ['restaurantes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('restaurante_id', 'anio', 'mes')
+    )
+
+    # Se rellena desde resumen_diario y el estado se calcula con el último
+    # objetivo de cada restaurante
+    conexion = op.get_bind()
+    diario = sa.table('resumen_diario', sa.column('restaurante_id'), sa.column('fecha'),
+                      sa.column('total_ventas_cent'), sa.column('total_gastos_cent'))
+    anio = sa.cast(sa.extract('year', diario.c.fecha), sa.Integer)
+    mes = sa.cast(sa.extract('month', diario.c.fecha), sa.Integer)
+    meses = conexion.execute(sa.select(
+        diario.c.restaurante_id, anio, mes,
+        sa.func.sum(diario.c.total_ventas_cent), sa.func.sum(diario.c.total_gastos_cent)
+    ).group_by(diario.c.restaurante_id, anio, mes)).all()
+
+    bandas = {restaurante_id: (float(minimo), float(maximo))
+              for restaurante_id, minimo, maximo in conexion.execute(sa.text(
+                  "SELECT restaurante_id, porcentaje_min, porcentaje_max "
+                  "FROM margen_objetivo ORDER BY id"))}
+
+    ahora = datetime.utcnow()
+    filas = []
+    for restaurante_id, anio, mes, ventas, gastos in meses:
+        ventas, gastos = int(ventas or 0), int(gastos or 0)
+        estado = _estado(ventas, gastos, bandas.get(restaurante_id))
+        filas.append({'restaurante_id': restaurante_id, 'anio': anio, 'mes': mes,
+                      'ventas_cent': ventas, 'gastos_cent': gastos, 'estado': estado,
+                      'cambiado': ahora if estado != 'sin_objetivo' else None})
+    if filas:
+        op.bulk_insert(estado_margen, filas)
+    log.info("estado_margen: %d meses de restaurante evaluados", len(filas))
+
+
+def downgrade():
+    op.drop_table('estado_margen')
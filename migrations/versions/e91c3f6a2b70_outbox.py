@@ -0,0 +1,39 @@
+"""outbox de correos
+
+Revision ID: e91c3f6a2b70
+Revises: d4e8a1c7b3f5
+Create Date: 2025-07-28 10:14:52.630417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91c3f6a2b70'
+down_revision = 'd4e8a1c7b3f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('destinatario', sa.String(length=200), nullable=False),
+    sa.Column('asunto', sa.String(length=300), nullable=False),
+    sa.Column('html', sa.Text(), nullable=False),
+    sa.Column('estado', sa.Enum('pendiente', 'enviado', 'fallido', name='estados_outbox'), nullable=False),
+    sa.Column('intentos', sa.Integer(), nullable=False),
+    sa.Column('proximo_intento', sa.DateTime(), nullable=False),
+    sa.Column('ultimo_error', sa.Text(), nullable=True),
+    sa.Column('creado', sa.DateTime(), nullable=False),
+    sa.Column('enviado', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_estado_proximo', 'outbox', ['estado', 'proximo_intento'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_outbox_estado_proximo', table_name='outbox')
+    op.drop_table('outbox')
+    sa.Enum(name='estados_outbox').drop(op.get_bind(), checkfirst=True)
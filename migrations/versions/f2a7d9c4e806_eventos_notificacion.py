@@ -0,0 +1,35 @@
+"""eventos pendientes de notificar en resumen
+
+Revision ID: f2a7d9c4e806
+Revises: e91c3f6a2b70
+Create Date: 2025-07-30 17:48:03.274150
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a7d9c4e806'
+down_revision = 'e91c3f6a2b70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('eventos_notificacion',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('restaurante_id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('datos', sa.Text(), nullable=False),
+    sa.Column('creado', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['restaurante_id'], ['restaurantes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_eventos_notificacion_restaurante_creado', 'eventos_notificacion',
+                    ['restaurante_id', 'creado'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_eventos_notificacion_restaurante_creado', table_name='eventos_notificacion')
+    op.drop_table('eventos_notificacion')
@@ -0,0 +1,136 @@
+"""
+Benchmark del motor de analítica con NumPy (api/analitica.py).
+
+    $ pipenv run python scripts/bench_analitica.py [--restaurantes 40] [--anios 3]
+
+Crea una base SQLite temporal con ventas (dos turnos al día) y gastos (tres
+al día) de --restaurantes restaurantes durante --anios años, reconstruye los
+resúmenes y mide:
+- calcular_serie() en todas las combinaciones de métrica, granularidad y
+  agrupación (las diarias con el máximo de MAX_PERIODOS días).
+- analitica.matriz() y analitica.porcentaje() frente a los mismos cálculos
+  con bucles de Python sobre las mismas filas, comprobando que coinciden.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+os.environ.setdefault("JWT_SECRET_KEY", "clave-del-benchmark-de-al-menos-32-bytes")
+os.environ["CACHE_BACKEND"] = "ninguna"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import app  # noqa: E402
+from api import analitica  # noqa: E402
+from api.models import db, Restaurante, Proveedor, Usuario, Venta, Gasto  # noqa: E402
+from api.resumenes import reconstruir_resumen_diario, reconstruir_resumen_mensual  # noqa: E402
+from api.series import calcular_serie, AGRUPACIONES, METRICAS, GRANULARIDADES, MAX_PERIODOS  # noqa: E402
+
+
+def mejor_tiempo(funcion, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return resultado, mejor
+
+
+def cargar_datos(num_restaurantes, anios, desde):
+    random.seed(7)
+    db.session.execute(insert(Restaurante.__table__), [{"nombre": f"R{i:02d}"} for i in range(num_restaurantes)])
+    restaurantes = db.session.scalars(db.select(Restaurante.id)).all()
+    db.session.execute(insert(Usuario.__table__), [{"nombre": "Bench", "email": "bench@example.com",
+                                                    "password": "x", "rol": "admin"}])
+    usuario_id = db.session.scalar(db.select(Usuario.id))
+    db.session.execute(insert(Proveedor.__table__), [
+        {"nombre": f"P{j}", "categoria": ("alimentos", "bebidas", "limpieza")[j % 3], "restaurante_id": r}
+        for r in restaurantes for j in range(4)])
+    proveedores = defaultdict(list)
+    for proveedor in db.session.execute(db.select(Proveedor.id, Proveedor.restaurante_id)):
+        proveedores[proveedor.restaurante_id].append(proveedor.id)
+
+    ventas, gastos = [], []
+    for restaurante_id, dia in itertools.product(restaurantes, range(anios * 365)):
+        fecha = desde + timedelta(days=dia)
+        if random.random() < 0.05:
+            continue
+        for turno in ("comida", "cena"):
+            ventas.append({"fecha": fecha, "monto_cent": random.randint(5000, 300000), "turno": turno,
+                           "restaurante_id": restaurante_id})
+        for _ in range(3):
+            proveedor_id = random.choice(proveedores[restaurante_id])
+            gastos.append({"fecha": fecha, "monto_cent": random.randint(500, 40000),
+                           "categoria": ("alimentos", "bebidas", None)[proveedor_id % 3],
+                           "proveedor_id": proveedor_id, "usuario_id": usuario_id, "restaurante_id": restaurante_id})
+    db.session.execute(insert(Venta.__table__), ventas)
+    db.session.execute(insert(Gasto.__table__), gastos)
+    db.session.commit()
+    reconstruir_resumen_diario()
+    reconstruir_resumen_mensual()
+    print(f"{len(restaurantes)} restaurantes, {len(ventas)} ventas, {len(gastos)} gastos")
+
+
+def bench_series(desde, hasta):
+    total = 0
+    for metrica, granularidad, agrupar in itertools.product(METRICAS, GRANULARIDADES, AGRUPACIONES):
+        if metrica not in AGRUPACIONES[agrupar]:
+            continue
+        fin = min(hasta, desde + timedelta(days=MAX_PERIODOS - 1)) if granularidad == "dia" else hasta
+        _, segundos = mejor_tiempo(lambda: calcular_serie(metrica, granularidad, desde, fin, agrupar), 1)
+        total += segundos
+        print(f"  {metrica:7} {granularidad:10} {agrupar or '-':12} {segundos * 1000:8.1f} ms")
+    print(f"calcular_serie, todas las combinaciones: {total:.2f} s")
+
+
+def bench_nucleo(desde, hasta):
+    diario = analitica.Diario(desde, hasta)
+    columnas = diario.columnas
+    forma = (len(diario.restaurantes), diario.num_dias)
+
+    def matriz_python():
+        celdas = defaultdict(int)
+        for fila, dia, ventas in zip(diario._fila.tolist(), diario._dia.tolist(), columnas["ventas"].tolist()):
+            celdas[fila, dia] += ventas
+        return [[celdas.get((fila, dia), 0) for dia in range(forma[1])] for fila in range(forma[0])]
+
+    numpy_, t_numpy = mejor_tiempo(lambda: analitica.matriz(diario._fila, diario._dia, columnas["ventas"], forma))
+    python, t_python = mejor_tiempo(matriz_python)
+    print(f"matriz {forma[0]}x{forma[1]}: NumPy {t_numpy * 1000:.2f} ms, Python {t_python * 1000:.2f} ms,"
+          f" iguales: {numpy_.tolist() == python}")
+
+    gastos, ventas = columnas["gastos"].tolist(), columnas["ventas"].tolist()
+
+    def porcentaje_python():
+        return [(g * 20000 + v) // (2 * v) / 100 if v > 0 else 0 for g, v in zip(gastos, ventas)]
+
+    numpy_, t_numpy = mejor_tiempo(lambda: analitica.porcentaje(columnas["gastos"], columnas["ventas"]).tolist())
+    python, t_python = mejor_tiempo(porcentaje_python)
+    empates = sum(p != (round(g / v * 100, 2) if v > 0 else 0) for p, g, v in zip(numpy_, gastos, ventas))
+    print(f"porcentaje de {len(gastos)} filas: NumPy {t_numpy * 1000:.2f} ms, Python {t_python * 1000:.2f} ms,"
+          f" iguales: {numpy_ == python}, distintos de round() en float: {empates}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurantes", type=int, default=40)
+    parser.add_argument("--anios", type=int, default=3)
+    args = parser.parse_args()
+
+    desde = date(2022, 1, 1)
+    hasta = desde + timedelta(days=args.anios * 365 - 1)
+    with app.app_context():
+        db.create_all()
+        cargar_datos(args.restaurantes, args.anios, desde)
+        bench_series(desde, hasta)
+        bench_nucleo(desde, hasta)
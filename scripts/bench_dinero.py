@@ -0,0 +1,99 @@
+"""
+Benchmark de los importes en céntimos (api/dinero.py y la migración
+c8e2f4a6b913_importes_en_centimos).
+
+    $ pipenv run python scripts/bench_dinero.py [--valores 1000000] [--migracion 200000]
+
+- Conversión: tiempo de a_centimos() y a_euros() sobre --valores importes y
+  comprobación de que la ida y vuelta no pierde nada.
+- Sumas: la suma en float depende del orden; la de céntimos no.
+- Con --migracion N: crea una base SQLite temporal en la revisión anterior,
+  carga N ventas y N/2 gastos y facturas (más tres con fracciones de
+  céntimo) y mide upgrade y downgrade de la migración.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+
+from api.dinero import a_centimos, a_euros  # noqa: E402
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def bench_conversion(n):
+    random.seed(1)
+    importes = [round(random.uniform(0.01, 5000), 2) for _ in range(n)]
+
+    centimos, t_centimos = cronometrar(lambda: [a_centimos(x) for x in importes])
+    euros, t_euros = cronometrar(lambda: [a_euros(c) for c in centimos])
+    print(f"a_centimos: {t_centimos:.2f} s para {n} valores")
+    print(f"a_euros:    {t_euros:.2f} s para {n} valores")
+    print("Ida y vuelta sin pérdidas:", euros == importes)
+
+    desordenados = importes[:]
+    random.shuffle(desordenados)
+    print("Suma en float:   ", repr(sum(importes)), "/", repr(sum(desordenados)), "(otro orden)")
+    print("Suma en céntimos:", a_euros(sum(centimos)), "/",
+          a_euros(sum(a_centimos(x) for x in desordenados)), "(otro orden)")
+
+
+def bench_migracion(n):
+    directorio = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{directorio}/bench.db"
+    os.environ.setdefault("JWT_SECRET_KEY", "clave-del-benchmark-de-al-menos-32-bytes")
+
+    from flask_migrate import upgrade, downgrade
+    from sqlalchemy import text
+    from app import app
+    from api.models import db
+
+    migraciones = os.path.join(RAIZ, "migrations")
+    with app.app_context():
+        upgrade(directory=migraciones, revision="a5c3e8f1d247")
+
+        random.seed(3)
+        inicio = date(2024, 1, 1)
+        with db.engine.begin() as conexion:
+            conexion.execute(text("INSERT INTO restaurantes (id, nombre, activo) VALUES (1, 'R', 1), (2, 'S', 1)"))
+            conexion.execute(text("INSERT INTO usuarios (id, nombre, email, password, rol, restaurante_id) "
+                                  "VALUES (1, 'A', 'a@bench', 'x', 'admin', 1)"))
+            conexion.execute(text("INSERT INTO proveedores (id, nombre, restaurante_id) VALUES (1, 'P', 1), (2, 'Q', 2)"))
+            ventas = [{"fecha": inicio + timedelta(days=i % 700), "monto": round(random.uniform(100, 3000), 2),
+                       "turno": f"t{i}", "restaurante_id": 1 + i % 2} for i in range(n)]
+            ventas += [{"fecha": inicio, "monto": monto, "turno": turno, "restaurante_id": 1}
+                       for monto, turno in ((12.345, "x"), (2.675, "y"), (0.005, "z"))]
+            conexion.execute(text("INSERT INTO ventas (fecha, monto, turno, restaurante_id) "
+                                  "VALUES (:fecha, :monto, :turno, :restaurante_id)"), ventas)
+            otros = [{"fecha": inicio + timedelta(days=i % 700), "monto": round(random.uniform(5, 500), 2),
+                      "r": 1 + i % 2} for i in range(n // 2)]
+            conexion.execute(text("INSERT INTO gastos (fecha, monto, proveedor_id, usuario_id, restaurante_id) "
+                                  "VALUES (:fecha, :monto, :r, 1, :r)"), otros)
+            conexion.execute(text("INSERT INTO facturas_albaranes (fecha, monto, proveedor_id, restaurante_id) "
+                                  "VALUES (:fecha, :monto, :r, :r)"), otros)
+        print(f"Cargadas {len(ventas)} ventas, {len(otros)} gastos y {len(otros)} facturas")
+
+        _, t_upgrade = cronometrar(lambda: upgrade(directory=migraciones, revision="c8e2f4a6b913"))
+        _, t_downgrade = cronometrar(lambda: downgrade(directory=migraciones, revision="a5c3e8f1d247"))
+    print(f"Migración: upgrade {t_upgrade:.1f} s, downgrade {t_downgrade:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--valores", type=int, default=1_000_000)
+    parser.add_argument("--migracion", type=int, default=0, metavar="N", help="Ventas de la prueba de la migración")
+    args = parser.parse_args()
+
+    bench_conversion(args.valores)
+    if args.migracion:
+        bench_migracion(args.migracion)
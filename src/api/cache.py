@@ -0,0 +1,172 @@
+"""
+Caché de respuestas para los endpoints de resumen.
+
+Cada respuesta se guarda con una clave (endpoint + query string, rol,
+restaurante y periodo) que incluye la versión de sus datos (api/versiones.py).
+Al confirmar un alta, edición o borrado de una venta, gasto o factura sube la
+versión de su restaurante y mes, de modo que las entradas afectadas dejan de
+encontrarse y el resto sigue sirviéndose. Como la versión vive en la base de
+datos, la invalidación es la misma para todos los workers.
+
+Backends:
+  - CacheMemoria: LRU dentro del proceso (por defecto).
+  - CacheRedis: compartida entre workers de gunicorn; se activa con
+    REDIS_URL. Acepta cualquier cliente con la API de redis-py, así que en
+    pruebas se puede sustituir por un equivalente local (fakeredis).
+Con CACHE_BACKEND=ninguna la caché queda desactivada.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response
+
+from api.versiones import contexto_version
+
+
+MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", 2048))
+TTL = int(os.getenv("CACHE_TTL", 3600))
+
+
+class CacheMemoria:
+    """LRU en memoria de cada worker."""
+
+    nombre = "memoria"
+
+    def __init__(self, max_entradas=MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self.entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self.lock:
+            valor = self.entradas.get(clave)
+            if valor is not None:
+                self.entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self.lock:
+            self.entradas[clave] = valor
+            self.entradas.move_to_end(clave)
+            while len(self.entradas) > self.max_entradas:
+                self.entradas.popitem(last=False)
+
+    def contar(self, acierto):
+        with self.lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def estadisticas(self):
+        return {"aciertos": self.aciertos, "fallos": self.fallos,
+                "entradas": len(self.entradas)}
+
+
+class CacheRedis:
+    """Caché compartida entre procesos sobre Redis (o un cliente compatible)."""
+
+    nombre = "redis"
+
+    def __init__(self, cliente, prefijo="cache:", ttl=TTL):
+        self.cliente = cliente
+        self.prefijo = prefijo
+        self.ttl = ttl
+
+    def obtener(self, clave):
+        valor = self.cliente.get(self.prefijo + clave)
+        return json.loads(valor) if valor is not None else None
+
+    def guardar(self, clave, valor):
+        self.cliente.set(self.prefijo + clave, json.dumps(valor), ex=self.ttl)
+
+    def contar(self, acierto):
+        self.cliente.incr(self.prefijo + ("aciertos" if acierto else "fallos"))
+
+    def estadisticas(self):
+        aciertos, fallos = self.cliente.mget(
+            [self.prefijo + "aciertos", self.prefijo + "fallos"])
+        return {"aciertos": int(aciertos or 0), "fallos": int(fallos or 0)}
+
+
+_backend = None
+
+
+def crear_backend():
+    tipo = os.getenv("CACHE_BACKEND")
+    url = os.getenv("REDIS_URL")
+    if tipo == "ninguna":
+        return None
+    if tipo == "redis" or (tipo is None and url):
+        import redis
+        return CacheRedis(redis.Redis.from_url(url or "redis://localhost:6379/0"))
+    return CacheMemoria()
+
+
+def obtener_backend():
+    global _backend
+    if _backend is None:
+        _backend = crear_backend() or False
+    return _backend or None
+
+
+def configurar_cache(backend):
+    """Sustituye el backend (por ejemplo por una caché local en pruebas)."""
+    global _backend
+    _backend = backend if backend is not None else False
+
+
+def estadisticas():
+    backend = obtener_backend()
+    if backend is None:
+        return {"backend": None}
+    datos = backend.estadisticas()
+    total = datos["aciertos"] + datos["fallos"]
+    datos["ratio"] = round(datos["aciertos"] / total, 4) if total else 0
+    datos["backend"] = backend.nombre
+    return datos
+
+
+def cacheado(periodo="mes"):
+    """
+    Cachea las respuestas 200 del endpoint. `periodo` indica si la respuesta
+    depende de un mes ("mes") o de un año entero ("ano").
+    Va debajo de @jwt_required() y de @con_etag().
+    """
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            backend = obtener_backend()
+            if backend is None:
+                return f(*args, **kwargs)
+
+            contexto = contexto_version(periodo)
+            if contexto is None:
+                return f(*args, **kwargs)
+            clave = f"{contexto['clave']}|{contexto['version']}"
+
+            guardado = backend.obtener(clave)
+            backend.contar(guardado is not None)
+            if guardado is not None:
+                respuesta = make_response(guardado["cuerpo"], guardado["estado"])
+                respuesta.mimetype = guardado["mimetype"]
+                respuesta.headers["X-Cache"] = "HIT"
+                return respuesta
+
+            respuesta = make_response(f(*args, **kwargs))
+            if respuesta.status_code == 200 and not respuesta.is_streamed:
+                backend.guardar(clave, {
+                    "cuerpo": respuesta.get_data(as_text=True),
+                    "estado": respuesta.status_code,
+                    "mimetype": respuesta.mimetype
+                })
+            respuesta.headers["X-Cache"] = "MISS"
+            return respuesta
+        return envoltura
+    return decorador
+
@@ -0,0 +1,169 @@
+"""
+Carga masiva de gastos (cierres de mes del back-office).
+
+validar_gastos() revisa todo el lote antes de escribir nada: resuelve los
+restaurantes, usuarios y proveedores con una consulta IN por tabla y devuelve
+los errores de cada fila. insertar_gastos() inserta con INSERT de Core por
+tramos en la transacción actual y, como esas inserciones no pasan por el
+flush del ORM, actualiza a mano los resúmenes y las versiones de datos.
+La notificación al admin es un único evento por restaurante con el total
+de la carga.
+"""
+import math
+import os
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import select, insert
+
+from api.models import db, Gasto, Restaurante, Usuario, Proveedor
+from api.dinero import a_centimos, a_euros
+from api.resumenes import a_fecha, registrar_cambios
+from api.versiones import incrementar_versiones
+from api.notificaciones import notificar_eventos
+
+
+MAX_FILAS = int(os.getenv("CARGA_GASTOS_MAX", 20000))
+TRAMO = 1000
+OBLIGATORIOS = ("fecha", "monto", "proveedor_id", "restaurante_id", "usuario_id")
+LONGITUDES = {"categoria": 100, "archivo_adjunto": 200}
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ids(filas, campo):
+    return {i for i in (_entero(f.get(campo)) for f in filas if isinstance(f, dict)) if i}
+
+
+def resolver_referencias(filas):
+    """Restaurantes y usuarios existentes, y restaurante de cada proveedor (una consulta por tabla)."""
+    restaurantes = _ids(filas, "restaurante_id")
+    usuarios = _ids(filas, "usuario_id")
+    proveedores = _ids(filas, "proveedor_id")
+    return {
+        "restaurantes": set(db.session.scalars(
+            select(Restaurante.id).where(Restaurante.id.in_(restaurantes)))) if restaurantes else set(),
+        "usuarios": set(db.session.scalars(
+            select(Usuario.id).where(Usuario.id.in_(usuarios)))) if usuarios else set(),
+        "proveedores": dict(db.session.execute(
+            select(Proveedor.id, Proveedor.restaurante_id).where(Proveedor.id.in_(proveedores))
+        ).all()) if proveedores else {},
+    }
+
+
+def _validar_fila(g, referencias, sesion):
+    errores = []
+    faltan = [campo for campo in OBLIGATORIOS if g.get(campo) in (None, "")]
+    if faltan:
+        return None, [f"Faltan campos obligatorios: {', '.join(faltan)}"]
+
+    try:
+        fecha = a_fecha(g["fecha"])
+        if not isinstance(fecha, date):
+            raise ValueError
+    except (TypeError, ValueError):
+        fecha = None
+        errores.append("Fecha no válida (formato YYYY-MM-DD)")
+
+    try:
+        monto = float(g["monto"])
+        if not math.isfinite(monto) or monto <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        monto = None
+        errores.append("El monto debe ser un número mayor que 0")
+
+    restaurante_id = _entero(g["restaurante_id"])
+    usuario_id = _entero(g["usuario_id"])
+    proveedor_id = _entero(g["proveedor_id"])
+
+    if restaurante_id not in referencias["restaurantes"]:
+        errores.append("Restaurante no encontrado")
+    elif sesion.rol != "admin" and restaurante_id != sesion.restaurante_id:
+        errores.append("No puedes registrar gastos de otro restaurante")
+    if usuario_id not in referencias["usuarios"]:
+        errores.append("Usuario no encontrado")
+    if proveedor_id not in referencias["proveedores"]:
+        errores.append("Proveedor no encontrado")
+    elif referencias["proveedores"][proveedor_id] != restaurante_id:
+        errores.append("El proveedor no pertenece al restaurante")
+
+    for campo, maximo in LONGITUDES.items():
+        if g.get(campo) and len(str(g[campo])) > maximo:
+            errores.append(f"{campo} supera los {maximo} caracteres")
+
+    if errores:
+        return None, errores
+    return {
+        "fecha": fecha,
+        "monto": monto,
+        "categoria": g.get("categoria") or None,
+        "proveedor_id": proveedor_id,
+        "usuario_id": usuario_id,
+        "restaurante_id": restaurante_id,
+        "nota": g.get("nota"),
+        "archivo_adjunto": g.get("archivo_adjunto"),
+    }, []
+
+
+def validar_gastos(filas, sesion):
+    """
+    Devuelve (gastos_validos, errores). errores es una lista de
+    {"fila": índice, "errores": [...]}; si no está vacía no se inserta nada.
+    Si una fila no trae usuario_id se usa el del token.
+    """
+    filas = [dict(g, usuario_id=g.get("usuario_id") or sesion.id) if isinstance(g, dict) else g
+             for g in filas]
+    referencias = resolver_referencias(filas)
+
+    validos, errores = [], []
+    for indice, g in enumerate(filas):
+        if not isinstance(g, dict):
+            errores.append({"fila": indice, "errores": ["La fila debe ser un objeto"]})
+            continue
+        gasto, errores_fila = _validar_fila(g, referencias, sesion)
+        if errores_fila:
+            errores.append({"fila": indice, "errores": errores_fila})
+        else:
+            validos.append(gasto)
+    return validos, errores
+
+
+def _eventos_carga(gastos, usuario_id):
+    """Un evento por restaurante con el número de gastos, el total y el rango de fechas."""
+    por_restaurante = defaultdict(list)
+    for g in gastos:
+        por_restaurante[g["restaurante_id"]].append(g)
+    return [{
+        "restaurante_id": restaurante_id,
+        "usuario_id": usuario_id,
+        "num_gastos": len(lista),
+        "monto": a_euros(sum(a_centimos(g["monto"]) for g in lista)),
+        "desde": min(g["fecha"] for g in lista).isoformat(),
+        "hasta": max(g["fecha"] for g in lista).isoformat(),
+    } for restaurante_id, lista in por_restaurante.items()]
+
+
+def insertar_gastos(gastos, usuario_id=None):
+    """
+    Inserta gastos ya validados con INSERT de Core en la transacción actual,
+    actualiza resúmenes y versiones y notifica la carga. No hace commit.
+    """
+    if not gastos:
+        return 0
+    tabla = Gasto.__table__
+    filas = [{**{k: v for k, v in g.items() if k != "monto"}, "monto_cent": a_centimos(g["monto"])}
+             for g in gastos]
+    for inicio in range(0, len(filas), TRAMO):
+        db.session.execute(insert(tabla), filas[inicio:inicio + TRAMO])
+
+    registrar_cambios(db.session, [(Gasto, g, 1) for g in filas])
+    incrementar_versiones(db.session, {(g["restaurante_id"], g["fecha"].year, g["fecha"].month)
+                                       for g in gastos})
+    notificar_eventos("carga_gastos", _eventos_carga(gastos, usuario_id))
+    return len(gastos)
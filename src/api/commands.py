@@ -1,6 +1,11 @@
 
 import click
 from api.models import db, Usuario
+from api.resumenes import reconstruir_resumen_diario, reconstruir_resumen_mensual, reconstruir_estado_margen
+from api.exportar_parquet import exportar_parquet, DESTINO_POR_DEFECTO
+from api.outbox import procesar_outbox, TAMANO_LOTE
+from api.mail.servicio import crear_transporte
+from api.importar_csv import importar_csv, PERFILES
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -31,4 +36,77 @@ def setup_commands(app):
 
     @app.cli.command("insert-test-data")
     def insert_test_data():
-        pass
\ No newline at end of file
+        pass
+
+    """
+    Recalcula las tablas de resumen a partir de ventas y gastos.
+    Se ejecuta con: $ flask reconstruir-resumenes
+    """
+    @app.cli.command("reconstruir-resumenes")
+    def reconstruir_resumenes():
+        print("Reconstruyendo resumen diario...")
+        filas = reconstruir_resumen_diario()
+        print("Resumen diario listo:", filas, "filas")
+        print("Reconstruyendo resumen mensual...")
+        filas = reconstruir_resumen_mensual()
+        print("Resumen mensual listo:", filas, "filas")
+        print("Reconstruyendo estado de márgenes...")
+        filas = reconstruir_estado_margen()
+        print("Estado de márgenes listo:", filas, "filas")
+
+    """
+    Guarda una instantánea en Parquet de ventas, gastos, facturas y proveedores
+    para análisis offline. Solo reescribe las particiones que han cambiado.
+    Se ejecuta con: $ flask exportar-parquet --destino ./parquet [--completo]
+    """
+    @app.cli.command("exportar-parquet")
+    @click.option("--destino", default=DESTINO_POR_DEFECTO)
+    @click.option("--completo", is_flag=True, help="Reescribe todas las particiones")
+    def exportar_parquet_cmd(destino, completo):
+        print("Exportando a Parquet en", destino)
+        resumen = exportar_parquet(destino, completo)
+        print("Particiones escritas:", len(resumen["escritas"]))
+        print("Particiones sin cambios:", resumen["omitidas"])
+        print("Particiones borradas:", len(resumen["borradas"]))
+        print("Filas escritas:", resumen["filas"])
+
+    """
+    Worker que entrega los correos del outbox por lotes, con reintentos.
+    Se ejecuta con: $ flask enviar-correos [--una-vez] [--intervalo 10] [--lote 50]
+    """
+    @app.cli.command("enviar-correos")
+    @click.option("--una-vez", is_flag=True, help="Vacía la cola y termina")
+    @click.option("--intervalo", default=10, help="Segundos de espera con la cola vacía")
+    @click.option("--lote", default=TAMANO_LOTE, help="Correos por lote")
+    @click.option("--transporte", default=None, help="sendgrid, smtp o falso (por defecto EMAIL_TRANSPORTE)")
+    def enviar_correos(una_vez, intervalo, lote, transporte):
+        transporte = crear_transporte(transporte)
+        print("Entregando correos del outbox con", transporte.nombre)
+        total = procesar_outbox(transporte, una_vez, intervalo, lote)
+        print("Enviados:", total["enviados"], "Reintentos:", total["reintentos"], "Fallidos:", total["fallidos"])
+
+    """
+    Importa ventas o gastos de un CSV del TPV o de la contabilidad.
+    Se ejecuta con: $ flask importar-csv ventas.csv --perfil tpv --restaurante-id 1 --usuario-id 1
+    El perfil puede ser uno de PERFILES o un JSON con el mapeo de columnas.
+    """
+    @app.cli.command("importar-csv")
+    @click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--perfil", default="ventas", help=f"{', '.join(PERFILES)} o JSON propio")
+    @click.option("--restaurante-id", type=int, required=True)
+    @click.option("--usuario-id", type=int, required=True, help="Usuario al que se asignan los gastos")
+    def importar_csv_cmd(archivo, perfil, restaurante_id, usuario_id):
+        print("Importando", archivo, "con el perfil", perfil)
+        try:
+            with open(archivo, "rb") as binario:
+                resumen = importar_csv(binario, perfil, restaurante_id, usuario_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        print("Filas insertadas:", resumen["insertadas"])
+        print("Filas rechazadas:", resumen["rechazadas"])
+        for rechazo in resumen["rechazos"]:
+            print(f"  Línea {rechazo['linea']}:", "; ".join(rechazo["errores"]))
+        if resumen["rechazos_truncados"]:
+            print("  ...")
@@ -0,0 +1,131 @@
+"""
+Bloques del dashboard de un restaurante (encargado y chef) para un mes.
+
+Todos los bloques salen de, como mucho, dos consultas compartidas:
+las filas de resumen_diario del mes (cargadas en arrays de NumPy con
+api/analitica.py, que calcula los porcentajes de todos los días de una vez)
+y los gastos del mes agrupados por día, proveedor y categoría. Los endpoints individuales y el endpoint
+agrupado /dashboard/restaurante usan estas mismas funciones. Los totales
+se suman en céntimos y se pasan a euros solo al construir la respuesta.
+"""
+from calendar import monthrange
+from datetime import date
+
+import numpy as np
+from sqlalchemy import func
+
+from api.models import db, Gasto, Proveedor
+from api.utils import filtro_mes
+from api.dinero import a_euros
+from api import analitica
+
+
+SECCIONES = ("resumen_diario", "ventas_diarias", "porcentaje", "categorias", "resumen_mensual")
+SECCIONES_DIARIAS = {"resumen_diario", "ventas_diarias", "porcentaje"}
+SECCIONES_GASTOS = {"categorias", "resumen_mensual"}
+
+
+def _gastos_mes(restaurante_id, mes, ano):
+    return db.session.query(
+        Gasto.fecha,
+        Proveedor.nombre.label("proveedor"),
+        Gasto.categoria,
+        func.sum(Gasto.monto_cent).label("total_cent")
+    ).join(Proveedor).filter(
+        Gasto.restaurante_id == restaurante_id,
+        *filtro_mes(Gasto.fecha, mes, ano)
+    ).group_by(Gasto.fecha, Proveedor.nombre, Gasto.categoria).all()
+
+
+class MesDiario:
+    """Series diarias del mes de un restaurante (céntimos), sin huecos."""
+
+    def __init__(self, restaurante_id, mes, ano):
+        diario = analitica.Diario(date(ano, mes, 1), date(ano, mes, monthrange(ano, mes)[1]),
+                                  restaurante_id)
+        self.ventas = diario.serie("ventas", restaurante_id)
+        self.gastos = diario.serie("gastos", restaurante_id)
+        self.num_ventas = diario.serie("num_ventas", restaurante_id)
+        self.num_gastos = diario.serie("num_gastos", restaurante_id)
+
+
+def bloque_resumen_diario(datos):
+    dias = np.flatnonzero((datos.num_ventas > 0) | (datos.num_gastos > 0))
+    ventas, gastos = datos.ventas[dias], datos.gastos[dias]
+    return [{"dia": dia, "ventas": v, "gastos": g, "porcentaje": p}
+            for dia, v, g, p in zip((dias + 1).tolist(), analitica.a_euros(ventas),
+                                    analitica.a_euros(gastos),
+                                    analitica.porcentaje(gastos, ventas).tolist())]
+
+
+def bloque_ventas_diarias(datos):
+    dias = np.flatnonzero(datos.num_ventas > 0)
+    return [{"dia": dia, "monto": monto}
+            for dia, monto in zip((dias + 1).tolist(), analitica.a_euros(datos.ventas[dias]))]
+
+
+def bloque_porcentaje(datos):
+    total_ventas = int(datos.ventas.sum())
+    total_gastos = int(datos.gastos.sum())
+    return {
+        "gastos": a_euros(total_gastos),
+        "ventas": a_euros(total_ventas),
+        "porcentaje": float(analitica.porcentaje(total_gastos, total_ventas))
+    }
+
+
+def bloque_categorias(gastos):
+    totales = {}
+    for g in gastos:
+        totales[g.categoria] = totales.get(g.categoria, 0) + g.total_cent
+    return [{"categoria": categoria or "Sin categoría", "total": a_euros(total)}
+            for categoria, total in sorted(totales.items(), key=lambda t: t[0] or "")]
+
+
+def bloque_resumen_mensual(gastos):
+    resumen = {}
+    totales = {}
+    dias = set()
+
+    for g in gastos:
+        dia = g.fecha.day
+        dias.add(dia)
+        datos = resumen.setdefault(g.proveedor, {})
+        datos[dia] = datos.get(dia, 0) + g.total_cent
+        totales[g.proveedor] = totales.get(g.proveedor, 0) + g.total_cent
+
+    return {
+        "proveedores": sorted(resumen),
+        "dias": sorted(dias),
+        "datos": {proveedor: {dia: a_euros(c) for dia, c in datos.items()}
+                  for proveedor, datos in resumen.items()},
+        "totales": {proveedor: a_euros(c) for proveedor, c in totales.items()}
+    }
+
+
+def dashboard_restaurante(restaurante_id, mes, ano, secciones=SECCIONES):
+    """Devuelve {seccion: bloque} para las secciones pedidas."""
+    secciones = set(secciones)
+    desconocidas = secciones - set(SECCIONES)
+    if desconocidas:
+        raise ValueError(f"Secciones no válidas: {', '.join(sorted(desconocidas))}")
+
+    resultado = {}
+
+    if secciones & SECCIONES_DIARIAS:
+        datos = MesDiario(restaurante_id, mes, ano)
+        if "resumen_diario" in secciones:
+            resultado["resumen_diario"] = bloque_resumen_diario(datos)
+        if "ventas_diarias" in secciones:
+            resultado["ventas_diarias"] = bloque_ventas_diarias(datos)
+        if "porcentaje" in secciones:
+            resultado["porcentaje"] = bloque_porcentaje(datos)
+
+    if secciones & SECCIONES_GASTOS:
+        gastos = _gastos_mes(restaurante_id, mes, ano)
+        if "categorias" in secciones:
+            resultado["categorias"] = bloque_categorias(gastos)
+        if "resumen_mensual" in secciones:
+            resultado["resumen_mensual"] = bloque_resumen_mensual(gastos)
+
+    return resultado
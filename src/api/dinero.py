@@ -0,0 +1,60 @@
+"""
+Importes en céntimos.
+
+Los montos de ventas, gastos y facturas, y los totales de las tablas de
+resumen, se guardan como enteros en céntimos: las sumas son exactas y dan el
+mismo resultado sea cual sea el orden en que se acumulan. La API sigue
+hablando en euros: los modelos exponen `monto` (o `total_*`) en euros sobre
+la columna `*_cent`, y las consultas agregan con suma_euros(), que suma los
+enteros y divide por 100 una sola vez al final.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import Float, cast, func
+from sqlalchemy.ext.hybrid import hybrid_property
+
+
+def a_centimos(valor):
+    """Euros (número o texto) a céntimos enteros, redondeando al céntimo más cercano."""
+    if valor is None:
+        return None
+    if isinstance(valor, float):
+        # repr() da el decimal más corto que representa el float (0.285 y no 0.28499999...)
+        valor = repr(valor)
+    return int((Decimal(str(valor)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def a_euros(centimos):
+    """Céntimos a euros (float con como mucho dos decimales)."""
+    if centimos is None:
+        return None
+    return int(centimos) / 100
+
+
+def euros(expresion):
+    """Expresión SQL en céntimos convertida a euros (float)."""
+    return cast(expresion, Float) / 100
+
+
+def suma_euros(columna):
+    """SUM exacta de una columna en céntimos, devuelta en euros."""
+    return euros(func.sum(columna))
+
+
+def en_euros(columna, nombre):
+    """
+    Atributo `nombre` en euros sobre la columna entera `columna` (céntimos):
+    se lee y se asigna en euros, y en consultas equivale a columna / 100.
+    """
+    def leer(self):
+        return a_euros(getattr(self, columna))
+
+    def asignar(self, valor):
+        setattr(self, columna, a_centimos(valor))
+
+    def expresion(cls):
+        return euros(getattr(cls, columna)).label(nombre)
+
+    for funcion in (leer, asignar, expresion):
+        funcion.__name__ = nombre
+    return hybrid_property(leer, asignar, expr=expresion)
@@ -0,0 +1,145 @@
+"""
+Exportación de ventas, gastos y facturas a CSV (en streaming) o XLSX
+(escrito en modo write_only), leyendo la base de datos por lotes.
+Los nombres de restaurante, proveedor y usuario se resuelven con joins.
+
+El XLSX no se puede emitir en streaming: el libro entero se escribe antes de
+empezar la respuesta. Para no pasar del timeout del worker se limita a
+XLSX_MAX_FILAS filas; las exportaciones más grandes se piden en CSV.
+"""
+import csv
+import io
+import os
+import tempfile
+
+from flask import Response, send_file, stream_with_context
+from sqlalchemy import select, func
+
+from api.models import db, Venta, Gasto, FacturaAlbaran, Proveedor, Usuario, Restaurante
+from api.paginacion import aplicar_filtros
+
+
+TAMANO_LOTE = 2000
+# Unas 50.000 filas tardan ~6 s en escribirse con openpyxl
+XLSX_MAX_FILAS = int(os.getenv("XLSX_MAX_FILAS", 50000))
+FORMATOS = ("csv", "xlsx")
+
+
+def _consulta_ventas():
+    return Venta, select(
+        Venta.id, Venta.fecha, Restaurante.nombre.label("restaurante"),
+        Venta.turno, Venta.monto
+    ).join(Restaurante, Restaurante.id == Venta.restaurante_id)
+
+
+def _consulta_gastos():
+    return Gasto, select(
+        Gasto.id, Gasto.fecha, Restaurante.nombre.label("restaurante"),
+        Proveedor.nombre.label("proveedor"), Gasto.categoria,
+        Usuario.nombre.label("usuario"), Gasto.monto, Gasto.nota
+    ).join(
+        Restaurante, Restaurante.id == Gasto.restaurante_id
+    ).join(
+        Proveedor, Proveedor.id == Gasto.proveedor_id
+    ).join(
+        Usuario, Usuario.id == Gasto.usuario_id
+    )
+
+
+def _consulta_facturas():
+    return FacturaAlbaran, select(
+        FacturaAlbaran.id, FacturaAlbaran.fecha, Restaurante.nombre.label("restaurante"),
+        Proveedor.nombre.label("proveedor"), FacturaAlbaran.monto,
+        FacturaAlbaran.descripcion
+    ).join(
+        Restaurante, Restaurante.id == FacturaAlbaran.restaurante_id
+    ).join(
+        Proveedor, Proveedor.id == FacturaAlbaran.proveedor_id
+    )
+
+
+CONSULTAS = {
+    "ventas": _consulta_ventas,
+    "gastos": _consulta_gastos,
+    "facturas": _consulta_facturas,
+}
+
+
+def _consulta(tipo, args):
+    modelo, consulta = CONSULTAS[tipo]()
+    return modelo, aplicar_filtros(consulta, modelo, args)
+
+
+def contar_filas(tipo, args):
+    _, consulta = _consulta(tipo, args)
+    return db.session.scalar(select(func.count()).select_from(consulta.subquery()))
+
+
+def _filas(tipo, args):
+    """Devuelve (cabecera, iterador de filas) leyendo en lotes de TAMANO_LOTE."""
+    modelo, consulta = _consulta(tipo, args)
+    consulta = consulta.order_by(modelo.fecha, modelo.id)
+    resultado = db.session.execute(consulta.execution_options(yield_per=TAMANO_LOTE))
+    return list(resultado.keys()), resultado
+
+
+def exportar_csv(tipo, args):
+    cabecera, filas = _filas(tipo, args)
+
+    def generar():
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        # BOM para que Excel reconozca el UTF-8 (acentos, €)
+        buffer.write("\ufeff")
+        escritor.writerow(cabecera)
+        for lote in filas.partitions():
+            escritor.writerows(lote)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={tipo}.csv"}
+    )
+
+
+def exportar_xlsx(tipo, args):
+    from openpyxl import Workbook
+
+    total = contar_filas(tipo, args)
+    if total > XLSX_MAX_FILAS:
+        raise ValueError(
+            f"La exportación tiene {total} filas y en XLSX el máximo es {XLSX_MAX_FILAS}: "
+            "usa formato=csv, que se descarga en streaming, o acota las fechas")
+
+    cabecera, filas = _filas(tipo, args)
+
+    # En modo write_only openpyxl vuelca las filas a disco según se añaden
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(tipo)
+    hoja.append(cabecera)
+    for fila in filas:
+        hoja.append(list(fila))
+
+    archivo = tempfile.TemporaryFile(suffix=".xlsx")
+    libro.save(archivo)
+    archivo.seek(0)
+    return send_file(
+        archivo,
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name=f"{tipo}.xlsx"
+    )
+
+
+def exportar(tipo, formato, args):
+    if tipo not in CONSULTAS:
+        raise ValueError(f"No se puede exportar '{tipo}'")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no válido: {formato}")
+    if formato == "xlsx":
+        return exportar_xlsx(tipo, args)
+    return exportar_csv(tipo, args)
@@ -0,0 +1,186 @@
+"""
+Instantánea en Parquet de las tablas transaccionales para análisis offline.
+
+Ventas, gastos y facturas se particionan por restaurante y año
+(<destino>/<tabla>/restaurante_id=<id>/anio=<año>/part-0.parquet) y los
+proveedores van en un único archivo. Cada partición guarda en _manifest.json
+una huella (número de filas y suma de un hash de cada fila con todas las
+columnas exportadas) y en las siguientes ejecuciones solo se reescriben las
+particiones cuya huella ha cambiado: cualquier cambio en una columna, una
+fecha movida dentro del año o dos filas que intercambian importes cambian la
+huella. En Postgres la huella se calcula en la base de datos; en el resto de
+motores se leen las filas y se calcula en Python.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import date
+
+from sqlalchemy import select, func, extract, cast, tuple_, Integer, BigInteger, Text
+from sqlalchemy.dialects.postgresql import BIT
+
+from api.models import db, Venta, Gasto, FacturaAlbaran, Proveedor
+
+
+DESTINO_POR_DEFECTO = os.getenv("PARQUET_DIR", "parquet")
+TAMANO_LOTE = 5000
+# Bits del md5 de cada fila que entran en la suma de la huella
+BITS_HUELLA = 60
+
+# columna -> tipo arrow ("dict" = string con codificación de diccionario).
+# restaurante_id y anio no van dentro del archivo: salen de la ruta de la partición.
+TABLAS = {
+    "ventas": (Venta, {
+        "id": "int64", "fecha": "date", "monto": "float64", "turno": "dict",
+    }),
+    "gastos": (Gasto, {
+        "id": "int64", "fecha": "date", "monto": "float64",
+        "categoria": "dict", "proveedor_id": "int32", "usuario_id": "int32",
+        "nota": "string", "archivo_adjunto": "string",
+    }),
+    "facturas_albaranes": (FacturaAlbaran, {
+        "id": "int64", "fecha": "date", "monto": "float64",
+        "proveedor_id": "int32", "descripcion": "string",
+    }),
+}
+
+COLUMNAS_PROVEEDORES = {
+    "id": "int32", "nombre": "string", "categoria": "dict", "direccion": "string",
+    "telefono": "string", "email_contacto": "string", "observaciones": "string",
+    "restaurante_id": "int32",
+}
+
+
+def _esquema(columnas):
+    import pyarrow as pa
+
+    tipos = {
+        "int64": pa.int64(), "int32": pa.int32(), "float64": pa.float64(),
+        "date": pa.date32(), "string": pa.string(),
+        "dict": pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema([(nombre, tipos[tipo]) for nombre, tipo in columnas.items()])
+
+
+def _escribir(ruta, columnas, filas):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    datos = {nombre: [] for nombre in columnas}
+    for fila in filas:
+        for nombre in columnas:
+            datos[nombre].append(getattr(fila, nombre))
+
+    tabla = pa.Table.from_pydict(datos, schema=_esquema(columnas))
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = ruta + ".tmp"
+    pq.write_table(tabla, temporal, compression="snappy")
+    os.replace(temporal, ruta)
+    return tabla.num_rows
+
+
+def _columnas_huella(modelo, columnas):
+    # El importe entra en céntimos, tal como está guardado
+    return [getattr(modelo, "monto_cent" if c == "monto" else c) for c in columnas]
+
+
+def _clave(restaurante_id, anio):
+    return f"restaurante_id={restaurante_id}/anio={int(anio)}"
+
+
+def _hash_fila(texto):
+    return int(hashlib.md5(texto.encode()).hexdigest()[:BITS_HUELLA // 4], 16)
+
+
+def _huellas_postgres(modelo, columnas):
+    """Huellas calculadas en Postgres en una sola consulta agrupada."""
+    anio = cast(extract("year", modelo.fecha), Integer)
+    # El texto de la fila como registro distingue NULL de ''
+    texto = cast(tuple_(*_columnas_huella(modelo, columnas)), Text)
+    hash_fila = cast(cast(
+        func.concat("x", func.substr(func.md5(texto), 1, BITS_HUELLA // 4)), BIT(BITS_HUELLA)), BigInteger)
+    filas = db.session.execute(
+        select(modelo.restaurante_id, anio, func.count(), func.sum(hash_fila))
+        .group_by(modelo.restaurante_id, anio)
+    ).all()
+    return {_clave(rid, a): [n, int(suma or 0)] for rid, a, n, suma in filas}
+
+
+def _huellas_python(modelo, columnas):
+    """Huellas recorriendo las filas, para motores sin md5 (SQLite)."""
+    huellas = {}
+    consulta = select(modelo.restaurante_id, modelo.fecha, *_columnas_huella(modelo, columnas))
+    for fila in db.session.execute(consulta.execution_options(yield_per=TAMANO_LOTE)):
+        huella = huellas.setdefault(_clave(fila[0], fila[1].year), [0, 0])
+        huella[0] += 1
+        huella[1] += _hash_fila(repr(tuple(fila[2:])))
+    return huellas
+
+
+def _huellas(modelo, columnas):
+    """Huella [filas, suma de hashes] de cada partición (restaurante_id, anio)."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        return _huellas_postgres(modelo, columnas)
+    return _huellas_python(modelo, columnas)
+
+
+def _leer_manifiesto(destino):
+    ruta = os.path.join(destino, "_manifest.json")
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta) as f:
+        return json.load(f)
+
+
+def _guardar_manifiesto(destino, manifiesto):
+    ruta = os.path.join(destino, "_manifest.json")
+    with open(ruta + ".tmp", "w") as f:
+        json.dump(manifiesto, f, indent=2, sort_keys=True)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def exportar_parquet(destino=DESTINO_POR_DEFECTO, completo=False):
+    """
+    Escribe (o actualiza) la instantánea en `destino`.
+    Con completo=True reescribe todas las particiones.
+    Devuelve un resumen con las particiones escritas, omitidas y borradas.
+    """
+    os.makedirs(destino, exist_ok=True)
+    manifiesto = {} if completo else _leer_manifiesto(destino)
+    resumen = {"escritas": [], "omitidas": 0, "borradas": [], "filas": 0}
+
+    for nombre, (modelo, columnas) in TABLAS.items():
+        anteriores = manifiesto.get(nombre, {})
+        actuales = _huellas(modelo, columnas)
+
+        for particion, huella in actuales.items():
+            if anteriores.get(particion) == huella:
+                resumen["omitidas"] += 1
+                continue
+
+            rid, anio = (int(p.split("=")[1]) for p in particion.split("/"))
+            consulta = select(*(getattr(modelo, c) for c in columnas)).where(
+                modelo.restaurante_id == rid,
+                modelo.fecha >= date(anio, 1, 1),
+                modelo.fecha < date(anio + 1, 1, 1)
+            ).order_by(modelo.fecha, modelo.id).execution_options(yield_per=TAMANO_LOTE)
+
+            ruta = os.path.join(destino, nombre, particion, "part-0.parquet")
+            resumen["filas"] += _escribir(ruta, columnas, db.session.execute(consulta))
+            resumen["escritas"].append(f"{nombre}/{particion}")
+
+        for particion in set(anteriores) - set(actuales):
+            shutil.rmtree(os.path.join(destino, nombre, particion), ignore_errors=True)
+            resumen["borradas"].append(f"{nombre}/{particion}")
+
+        manifiesto[nombre] = actuales
+
+    # Los proveedores son pocos: se reescriben siempre
+    proveedores = db.session.execute(
+        select(*(getattr(Proveedor, c) for c in COLUMNAS_PROVEEDORES)).order_by(Proveedor.id))
+    _escribir(os.path.join(destino, "proveedores", "part-0.parquet"),
+              COLUMNAS_PROVEEDORES, proveedores)
+
+    _guardar_manifiesto(destino, manifiesto)
+    return resumen
@@ -0,0 +1,306 @@
+"""
+Importación de ventas y gastos desde CSV (exportaciones del TPV y de la
+contabilidad).
+
+El archivo se lee en streaming y se procesa por lotes de TAMANO_LOTE filas,
+así que la memoria no depende del tamaño del archivo. Cada perfil dice qué
+columna del CSV corresponde a cada campo, el separador, el separador decimal
+y el formato de fecha. Por cada lote los proveedores se resuelven por nombre
+o email en una sola consulta, y los gastos válidos se escriben con COPY en
+Postgres (INSERT por lotes en otros motores). Las ventas pasan por
+guardar_ventas() (api/ventas.py), que inserta con ON CONFLICT DO NOTHING: una
+venta que ya existe, que se repite en el archivo o que otra petición guarda a
+la vez se rechaza como su línea, sin abortar la importación. Las filas
+rechazadas se devuelven con su número de línea y el motivo.
+
+Todo el archivo se importa en una transacción: los resúmenes y las versiones
+de datos se actualizan a mano (las inserciones no pasan por el ORM) y el
+admin recibe un único aviso por carga. Los importes se convierten del texto
+del CSV a céntimos sin pasar por float.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select, insert, func, or_
+
+from api.models import db, Gasto, Proveedor
+from api.dinero import a_centimos, a_euros
+from api.resumenes import registrar_cambios
+from api.versiones import incrementar_versiones
+from api.notificaciones import notificar_eventos
+from api.ventas import guardar_ventas
+
+
+TAMANO_LOTE = 2000
+MAX_RECHAZOS = 500      # rechazos que se devuelven con detalle; el resto solo se cuentan
+
+PERFILES = {
+    "ventas": {
+        "tipo": "ventas",
+        "columnas": {"fecha": "fecha", "monto": "monto", "turno": "turno"},
+        "separador": ",", "decimal": ".", "formato_fecha": "%Y-%m-%d", "codificacion": "utf-8-sig",
+    },
+    "gastos": {
+        "tipo": "gastos",
+        "columnas": {"fecha": "fecha", "monto": "monto", "proveedor": "proveedor",
+                     "categoria": "categoria", "nota": "nota"},
+        "separador": ",", "decimal": ".", "formato_fecha": "%Y-%m-%d", "codificacion": "utf-8-sig",
+    },
+    # Cierre diario típico de un TPV: "Fecha;Turno;Total" con 1.234,56
+    "tpv": {
+        "tipo": "ventas",
+        "columnas": {"fecha": "Fecha", "monto": "Total", "turno": "Turno"},
+        "separador": ";", "decimal": ",", "formato_fecha": "%d/%m/%Y", "codificacion": "utf-8-sig",
+    },
+    # Libro de facturas recibidas de la contabilidad
+    "contabilidad": {
+        "tipo": "gastos",
+        "columnas": {"fecha": "Fecha", "monto": "Total", "proveedor": "Proveedor",
+                     "categoria": "Cuenta", "nota": "Concepto"},
+        "separador": ";", "decimal": ",", "formato_fecha": "%d/%m/%Y", "codificacion": "latin-1",
+    },
+}
+
+OBLIGATORIOS = {
+    "ventas": ("fecha", "monto"),
+    "gastos": ("fecha", "monto", "proveedor"),
+}
+
+
+def cargar_perfil(perfil):
+    """
+    Acepta el nombre de un perfil de PERFILES o un dict/JSON propio con
+    "tipo" y "columnas" (lo que no indique se toma del perfil de su tipo).
+    """
+    if isinstance(perfil, str) and perfil.strip().startswith("{"):
+        try:
+            perfil = json.loads(perfil)
+        except ValueError:
+            raise ValueError("El perfil no es un JSON válido")
+    if isinstance(perfil, str):
+        if perfil not in PERFILES:
+            raise ValueError(f"Perfil no válido. Opciones: {', '.join(PERFILES)}")
+        return PERFILES[perfil]
+    if not isinstance(perfil, dict) or perfil.get("tipo") not in ("ventas", "gastos"):
+        raise ValueError("El perfil debe indicar tipo 'ventas' o 'gastos'")
+    return dict(PERFILES[perfil["tipo"]], **perfil)
+
+
+def _monto(valor, decimal):
+    """Texto del CSV a céntimos."""
+    valor = valor.replace("€", "").replace(" ", "").strip()
+    if decimal == ",":
+        valor = valor.replace(".", "").replace(",", ".")
+    try:
+        centimos = a_centimos(valor)
+    except ArithmeticError:
+        raise ValueError(valor)
+    if centimos <= 0:
+        raise ValueError(valor)
+    return centimos
+
+
+def _campo(fila, indices, campo):
+    indice = indices.get(campo)
+    if indice is None or indice >= len(fila):
+        return None
+    return fila[indice].strip() or None
+
+
+def _parsear(fila, indices, perfil):
+    """Convierte una fila del CSV en (valores, errores)."""
+    tipo = perfil["tipo"]
+    valores = {campo: _campo(fila, indices, campo) for campo in indices}
+    faltan = [campo for campo in OBLIGATORIOS[tipo] if not valores.get(campo)]
+    if faltan:
+        return None, [f"Faltan campos obligatorios: {', '.join(faltan)}"]
+
+    errores = []
+    try:
+        valores["fecha"] = datetime.strptime(valores["fecha"], perfil["formato_fecha"]).date()
+    except ValueError:
+        errores.append(f"Fecha no válida (formato {perfil['formato_fecha']})")
+    try:
+        valores["monto_cent"] = _monto(valores.pop("monto"), perfil["decimal"])
+    except ValueError:
+        errores.append("El monto debe ser un número mayor que 0")
+    for campo, maximo in (("turno", 50), ("categoria", 100)):
+        if valores.get(campo) and len(valores[campo]) > maximo:
+            errores.append(f"{campo} supera los {maximo} caracteres")
+    return (None, errores) if errores else (valores, [])
+
+
+def resolver_proveedores(restaurante_id, referencias):
+    """{texto en minúsculas: proveedor_id} buscando por nombre o email, en una consulta."""
+    claves = {r.lower() for r in referencias}
+    if not claves:
+        return {}
+    filas = db.session.execute(
+        select(Proveedor.id, Proveedor.nombre, Proveedor.email_contacto).where(
+            Proveedor.restaurante_id == restaurante_id,
+            or_(func.lower(Proveedor.nombre).in_(claves),
+                func.lower(Proveedor.email_contacto).in_(claves))
+        ).order_by(Proveedor.id)
+    ).all()
+    encontrados = {}
+    for id_, nombre, email in filas:
+        for texto in (nombre, email):
+            if texto and texto.lower() in claves:
+                encontrados.setdefault(texto.lower(), id_)
+    return encontrados
+
+
+def copiar_filas(tabla, columnas, filas):
+    """
+    Escribe las filas con COPY ... FROM STDIN en Postgres (en la transacción
+    de la sesión) y con INSERT de Core en el resto de motores.
+    """
+    if not filas:
+        return
+    conexion = db.session.connection()
+    if conexion.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for fila in filas:
+            escritor.writerow(["" if fila[c] is None else fila[c] for c in columnas])
+        buffer.seek(0)
+        cursor = conexion.connection.cursor()
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(
+                f"COPY {tabla.name} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.close()
+            return
+        cursor.close()
+    db.session.execute(insert(tabla), [{c: fila[c] for c in columnas} for fila in filas])
+
+
+class Importacion:
+    """Estado de una importación: contadores, rechazos y totales para el aviso."""
+
+    def __init__(self, perfil, restaurante_id, usuario_id):
+        self.perfil = perfil
+        self.tipo = perfil["tipo"]
+        self.restaurante_id = restaurante_id
+        self.usuario_id = usuario_id
+        self.insertadas = 0
+        self.rechazadas = 0
+        self.rechazos = []
+        self.total = 0
+        self.desde = self.hasta = None
+
+    def rechazar(self, linea, errores):
+        self.rechazadas += 1
+        if len(self.rechazos) < MAX_RECHAZOS:
+            self.rechazos.append({"linea": linea, "errores": errores})
+
+    def _insertar_gastos(self, lote):
+        proveedores = resolver_proveedores(
+            self.restaurante_id, {valores["proveedor"] for _, valores in lote})
+        filas = []
+        for linea, valores in lote:
+            proveedor_id = proveedores.get(valores["proveedor"].lower())
+            if proveedor_id is None:
+                self.rechazar(linea, [f"Proveedor no encontrado: {valores['proveedor']}"])
+                continue
+            filas.append({
+                "fecha": valores["fecha"], "monto_cent": valores["monto_cent"],
+                "categoria": valores.get("categoria"), "nota": valores.get("nota"),
+                "proveedor_id": proveedor_id, "usuario_id": self.usuario_id,
+                "restaurante_id": self.restaurante_id,
+            })
+        if filas:
+            copiar_filas(Gasto.__table__, ("fecha", "monto_cent", "categoria", "nota",
+                                           "proveedor_id", "usuario_id", "restaurante_id"), filas)
+            registrar_cambios(db.session, [(Gasto, fila, 1) for fila in filas])
+            incrementar_versiones(db.session, {(self.restaurante_id, f["fecha"].year, f["fecha"].month)
+                                               for f in filas})
+        return filas
+
+    def _insertar_ventas(self, lote):
+        # guardar_ventas() ya actualiza resúmenes y versiones de las creadas
+        filas = [dict(valores, turno=valores.get("turno"), restaurante_id=self.restaurante_id)
+                 for _, valores in lote]
+        estados = guardar_ventas(filas, "rechazar")
+        guardadas = []
+        for (linea, _), fila, estado in zip(lote, filas, estados):
+            if estado == "duplicada":
+                self.rechazar(linea, ["Ya existe una venta para este día y turno"])
+                continue
+            guardadas.append(fila)
+        return guardadas
+
+    def procesar_lote(self, lote):
+        """lote: lista de (número de línea, valores ya parseados)."""
+        if not lote:
+            return
+        filas = self._insertar_gastos(lote) if self.tipo == "gastos" else self._insertar_ventas(lote)
+        if not filas:
+            return
+
+        self.insertadas += len(filas)
+        self.total += sum(f["monto_cent"] for f in filas)
+        fechas = [f["fecha"] for f in filas]
+        self.desde = min([self.desde, *fechas] if self.desde else fechas)
+        self.hasta = max([self.hasta, *fechas] if self.hasta else fechas)
+
+    def notificar(self):
+        if not self.insertadas:
+            return
+        notificar_eventos(f"carga_{self.tipo}", [{
+            "restaurante_id": self.restaurante_id,
+            "usuario_id": self.usuario_id,
+            f"num_{self.tipo}": self.insertadas,
+            "monto": a_euros(self.total),
+            "desde": self.desde.isoformat(),
+            "hasta": self.hasta.isoformat(),
+        }])
+
+    def resumen(self):
+        return {
+            "tipo": self.tipo,
+            "insertadas": self.insertadas,
+            "rechazadas": self.rechazadas,
+            "rechazos": sorted(self.rechazos, key=lambda r: r["linea"]),
+            "rechazos_truncados": self.rechazadas > len(self.rechazos),
+        }
+
+
+def importar_csv(binario, perfil, restaurante_id, usuario_id, tamano_lote=TAMANO_LOTE):
+    """
+    Importa un CSV (archivo binario abierto) con el perfil indicado en la
+    transacción actual y devuelve el resumen. No hace commit.
+    """
+    perfil = cargar_perfil(perfil)
+    archivo = io.TextIOWrapper(binario, encoding=perfil["codificacion"], newline="")
+    lector = csv.reader(archivo, delimiter=perfil["separador"])
+    cabecera = next(lector, None)
+    if not cabecera:
+        raise ValueError("El archivo está vacío")
+
+    posiciones = {nombre.strip().lower(): i for i, nombre in enumerate(cabecera)}
+    indices = {campo: posiciones[columna.strip().lower()]
+               for campo, columna in perfil["columnas"].items()
+               if columna and columna.strip().lower() in posiciones}
+    faltan = [perfil["columnas"][c] for c in OBLIGATORIOS[perfil["tipo"]] if c not in indices]
+    if faltan:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltan)}")
+
+    importacion = Importacion(perfil, restaurante_id, usuario_id)
+    lote = []
+    for fila in lector:
+        linea = lector.line_num
+        if not any(celda.strip() for celda in fila):
+            continue
+        valores, errores = _parsear(fila, indices, perfil)
+        if errores:
+            importacion.rechazar(linea, errores)
+            continue
+        lote.append((linea, valores))
+        if len(lote) >= tamano_lote:
+            importacion.procesar_lote(lote)
+            lote = []
+    importacion.procesar_lote(lote)
+    importacion.notificar()
+    return importacion.resumen()
@@ -1,5 +1,4 @@
-from flask_mail import Message
-from api.mail.mail_config import mail
+from api.mail.servicio import enviar_email
 
 import os
 
@@ -11,17 +10,15 @@ def send_reset_email(address, token):
         print("FRONTEND URL:", frontend_url)
         print("RESET URL:", reset_url)
         print("Enviando a:", address)
-        # Crear el mensaje
-        msg = Message(
-            subject="Restablece tu contraseña",
-            recipients=[address],
-            html=f"""
+        # Enviar el mensaje con el servicio de correo compartido
+        enviar_email(
+            address,
+            "Restablece tu contraseña",
+            f"""
                 <p>Haz clic aquí para restablecer tu contraseña:</p>
                 <a href="{reset_url}">Restablecer contraseña</a>
             """
         )
-        # Enviar el mensaje
-        mail.send(msg)
         print("Correo enviado correctamente a:", address)
         return {'success': True, 'msg': 'Correo enviado con éxito'}
     except Exception as e:
@@ -0,0 +1,241 @@
+"""
+Servicio de correo único de la API.
+
+Todos los envíos (outbox, restablecer contraseña...) pasan por el transporte
+configurado en EMAIL_TRANSPORTE, que se crea una vez por proceso y reutiliza
+sus conexiones:
+  - sendgrid: API HTTP de SendGrid con una sesión keep-alive, así que solo
+    el primer envío paga el handshake TLS.
+  - smtp: pool de conexiones SMTP (MAIL_SERVER, MAIL_PORT, EMAIL_USER,
+    EMAIL_PASS, los mismos datos que usa Flask-Mail); cada conexión envía
+    muchos mensajes y se comprueba con NOOP si lleva tiempo parada.
+  - falso: guarda los correos en memoria, para pruebas y desarrollo.
+
+Sin EMAIL_TRANSPORTE se usa sendgrid si hay SENDGRID_API_KEY y smtp si no,
+así las instalaciones que solo tienen EMAIL_USER/EMAIL_PASS siguen enviando
+los correos de restablecer contraseña por SMTP como antes.
+
+enviar_email() lanza una excepción si el envío falla; enviar_emails()
+manda una lista de correos reutilizando la conexión y devuelve, para cada
+uno, None o el error.
+"""
+import abc
+import os
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import parseaddr
+
+
+def remitente_por_defecto():
+    return os.getenv("EMAIL_SENDER", "OhMyChef <ohmychefapp@gmail.com>")
+
+
+class Transporte(abc.ABC):
+    nombre = None
+
+    @abc.abstractmethod
+    def enviar(self, destinatario, asunto, html):
+        """Envía un correo; lanza una excepción si falla."""
+
+    def enviar_varios(self, mensajes):
+        """mensajes: lista de (destinatario, asunto, html). Devuelve un error (o None) por mensaje."""
+        errores = []
+        for destinatario, asunto, html in mensajes:
+            try:
+                self.enviar(destinatario, asunto, html)
+                errores.append(None)
+            except Exception as e:
+                errores.append(e)
+        return errores
+
+
+class TransporteSendGrid(Transporte):
+    nombre = "sendgrid"
+    URL = "https://api.sendgrid.com/v3/mail/send"
+
+    def __init__(self, api_key=None, remitente=None, timeout=10):
+        import requests
+
+        nombre, email = parseaddr(remitente or remitente_por_defecto())
+        self.remitente = {"email": email, "name": nombre} if nombre else {"email": email}
+        self.timeout = timeout
+        # La sesión mantiene abiertas las conexiones HTTPS entre envíos
+        self.sesion = requests.Session()
+        self.sesion.headers.update({
+            "Authorization": f"Bearer {api_key or os.getenv('SENDGRID_API_KEY')}",
+            "Content-Type": "application/json",
+        })
+
+    def enviar(self, destinatario, asunto, html):
+        respuesta = self.sesion.post(self.URL, timeout=self.timeout, json={
+            "personalizations": [{"to": [{"email": destinatario}]}],
+            "from": self.remitente,
+            "subject": asunto,
+            "content": [{"type": "text/html", "value": html}],
+        })
+        if respuesta.status_code >= 300:
+            raise RuntimeError(f"SendGrid respondió {respuesta.status_code}: {respuesta.text[:200]}")
+
+
+class TransporteSMTP(Transporte):
+    nombre = "smtp"
+
+    def __init__(self, servidor=None, puerto=None, usuario=None, password=None,
+                 tls=True, remitente=None, max_conexiones=4, max_inactividad=30):
+        self.servidor = servidor or os.getenv("MAIL_SERVER", "smtp.gmail.com")
+        self.puerto = int(puerto or os.getenv("MAIL_PORT", 587))
+        self.usuario = usuario if usuario is not None else os.getenv("EMAIL_USER")
+        self.password = password if password is not None else os.getenv("EMAIL_PASS")
+        self.tls = tls
+        self.remitente = remitente or self.usuario or remitente_por_defecto()
+        self.max_inactividad = max_inactividad
+        self.libres = queue.LifoQueue()
+        self.plazas = threading.BoundedSemaphore(max_conexiones)
+
+    def _conectar(self):
+        smtp = smtplib.SMTP(self.servidor, self.puerto, timeout=15)
+        if self.tls:
+            smtp.starttls()
+        if self.usuario:
+            smtp.login(self.usuario, self.password)
+        return smtp
+
+    @staticmethod
+    def _cerrar(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _viva(self, smtp, ultimo_uso):
+        if time.monotonic() - ultimo_uso < self.max_inactividad:
+            return True
+        try:
+            return smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión del pool (o abre una nueva) y la devuelve al terminar."""
+        with self.plazas:
+            smtp = None
+            while smtp is None and not self.libres.empty():
+                smtp, ultimo_uso = self.libres.get_nowait()
+                if not self._viva(smtp, ultimo_uso):
+                    self._cerrar(smtp)
+                    smtp = None
+            if smtp is None:
+                smtp = self._conectar()
+            try:
+                yield smtp
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self._cerrar(smtp)
+                raise
+            except Exception:
+                self.libres.put((smtp, time.monotonic()))
+                raise
+            else:
+                self.libres.put((smtp, time.monotonic()))
+
+    def _mensaje(self, destinatario, asunto, html):
+        mensaje = EmailMessage()
+        mensaje["From"] = self.remitente
+        mensaje["To"] = destinatario
+        mensaje["Subject"] = asunto
+        mensaje.set_content(html, subtype="html")
+        return mensaje
+
+    def enviar(self, destinatario, asunto, html):
+        with self.conexion() as smtp:
+            smtp.send_message(self._mensaje(destinatario, asunto, html))
+
+    def enviar_varios(self, mensajes):
+        """Envía todo el lote por una misma conexión; si se corta, sigue con otra."""
+        errores = []
+        pendientes = list(mensajes)
+        while pendientes:
+            try:
+                with self.conexion() as smtp:
+                    while pendientes:
+                        destinatario, asunto, html = pendientes[0]
+                        try:
+                            smtp.send_message(self._mensaje(destinatario, asunto, html))
+                            errores.append(None)
+                        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                            # El servidor rechaza este correo, pero la conexión sigue viva
+                            errores.append(e)
+                        pendientes.pop(0)
+            except Exception as e:
+                # No se pudo conectar o se cortó la conexión: falla el mensaje en curso
+                errores.append(e)
+                pendientes.pop(0)
+        return errores
+
+    def cerrar(self):
+        while not self.libres.empty():
+            self._cerrar(self.libres.get_nowait()[0])
+
+
+class TransporteFalso(Transporte):
+    """Guarda los correos en `enviados`; con `fallar=True` simula un proveedor caído."""
+
+    nombre = "falso"
+
+    def __init__(self, fallar=False):
+        self.fallar = fallar
+        self.enviados = []
+
+    def enviar(self, destinatario, asunto, html):
+        if self.fallar:
+            raise RuntimeError("Fallo simulado del transporte")
+        self.enviados.append({"destinatario": destinatario, "asunto": asunto, "html": html})
+
+
+TRANSPORTES = {
+    "sendgrid": TransporteSendGrid,
+    "smtp": TransporteSMTP,
+    "falso": TransporteFalso,
+}
+
+_servicio = None
+_lock = threading.Lock()
+
+
+def transporte_por_defecto():
+    return os.getenv("EMAIL_TRANSPORTE") or ("sendgrid" if os.getenv("SENDGRID_API_KEY") else "smtp")
+
+
+def crear_transporte(nombre=None):
+    nombre = nombre or transporte_por_defecto()
+    if nombre not in TRANSPORTES:
+        raise ValueError(f"Transporte de correo no válido: {nombre}")
+    return TRANSPORTES[nombre]()
+
+
+def servicio_correo():
+    """Transporte compartido del proceso (se crea en el primer envío)."""
+    global _servicio
+    with _lock:
+        if _servicio is None:
+            _servicio = crear_transporte()
+        return _servicio
+
+
+def configurar_servicio(transporte):
+    """Sustituye el transporte compartido (por ejemplo por TransporteFalso en pruebas)."""
+    global _servicio
+    with _lock:
+        _servicio = transporte
+
+
+def enviar_email(destinatario, asunto, html):
+    servicio_correo().enviar(destinatario, asunto, html)
+
+
+def enviar_emails(mensajes):
+    return servicio_correo().enviar_varios(mensajes)
@@ -0,0 +1,210 @@
+"""
+Cumplimiento de la banda de margen (MargenObjetivo) por restaurante y mes.
+
+estado_margen guarda las ventas y los gastos acumulados del mes de cada
+restaurante y su estado frente a la banda porcentaje_min–porcentaje_max de
+gasto sobre ventas:
+  - sin_objetivo: el restaurante no tiene MargenObjetivo.
+  - sin_ventas: todavía no hay ventas en el mes.
+  - por_debajo, dentro o por_encima de la banda.
+
+Las tablas de resumen (api/resumenes.py) suman a estado_margen el importe de
+cada venta o gasto que se escribe y llaman a evaluar_margenes() solo con los
+restaurantes y meses tocados: cada escritura revisa una fila, sin recorrer
+transacciones. Cuando un restaurante sale de la banda o vuelve a ella se
+avisa al admin con un evento "margen". Si cambia el objetivo de un
+restaurante se reevalúan sus meses (sin aviso). estado_margenes() devuelve
+el estado de todos los restaurantes leyendo una fila por restaurante.
+"""
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select, update, bindparam, and_, tuple_
+
+from api.models import db, EstadoMargen, MargenObjetivo, Restaurante
+from api.notificaciones import notificar_eventos
+from api import analitica
+
+
+ESTADOS = ("sin_objetivo", "sin_ventas", "por_debajo", "dentro", "por_encima")
+FUERA = ("por_debajo", "por_encima")
+EN_BANDA = ("por_debajo", "dentro", "por_encima")
+
+
+def porcentaje_gasto(ventas_cent, gastos_cent):
+    """Gasto sobre ventas en %, con dos decimales (como en los dashboards)."""
+    return float(analitica.porcentaje(gastos_cent, ventas_cent))
+
+
+def clasificar(ventas_cent, gastos_cent, banda):
+    if banda is None:
+        return "sin_objetivo"
+    if ventas_cent <= 0:
+        return "sin_ventas"
+    porcentaje = porcentaje_gasto(ventas_cent, gastos_cent)
+    minimo, maximo = banda
+    if porcentaje < minimo:
+        return "por_debajo"
+    if porcentaje > maximo:
+        return "por_encima"
+    return "dentro"
+
+
+def _ultimos(session, restaurantes=None, excluir=()):
+    """{restaurante_id: (id, (mínimo, máximo))} del último objetivo de cada restaurante."""
+    consulta = select(
+        MargenObjetivo.id, MargenObjetivo.restaurante_id,
+        MargenObjetivo.porcentaje_min, MargenObjetivo.porcentaje_max
+    ).order_by(MargenObjetivo.id)
+    if restaurantes is not None:
+        consulta = consulta.where(MargenObjetivo.restaurante_id.in_(list(restaurantes)))
+    if excluir:
+        consulta = consulta.where(MargenObjetivo.id.notin_(list(excluir)))
+    return {restaurante_id: (id_, (float(minimo), float(maximo)))
+            for id_, restaurante_id, minimo, maximo in session.execute(consulta)}
+
+
+def bandas(session, restaurantes=None):
+    """
+    {restaurante_id: (mínimo, máximo)}. Si un restaurante tiene varios
+    objetivos vale el último creado.
+    """
+    return {restaurante_id: banda
+            for restaurante_id, (_, banda) in _ultimos(session, restaurantes).items()}
+
+
+def evaluar_margenes(session, claves, objetivos=None, notificar=True):
+    """
+    Recalcula el estado de las filas (restaurante_id, año, mes) indicadas,
+    guarda los que cambian y avisa de las entradas y salidas de la banda.
+    Devuelve los eventos generados.
+    """
+    if not claves:
+        return []
+    tabla = EstadoMargen.__table__
+    filas = session.execute(
+        select(tabla.c.restaurante_id, tabla.c.anio, tabla.c.mes,
+               tabla.c.ventas_cent, tabla.c.gastos_cent, tabla.c.estado)
+        .where(tuple_(tabla.c.restaurante_id, tabla.c.anio, tabla.c.mes).in_(list(claves)))
+    ).all()
+    if objetivos is None:
+        objetivos = bandas(session, {fila.restaurante_id for fila in filas})
+
+    ahora = datetime.utcnow()
+    cambios, eventos = [], []
+    for fila in filas:
+        banda = objetivos.get(fila.restaurante_id)
+        estado = clasificar(fila.ventas_cent, fila.gastos_cent, banda)
+        if estado == fila.estado:
+            continue
+        cambios.append({"_restaurante": fila.restaurante_id, "_anio": fila.anio,
+                        "_mes": fila.mes, "_estado": estado, "_cambiado": ahora})
+        # Solo se avisa al cruzar la banda: la primera evaluación del mes
+        # (la fila recién creada o sin ventas) no es un cruce
+        if notificar and fila.estado in EN_BANDA and (estado in FUERA or fila.estado in FUERA):
+            eventos.append({
+                "restaurante_id": fila.restaurante_id,
+                "anio": fila.anio,
+                "mes": fila.mes,
+                "estado": estado,
+                "anterior": fila.estado,
+                "porcentaje": porcentaje_gasto(fila.ventas_cent, fila.gastos_cent),
+                "porcentaje_min": banda[0],
+                "porcentaje_max": banda[1],
+            })
+
+    if cambios:
+        session.execute(
+            update(tabla).where(
+                tabla.c.restaurante_id == bindparam("_restaurante"),
+                tabla.c.anio == bindparam("_anio"),
+                tabla.c.mes == bindparam("_mes")
+            ).values(estado=bindparam("_estado"), cambiado=bindparam("_cambiado")),
+            cambios)
+    if eventos:
+        notificar_eventos("margen", eventos)
+    return eventos
+
+
+def reevaluar_restaurantes(session, restaurantes, objetivos=None):
+    """Reevalúa todos los meses de los restaurantes indicados (sin avisos)."""
+    claves = session.execute(
+        select(EstadoMargen.restaurante_id, EstadoMargen.anio, EstadoMargen.mes)
+        .where(EstadoMargen.restaurante_id.in_(list(restaurantes)))
+    ).all()
+    if objetivos is None:
+        objetivos = bandas(session, restaurantes)
+    return evaluar_margenes(session, [tuple(c) for c in claves], objetivos, notificar=False)
+
+
+@event.listens_for(db.session, "before_flush")
+def _reevaluar_por_objetivo(session, flush_context, instances):
+    pendientes = [obj for obj in list(session.new) + list(session.dirty)
+                  if isinstance(obj, MargenObjetivo)]
+    borrados = [obj for obj in session.deleted if isinstance(obj, MargenObjetivo)]
+    if not pendientes and not borrados:
+        return
+
+    afectados = set()
+    for obj in pendientes + borrados:
+        afectados.add(int(obj.restaurante_id))
+        anterior = inspect(obj).attrs.restaurante_id.history.deleted
+        if anterior and anterior[0] is not None:
+            afectados.add(int(anterior[0]))
+
+    # Objetivos ya guardados (sin los que se editan o borran) más los de la
+    # sesión con sus valores nuevos; de cada restaurante vale el último, y
+    # los que aún no tienen id son los más recientes.
+    excluir = [obj.id for obj in pendientes + borrados if obj.id is not None]
+    ultimos = _ultimos(session, afectados, excluir)
+    for obj in pendientes:
+        orden = obj.id if obj.id is not None else float("inf")
+        restaurante_id = int(obj.restaurante_id)
+        if restaurante_id not in ultimos or ultimos[restaurante_id][0] <= orden:
+            ultimos[restaurante_id] = (orden, (float(obj.porcentaje_min), float(obj.porcentaje_max)))
+    objetivos = {restaurante_id: banda for restaurante_id, (_, banda) in ultimos.items()}
+
+    reevaluar_restaurantes(session, afectados, objetivos)
+
+
+def estado_margenes(anio, mes, restaurante_id=None):
+    """
+    Estado de los restaurantes activos (o de uno) en el mes: una fila de
+    estado_margen por restaurante, sin tocar ventas ni gastos.
+    """
+    consulta = select(
+        Restaurante.id, Restaurante.nombre,
+        EstadoMargen.ventas_cent, EstadoMargen.gastos_cent, EstadoMargen.cambiado
+    ).outerjoin(EstadoMargen, and_(
+        EstadoMargen.restaurante_id == Restaurante.id,
+        EstadoMargen.anio == anio,
+        EstadoMargen.mes == mes
+    )).order_by(Restaurante.id)
+    if restaurante_id:
+        consulta = consulta.where(Restaurante.id == restaurante_id)
+    else:
+        consulta = consulta.where(Restaurante.activo == True)
+    filas = db.session.execute(consulta).all()
+    objetivos = bandas(db.session, [restaurante_id] if restaurante_id else None)
+
+    restaurantes = []
+    for id_, nombre, ventas, gastos, cambiado in filas:
+        ventas, gastos = int(ventas or 0), int(gastos or 0)
+        banda = objetivos.get(id_)
+        restaurantes.append({
+            "restaurante_id": id_,
+            "nombre": nombre,
+            "estado": clasificar(ventas, gastos, banda),
+            "ventas": ventas / 100,
+            "gastos": gastos / 100,
+            "porcentaje": porcentaje_gasto(ventas, gastos),
+            "porcentaje_min": banda[0] if banda else None,
+            "porcentaje_max": banda[1] if banda else None,
+            "desde": cambiado.isoformat() if cambiado else None,
+        })
+    return {
+        "anio": anio,
+        "mes": mes,
+        "totales": dict(Counter(r["estado"] for r in restaurantes)),
+        "restaurantes": restaurantes,
+    }
@@ -1,5 +1,9 @@
+from datetime import datetime
+
 from flask_sqlalchemy import SQLAlchemy
 
+from api.dinero import en_euros
+
 db = SQLAlchemy()
 
 
@@ -56,9 +60,19 @@ class Usuario(db.Model):
 
 class Venta(db.Model):
     __tablename__ = 'ventas'
+    __table_args__ = (
+        db.Index('ix_ventas_restaurante_fecha', 'restaurante_id', 'fecha',
+                 postgresql_include=['monto_cent']),
+        db.Index('ix_ventas_fecha', 'fecha'),
+        # Una sola venta por restaurante, día y turno (sin turno cuenta como '')
+        db.Index('ux_ventas_restaurante_fecha_turno', 'restaurante_id', 'fecha',
+                 db.text("coalesce(turno, '')"), unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.Date, nullable=False)
-    monto = db.Column(db.Float, nullable=False)
+    # Importe en céntimos; `monto` lo expone en euros (ver api/dinero.py)
+    monto_cent = db.Column(db.BigInteger, nullable=False)
+    monto = en_euros('monto_cent', 'monto')
     turno = db.Column(db.String(50))
     restaurante_id = db.Column(db.Integer, db.ForeignKey(
         'restaurantes.id'), nullable=False)
@@ -100,9 +114,17 @@ class Proveedor(db.Model):
 
 class Gasto(db.Model):
     __tablename__ = 'gastos'
+    __table_args__ = (
+        db.Index('ix_gastos_restaurante_fecha', 'restaurante_id', 'fecha',
+                 postgresql_include=['monto_cent', 'categoria', 'proveedor_id']),
+        db.Index('ix_gastos_proveedor_fecha', 'proveedor_id', 'fecha',
+                 postgresql_include=['monto_cent']),
+        db.Index('ix_gastos_fecha', 'fecha'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.Date, nullable=False)
-    monto = db.Column(db.Float, nullable=False)
+    monto_cent = db.Column(db.BigInteger, nullable=False)
+    monto = en_euros('monto_cent', 'monto')
     categoria = db.Column(db.String(100))
     proveedor_id = db.Column(db.Integer, db.ForeignKey(
         'proveedores.id'), nullable=False)
@@ -131,13 +153,20 @@ class Gasto(db.Model):
 
 class FacturaAlbaran(db.Model):
     __tablename__ = 'facturas_albaranes'
+    __table_args__ = (
+        db.Index('ix_facturas_restaurante_fecha', 'restaurante_id', 'fecha',
+                 postgresql_include=['monto_cent']),
+        db.Index('ix_facturas_proveedor_fecha', 'proveedor_id', 'fecha',
+                 postgresql_include=['monto_cent']),
+    )
     id = db.Column(db.Integer, primary_key=True)
     proveedor_id = db.Column(db.Integer, db.ForeignKey(
         'proveedores.id'), nullable=False)
     restaurante_id = db.Column(db.Integer, db.ForeignKey(
         'restaurantes.id'), nullable=False)
     fecha = db.Column(db.Date, nullable=False)
-    monto = db.Column(db.Float, nullable=False)
+    monto_cent = db.Column(db.BigInteger, nullable=False)
+    monto = en_euros('monto_cent', 'monto')
     descripcion = db.Column(db.Text)
     proveedor = db.relationship('Proveedor', backref='facturas')
     restaurante = db.relationship('Restaurante', backref='facturas')
@@ -169,3 +198,161 @@ class MargenObjetivo(db.Model):
             "porcentaje_min": self.porcentaje_min,
             "porcentaje_max": self.porcentaje_max,
         }
+
+
+class ResumenDiario(db.Model):
+    __tablename__ = 'resumen_diario'
+    __table_args__ = (
+        db.Index('ix_resumen_diario_fecha', 'fecha'),
+    )
+    restaurante_id = db.Column(db.Integer, db.ForeignKey(
+        'restaurantes.id', ondelete='CASCADE'), primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    total_ventas_cent = db.Column(db.BigInteger, nullable=False, default=0)
+    total_gastos_cent = db.Column(db.BigInteger, nullable=False, default=0)
+    total_ventas = en_euros('total_ventas_cent', 'total_ventas')
+    total_gastos = en_euros('total_gastos_cent', 'total_gastos')
+    num_ventas = db.Column(db.Integer, nullable=False, default=0)
+    num_gastos = db.Column(db.Integer, nullable=False, default=0)
+
+    def serialize(self):
+        return {
+            "restaurante_id": self.restaurante_id,
+            "fecha": self.fecha.isoformat(),
+            "total_ventas": self.total_ventas,
+            "total_gastos": self.total_gastos,
+            "num_ventas": self.num_ventas,
+            "num_gastos": self.num_gastos,
+        }
+
+
+class ResumenMensual(db.Model):
+    # Las ventas no tienen categoría ni proveedor: se guardan con '' y 0
+    # para que formen parte de la clave primaria.
+    __tablename__ = 'resumen_mensual'
+    tipo = db.Column(db.Enum('venta', 'gasto', name='tipos_resumen'), primary_key=True)
+    restaurante_id = db.Column(db.Integer, db.ForeignKey(
+        'restaurantes.id', ondelete='CASCADE'), primary_key=True)
+    anio = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    categoria = db.Column(db.String(100), primary_key=True, default='')
+    proveedor_id = db.Column(db.Integer, primary_key=True, default=0)
+    total_cent = db.Column(db.BigInteger, nullable=False, default=0)
+    total = en_euros('total_cent', 'total')
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+
+    def serialize(self):
+        return {
+            "tipo": self.tipo,
+            "restaurante_id": self.restaurante_id,
+            "anio": self.anio,
+            "mes": self.mes,
+            "categoria": self.categoria or None,
+            "proveedor_id": self.proveedor_id or None,
+            "total": self.total,
+            "cantidad": self.cantidad,
+        }
+
+
+class EstadoMargen(db.Model):
+    # Ventas y gastos acumulados del mes por restaurante y su posición frente
+    # a la banda de MargenObjetivo; se actualiza con cada venta o gasto
+    # (ver api/margenes.py).
+    __tablename__ = 'estado_margen'
+    restaurante_id = db.Column(db.Integer, db.ForeignKey(
+        'restaurantes.id', ondelete='CASCADE'), primary_key=True)
+    anio = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    ventas_cent = db.Column(db.BigInteger, nullable=False, default=0)
+    gastos_cent = db.Column(db.BigInteger, nullable=False, default=0)
+    ventas = en_euros('ventas_cent', 'ventas')
+    gastos = en_euros('gastos_cent', 'gastos')
+    estado = db.Column(db.String(20), nullable=False, default='sin_objetivo')
+    cambiado = db.Column(db.DateTime, nullable=True)
+
+    def serialize(self):
+        return {
+            "restaurante_id": self.restaurante_id,
+            "anio": self.anio,
+            "mes": self.mes,
+            "ventas": self.ventas,
+            "gastos": self.gastos,
+            "estado": self.estado,
+            "cambiado": self.cambiado.isoformat() if self.cambiado else None,
+        }
+
+
+class VersionDatos(db.Model):
+    # Contador de cambios por restaurante y mes. La fila (0, 0, 0) cuenta los
+    # cambios que afectan a todo (restaurantes y proveedores). Sin clave
+    # foránea a propósito: las versiones nunca bajan, aunque se borre el restaurante.
+    __tablename__ = 'version_datos'
+    restaurante_id = db.Column(db.Integer, primary_key=True)
+    anio = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def serialize(self):
+        return {
+            "restaurante_id": self.restaurante_id,
+            "anio": self.anio,
+            "mes": self.mes,
+            "version": self.version,
+        }
+
+
+class Outbox(db.Model):
+    # Correos pendientes de enviar. Se escriben en la misma transacción que
+    # el alta que los provoca y los envía el worker `flask enviar-correos`.
+    __tablename__ = 'outbox'
+    __table_args__ = (
+        db.Index('ix_outbox_estado_proximo', 'estado', 'proximo_intento'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    destinatario = db.Column(db.String(200), nullable=False)
+    asunto = db.Column(db.String(300), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    estado = db.Column(db.Enum('pendiente', 'enviado', 'fallido', name='estados_outbox'),
+                       nullable=False, default='pendiente')
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    proximo_intento = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ultimo_error = db.Column(db.Text)
+    creado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    enviado = db.Column(db.DateTime)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "destinatario": self.destinatario,
+            "asunto": self.asunto,
+            "estado": self.estado,
+            "intentos": self.intentos,
+            "proximo_intento": self.proximo_intento.isoformat() if self.proximo_intento else None,
+            "ultimo_error": self.ultimo_error,
+            "creado": self.creado.isoformat() if self.creado else None,
+            "enviado": self.enviado.isoformat() if self.enviado else None,
+        }
+
+
+class EventoNotificacion(db.Model):
+    # Altas pendientes de notificar al admin en modo resumen: el worker las
+    # agrupa por restaurante en un único correo (ver api/notificaciones.py).
+    __tablename__ = 'eventos_notificacion'
+    __table_args__ = (
+        db.Index('ix_eventos_notificacion_restaurante_creado', 'restaurante_id', 'creado'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    restaurante_id = db.Column(db.Integer, db.ForeignKey(
+        'restaurantes.id', ondelete='CASCADE'), nullable=False)
+    tipo = db.Column(db.String(20), nullable=False)
+    datos = db.Column(db.Text, nullable=False)
+    creado = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "restaurante_id": self.restaurante_id,
+            "tipo": self.tipo,
+            "datos": self.datos,
+            "creado": self.creado.isoformat() if self.creado else None,
+        }
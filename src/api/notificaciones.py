@@ -0,0 +1,248 @@
+"""
+Notificaciones al admin de las ventas y gastos registrados.
+
+Los endpoints llaman a notificar_eventos() con los datos en bruto (ids,
+monto, fecha...) y los nombres de restaurante, usuario y proveedor se
+resuelven después en una sola consulta para todos los eventos. Las cargas
+masivas (lotes de gastos, importaciones CSV) generan un único evento
+"carga_gastos" o "carga_ventas" por restaurante. Los cambios de un
+restaurante respecto a su banda de margen (api/margenes.py) llegan como
+eventos "margen".
+
+Modos (NOTIFICACIONES_MODO):
+  - inmediato (por defecto): un correo por restaurante y petición; si se
+    sube una lista de gastos llega un único resumen, no uno por gasto.
+  - resumen: los eventos se guardan en eventos_notificacion y el worker de
+    correos los agrupa por restaurante en un único correo cuando el más
+    antiguo supera NOTIFICACIONES_VENTANA minutos o se acumulan
+    NOTIFICACIONES_LOTE eventos.
+En ambos casos el correo sale por el outbox, en la misma transacción.
+"""
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, literal, union_all, or_, delete
+
+from api.models import db, Restaurante, Usuario, Proveedor, EventoNotificacion
+from api.outbox import encolar_email
+from api.dinero import a_centimos, a_euros
+
+
+MODO = os.getenv("NOTIFICACIONES_MODO", "inmediato")
+VENTANA = int(os.getenv("NOTIFICACIONES_VENTANA", 15))
+LOTE = int(os.getenv("NOTIFICACIONES_LOTE", 30))
+
+CARGAS = {"carga_ventas": "ventas", "carga_gastos": "gastos"}
+
+ESTADOS_MARGEN = {"por_debajo": "por debajo de", "dentro": "dentro de", "por_encima": "por encima de"}
+
+ENTIDADES = {
+    "restaurante": Restaurante,
+    "usuario": Usuario,
+    "proveedor": Proveedor,
+}
+
+
+def email_admin():
+    return os.getenv("EMAIL_ADMIN", "admin@ohmychef.com")
+
+
+def resolver_nombres(eventos):
+    """
+    {("restaurante" | "usuario" | "proveedor", id): nombre} para todos los
+    ids que aparecen en los eventos, en una única consulta.
+    """
+    ids = defaultdict(set)
+    for _, datos in eventos:
+        for entidad in ENTIDADES:
+            valor = datos.get(f"{entidad}_id")
+            if valor:
+                ids[entidad].add(int(valor))
+
+    consultas = [
+        select(literal(entidad).label("entidad"), modelo.id, modelo.nombre)
+        .where(modelo.id.in_(ids[entidad]))
+        for entidad, modelo in ENTIDADES.items() if ids[entidad]
+    ]
+    if not consultas:
+        return {}
+    return {(entidad, id_): nombre
+            for entidad, id_, nombre in db.session.execute(union_all(*consultas))}
+
+
+def _nombre(nombres, entidad, datos, defecto):
+    valor = datos.get(f"{entidad}_id")
+    return nombres.get((entidad, int(valor)), defecto) if valor else defecto
+
+
+def _correo_evento(tipo, datos, nombres):
+    restaurante = _nombre(nombres, "restaurante", datos, "Desconocido")
+    usuario = _nombre(nombres, "usuario", datos, "Sistema")
+
+    if tipo == "venta":
+        return f"Nueva venta registrada en {restaurante}", f"""
+        <h4>📥 Venta registrada:</h4>
+        <ul>
+            <li><strong>Restaurante:</strong> {restaurante}</li>
+            <li><strong>Monto:</strong> {datos['monto']}€</li>
+            <li><strong>Turno:</strong> {datos.get('turno')}</li>
+            <li><strong>Fecha:</strong> {datos['fecha']}</li>
+            <li><strong>Usuario:</strong> {usuario}</li>
+        </ul>
+        """
+
+    if tipo == "margen":
+        estado = ESTADOS_MARGEN[datos["estado"]]
+        return f"{restaurante} está {estado} su margen objetivo", f"""
+        <h4>🎯 Cambio de margen:</h4>
+        <ul>
+            <li><strong>Restaurante:</strong> {restaurante}</li>
+            <li><strong>Mes:</strong> {datos['mes']:02d}/{datos['anio']}</li>
+            <li><strong>Gasto sobre ventas:</strong> {datos['porcentaje']}%</li>
+            <li><strong>Objetivo:</strong> {datos['porcentaje_min']}% – {datos['porcentaje_max']}%</li>
+            <li><strong>Estado:</strong> {estado} la banda (antes {ESTADOS_MARGEN.get(datos['anterior'], 'sin evaluar')})</li>
+        </ul>
+        """
+
+    if tipo in CARGAS:
+        que = CARGAS[tipo]
+        return f"Carga de {datos[f'num_{que}']} {que} en {restaurante}", f"""
+        <h4>📦 Carga masiva de {que}:</h4>
+        <ul>
+            <li><strong>Restaurante:</strong> {restaurante}</li>
+            <li><strong>{que.capitalize()}:</strong> {datos[f'num_{que}']}</li>
+            <li><strong>Total:</strong> {datos['monto']}€</li>
+            <li><strong>Fechas:</strong> {datos['desde']} – {datos['hasta']}</li>
+            <li><strong>Usuario:</strong> {usuario}</li>
+        </ul>
+        """
+
+    proveedor = _nombre(nombres, "proveedor", datos, "Sin proveedor")
+    return f"Nuevo gasto registrado en {restaurante}", f"""
+        <h4>📤 Gasto registrado:</h4>
+        <ul>
+            <li><strong>Restaurante:</strong> {restaurante}</li>
+            <li><strong>Proveedor:</strong> {proveedor}</li>
+            <li><strong>Categoría:</strong> {datos.get('categoria') or 'Sin categoría'}</li>
+            <li><strong>Monto:</strong> {datos['monto']}€</li>
+            <li><strong>Fecha:</strong> {datos['fecha']}</li>
+            <li><strong>Usuario:</strong> {usuario}</li>
+        </ul>
+        """
+
+
+def _correo_resumen(eventos, nombres):
+    restaurante = _nombre(nombres, "restaurante", eventos[0][1], "Desconocido")
+    ventas = [datos for tipo, datos in eventos if tipo in ("venta", "carga_ventas")]
+    gastos = [datos for tipo, datos in eventos if tipo in ("gasto", "carga_gastos")]
+    num_ventas = sum(datos.get("num_ventas", 1) for datos in ventas)
+    num_gastos = sum(datos.get("num_gastos", 1) for datos in gastos)
+
+    filas = []
+    for tipo, datos in eventos:
+        if tipo == "margen":
+            filas.append(f"""
+            <tr><td>🎯 Margen</td><td>{datos['mes']:02d}/{datos['anio']}</td>
+            <td>{ESTADOS_MARGEN[datos['estado']]} {datos['porcentaje_min']}% – {datos['porcentaje_max']}%</td>
+            <td>{datos['porcentaje']}%</td><td>Sistema</td></tr>""")
+            continue
+        if tipo == "venta":
+            etiqueta, fecha, detalle = "📥 Venta", datos["fecha"], datos.get("turno")
+        elif tipo in CARGAS:
+            etiqueta, fecha = "📦 Carga", f"{datos['desde']} – {datos['hasta']}"
+            detalle = f"{datos[f'num_{CARGAS[tipo]}']} {CARGAS[tipo]}"
+        else:
+            etiqueta, fecha = "📤 Gasto", datos["fecha"]
+            detalle = (f"{_nombre(nombres, 'proveedor', datos, 'Sin proveedor')} · "
+                       f"{datos.get('categoria') or 'Sin categoría'}")
+        filas.append(f"""
+            <tr><td>{etiqueta}</td><td>{fecha}</td>
+            <td>{detalle or ''}</td><td>{datos['monto']}€</td>
+            <td>{_nombre(nombres, 'usuario', datos, 'Sistema')}</td></tr>""")
+
+    total_ventas = a_euros(sum(a_centimos(d["monto"]) for d in ventas))
+    total_gastos = a_euros(sum(a_centimos(d["monto"]) for d in gastos))
+    asunto = f"Resumen de actividad en {restaurante}: {num_ventas} ventas y {num_gastos} gastos"
+    html = f"""
+        <h4>📋 Actividad registrada en {restaurante}:</h4>
+        <p><strong>Ventas:</strong> {num_ventas} ({total_ventas}€) ·
+           <strong>Gastos:</strong> {num_gastos} ({total_gastos}€)</p>
+        <table border="1" cellpadding="4" cellspacing="0">
+            <tr><th>Tipo</th><th>Fecha</th><th>Detalle</th><th>Monto</th><th>Usuario</th></tr>
+            {''.join(filas)}
+        </table>
+        """
+    return asunto, html
+
+
+def encolar_correos(eventos):
+    """Encola un correo por restaurante: el detalle si es un solo evento, si no un resumen."""
+    if not eventos:
+        return 0
+    nombres = resolver_nombres(eventos)
+    por_restaurante = defaultdict(list)
+    for tipo, datos in eventos:
+        por_restaurante[int(datos["restaurante_id"])].append((tipo, datos))
+
+    for lista in por_restaurante.values():
+        if len(lista) == 1:
+            asunto, html = _correo_evento(*lista[0], nombres)
+        else:
+            asunto, html = _correo_resumen(lista, nombres)
+        encolar_email(email_admin(), asunto, html)
+    return len(por_restaurante)
+
+
+def notificar_eventos(tipo, eventos, modo=None):
+    """
+    Notifica al admin las altas de `tipo` ("venta", "gasto", "carga_ventas",
+    "carga_gastos" o "margen").
+    Cada evento es un dict con restaurante_id, usuario_id, monto, fecha y turno
+    (ventas) o proveedor_id y categoria (gastos); las cargas llevan num_ventas
+    o num_gastos, desde y hasta en lugar de fecha. Los de margen llevan anio,
+    mes, estado, anterior, porcentaje, porcentaje_min y porcentaje_max. No
+    hace commit.
+    """
+    if (modo or MODO) == "resumen":
+        for datos in eventos:
+            db.session.add(EventoNotificacion(
+                restaurante_id=int(datos["restaurante_id"]), tipo=tipo,
+                datos=json.dumps(datos, default=str)))
+        return
+    encolar_correos([(tipo, datos) for datos in eventos])
+
+
+def vaciar_eventos(ahora=None, ventana=None, lote=None):
+    """
+    Convierte en correos los eventos de los restaurantes cuyo evento más
+    antiguo supera la ventana o que acumulan `lote` eventos.
+    Lo llama el worker de correos. Devuelve el número de correos encolados.
+    """
+    ahora = ahora or datetime.utcnow()
+    limite = ahora - timedelta(minutes=VENTANA if ventana is None else ventana)
+    lote = lote or LOTE
+
+    listos = db.session.scalars(
+        select(EventoNotificacion.restaurante_id)
+        .group_by(EventoNotificacion.restaurante_id)
+        .having(or_(func.min(EventoNotificacion.creado) <= limite,
+                    func.count() >= lote))
+    ).all()
+    if not listos:
+        return 0
+
+    filas = db.session.scalars(
+        select(EventoNotificacion)
+        .where(EventoNotificacion.restaurante_id.in_(listos))
+        .order_by(EventoNotificacion.creado, EventoNotificacion.id)
+        .with_for_update(skip_locked=True)
+    ).all()
+    eventos = [(fila.tipo, json.loads(fila.datos)) for fila in filas]
+
+    enviados = encolar_correos(eventos)
+    db.session.execute(delete(EventoNotificacion).where(
+        EventoNotificacion.id.in_([fila.id for fila in filas])))
+    db.session.commit()
+    return enviados
@@ -0,0 +1,107 @@
+"""
+Outbox de correos.
+
+Los endpoints no envían correos: encolar_email() añade una fila a la tabla
+outbox dentro de la misma transacción que la venta, el gasto o el usuario
+que lo provoca, así que el correo solo existe si el alta se confirma y la
+petición no espera al proveedor de correo.
+
+El worker (`flask enviar-correos`) recoge los pendientes por lotes y los
+entrega con el servicio de correo (api/mail/servicio.py), reutilizando la
+conexión para todo el lote. Si el envío falla, lo reintenta más tarde con
+espera exponencial hasta MAX_INTENTOS y después lo marca como fallido.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from api.models import db, Outbox
+from api.mail.servicio import servicio_correo
+
+
+TAMANO_LOTE = int(os.getenv("OUTBOX_LOTE", 50))
+MAX_INTENTOS = int(os.getenv("OUTBOX_MAX_INTENTOS", 6))
+ESPERA_BASE = 30          # segundos antes del primer reintento
+ESPERA_MAXIMA = 3600      # nunca más de una hora entre reintentos
+
+
+def encolar_email(destinatario, asunto, html):
+    """Añade el correo a la sesión actual; se guarda con el próximo commit."""
+    correo = Outbox(destinatario=destinatario, asunto=asunto, html=html)
+    db.session.add(correo)
+    return correo
+
+
+def espera_reintento(intentos):
+    return timedelta(seconds=min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAXIMA))
+
+
+def entregar_pendientes(transporte=None, tamano_lote=TAMANO_LOTE, ahora=None):
+    """
+    Envía un lote de correos pendientes cuyo próximo intento ya ha llegado.
+    En Postgres las filas se bloquean con SKIP LOCKED, así que pueden correr
+    varios workers a la vez sin enviar dos veces el mismo correo.
+    Devuelve {"enviados": n, "reintentos": n, "fallidos": n}.
+    """
+    transporte = transporte or servicio_correo()
+    ahora = ahora or datetime.utcnow()
+    resumen = {"enviados": 0, "reintentos": 0, "fallidos": 0}
+
+    correos = db.session.scalars(
+        select(Outbox).where(
+            Outbox.estado == "pendiente",
+            Outbox.proximo_intento <= ahora
+        ).order_by(Outbox.proximo_intento, Outbox.id)
+        .limit(tamano_lote)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    errores = transporte.enviar_varios(
+        [(correo.destinatario, correo.asunto, correo.html) for correo in correos])
+
+    for correo, error in zip(correos, errores):
+        if error is not None:
+            correo.intentos += 1
+            correo.ultimo_error = str(error)
+            if correo.intentos >= MAX_INTENTOS:
+                correo.estado = "fallido"
+                resumen["fallidos"] += 1
+            else:
+                correo.proximo_intento = ahora + espera_reintento(correo.intentos)
+                resumen["reintentos"] += 1
+            continue
+
+        correo.intentos += 1
+        correo.estado = "enviado"
+        correo.enviado = datetime.utcnow()
+        correo.ultimo_error = None
+        resumen["enviados"] += 1
+
+    db.session.commit()
+    return resumen
+
+
+def procesar_outbox(transporte=None, una_vez=False, intervalo=10, tamano_lote=TAMANO_LOTE):
+    """
+    Bucle del worker: pasa al outbox los resúmenes de notificaciones que ya
+    toca enviar, entrega lotes mientras haya pendientes y, cuando se vacía
+    la cola, espera `intervalo` segundos (o termina si una_vez=True).
+    """
+    from api.notificaciones import vaciar_eventos
+
+    total = {"enviados": 0, "reintentos": 0, "fallidos": 0}
+    while True:
+        # Primero los resúmenes de notificaciones que ya toca enviar
+        vaciar_eventos()
+        resumen = entregar_pendientes(transporte, tamano_lote)
+        for clave, valor in resumen.items():
+            total[clave] += valor
+        if sum(resumen.values()) > 0:
+            print("📬 Outbox:", resumen)
+        if sum(resumen.values()) >= tamano_lote:
+            continue
+        if una_vez:
+            return total
+        time.sleep(intervalo)
@@ -0,0 +1,160 @@
+"""
+Indicadores del panel de administración para un mes, de todos los restaurantes.
+
+Todos los bloques salen de la misma consulta agrupada sobre resumen_mensual
+(por tipo, restaurante y proveedor) más la lista de restaurantes, así que el
+coste no crece con el número de restaurantes. Los endpoints individuales y
+el endpoint agrupado /admin/overview usan estas mismas funciones. Los
+totales se acumulan en céntimos y se pasan a euros al construir cada bloque.
+"""
+from sqlalchemy import func
+
+from api.models import db, Restaurante, Proveedor, ResumenMensual
+from api.dinero import a_euros
+from api import analitica
+
+
+SECCIONES = (
+    "resumen_gastos", "resumen_ventas", "gasto_por_restaurante",
+    "ventas_por_restaurante", "proveedores_top", "restaurantes_top", "resumen_general",
+)
+TOP = 5
+
+
+class DatosMes:
+    """Totales del mes (en céntimos) ya agregados por restaurante y por proveedor."""
+
+    def __init__(self, restaurantes, filas):
+        self.restaurantes = restaurantes
+        self.ventas = {}
+        self.num_ventas = {}
+        self.gastos = {}
+        self.proveedores = {}
+
+        for tipo, restaurante_id, proveedor_id, proveedor, total, cantidad in filas:
+            total = int(total or 0)
+            if tipo == "venta":
+                self.ventas[restaurante_id] = self.ventas.get(restaurante_id, 0) + total
+                self.num_ventas[restaurante_id] = self.num_ventas.get(restaurante_id, 0) + cantidad
+                continue
+            self.gastos[restaurante_id] = self.gastos.get(restaurante_id, 0) + total
+            if proveedor_id:
+                veces, gastado = self.proveedores.get(proveedor_id, (proveedor, 0, 0))[1:]
+                self.proveedores[proveedor_id] = (proveedor, veces + cantidad, gastado + total)
+
+
+def datos_mes(mes, ano):
+    restaurantes = Restaurante.query.order_by(Restaurante.id).all()
+    filas = db.session.query(
+        ResumenMensual.tipo,
+        ResumenMensual.restaurante_id,
+        ResumenMensual.proveedor_id,
+        Proveedor.nombre,
+        func.sum(ResumenMensual.total_cent),
+        func.sum(ResumenMensual.cantidad)
+    ).outerjoin(
+        Proveedor, Proveedor.id == ResumenMensual.proveedor_id
+    ).filter(
+        ResumenMensual.anio == ano,
+        ResumenMensual.mes == mes
+    ).group_by(
+        ResumenMensual.tipo, ResumenMensual.restaurante_id,
+        ResumenMensual.proveedor_id, Proveedor.nombre
+    ).order_by(ResumenMensual.proveedor_id).all()
+    return DatosMes(restaurantes, filas)
+
+
+def _top_restaurante(totales, restaurantes):
+    if not restaurantes:
+        return "No disponible"
+    return max(restaurantes, key=lambda r: totales.get(r.id, 0)).nombre
+
+
+def bloque_resumen_gastos(datos):
+    proveedor_top = "No disponible"
+    if datos.proveedores:
+        proveedor_top = max(datos.proveedores.values(), key=lambda p: p[1])[0]
+    return {
+        "total_gastado": a_euros(sum(datos.gastos.values())),
+        "restaurantes_activos": len(datos.restaurantes),
+        "proveedor_top": proveedor_top,
+        "restaurante_top": _top_restaurante(datos.gastos, datos.restaurantes)
+    }
+
+
+def bloque_resumen_ventas(datos):
+    total_vendido = sum(datos.ventas.get(r.id, 0) for r in datos.restaurantes)
+    n = len(datos.restaurantes)
+    return {
+        "total_vendido": a_euros(total_vendido),
+        "restaurantes_con_ventas": n,
+        "restaurante_top": _top_restaurante(datos.ventas, datos.restaurantes),
+        "promedio_por_restaurante": round(total_vendido / n / 100, 2) if n else 0
+    }
+
+
+def bloque_gasto_por_restaurante(datos):
+    return [{"restaurante": r.nombre, "total_gastado": a_euros(datos.gastos.get(r.id, 0))}
+            for r in datos.restaurantes]
+
+
+def bloque_ventas_por_restaurante(datos):
+    return [{"restaurante": r.nombre, "total_vendido": a_euros(datos.ventas.get(r.id, 0))}
+            for r in datos.restaurantes]
+
+
+def bloque_proveedores_top(datos):
+    por_nombre = {}
+    for nombre, veces, gastado in datos.proveedores.values():
+        anterior = por_nombre.get(nombre, (0, 0))
+        por_nombre[nombre] = (anterior[0] + veces, anterior[1] + gastado)
+    top = sorted(por_nombre.items(), key=lambda p: p[1][1], reverse=True)[:TOP]
+    return [{"nombre": nombre, "veces_usado": veces, "total_gastado": a_euros(gastado)}
+            for nombre, (veces, gastado) in top]
+
+
+def bloque_restaurantes_top(datos):
+    por_nombre = {}
+    for r in datos.restaurantes:
+        if r.id not in datos.ventas:
+            continue
+        anterior = por_nombre.get(r.nombre, (0, 0))
+        por_nombre[r.nombre] = (anterior[0] + datos.num_ventas[r.id],
+                                anterior[1] + datos.ventas[r.id])
+    top = sorted(por_nombre.items(), key=lambda p: p[1][1], reverse=True)[:TOP]
+    return [{"nombre": nombre, "ventas_realizadas": ventas, "total_vendido": a_euros(total)}
+            for nombre, (ventas, total) in top]
+
+
+def bloque_resumen_general(datos):
+    ventas = [datos.ventas.get(r.id, 0) for r in datos.restaurantes]
+    gastos = [datos.gastos.get(r.id, 0) for r in datos.restaurantes]
+    porcentajes = analitica.porcentaje(gastos, ventas).tolist()
+    return [{
+        "restaurante_id": r.id,
+        "nombre": r.nombre,
+        "venta_total": a_euros(total_ventas),
+        "porcentaje_gasto": porcentaje_gasto
+    } for r, total_ventas, porcentaje_gasto in zip(datos.restaurantes, ventas, porcentajes)]
+
+
+BLOQUES = {
+    "resumen_gastos": bloque_resumen_gastos,
+    "resumen_ventas": bloque_resumen_ventas,
+    "gasto_por_restaurante": bloque_gasto_por_restaurante,
+    "ventas_por_restaurante": bloque_ventas_por_restaurante,
+    "proveedores_top": bloque_proveedores_top,
+    "restaurantes_top": bloque_restaurantes_top,
+    "resumen_general": bloque_resumen_general,
+}
+
+
+def overview_admin(mes, ano, secciones=SECCIONES):
+    """Devuelve {seccion: bloque} para las secciones pedidas."""
+    secciones = set(secciones)
+    desconocidas = secciones - set(SECCIONES)
+    if desconocidas:
+        raise ValueError(f"Secciones no válidas: {', '.join(sorted(desconocidas))}")
+
+    datos = datos_mes(mes, ano)
+    return {seccion: BLOQUES[seccion](datos) for seccion in SECCIONES if seccion in secciones}
@@ -0,0 +1,132 @@
+"""
+Filtros y paginación por cursor (keyset) para los endpoints de listado.
+
+Sin `limit` ni `cursor` los endpoints siguen devolviendo la lista completa
+(ya filtrada en SQL), o en streaming si se pide `stream=1`. Con ellos
+devuelven {"items": [...], "next_cursor": ...}, ordenado por (fecha, id) o
+por id, y cada página cuesta lo mismo sin importar cuánto histórico haya.
+"""
+import base64
+from datetime import date
+
+from flask import jsonify
+from sqlalchemy import tuple_
+
+from api.utils import filtro_mes
+from api.streaming import json_en_streaming, pide_streaming
+
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+
+
+def codificar_cursor(valores):
+    texto = "|".join(v.isoformat() if isinstance(v, date) else str(v) for v in valores)
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodificar_cursor(cursor, columnas):
+    try:
+        partes = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if len(partes) != len(columnas):
+            raise ValueError
+        return [date.fromisoformat(p) if columna.key == "fecha" else int(p)
+                for p, columna in zip(partes, columnas)]
+    except Exception:
+        raise ValueError("Cursor no válido")
+
+
+def _fecha(args, nombre):
+    valor = args.get(nombre)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f"Fecha no válida en '{nombre}': {valor}")
+
+
+def aplicar_filtros(consulta, modelo, args):
+    """Aplica en SQL los filtros de la query string que tengan sentido para el modelo."""
+    restaurante_id = args.get("restaurante_id", type=int)
+    if restaurante_id and hasattr(modelo, "restaurante_id"):
+        consulta = consulta.filter(modelo.restaurante_id == restaurante_id)
+
+    proveedor_id = args.get("proveedor_id", type=int)
+    if proveedor_id and hasattr(modelo, "proveedor_id"):
+        consulta = consulta.filter(modelo.proveedor_id == proveedor_id)
+
+    categoria = args.get("categoria")
+    if categoria and hasattr(modelo, "categoria"):
+        consulta = consulta.filter(modelo.categoria == categoria)
+
+    if hasattr(modelo, "fecha"):
+        desde = _fecha(args, "desde")
+        hasta = _fecha(args, "hasta")
+        if desde:
+            consulta = consulta.filter(modelo.fecha >= desde)
+        if hasta:
+            consulta = consulta.filter(modelo.fecha <= hasta)
+
+        mes = args.get("mes", type=int)
+        ano = args.get("ano", type=int)
+        if mes and ano:
+            consulta = consulta.filter(*filtro_mes(modelo.fecha, mes, ano))
+
+    return consulta
+
+
+def columnas_orden(modelo):
+    if hasattr(modelo, "fecha"):
+        return [modelo.fecha, modelo.id]
+    return [modelo.id]
+
+
+def paginado(args):
+    return "limit" in args or "cursor" in args
+
+
+def paginar(consulta, modelo, args):
+    """
+    Devuelve (filas, next_cursor) de una página ordenada por columnas_orden(modelo).
+    next_cursor es None cuando no quedan más filas.
+    """
+    columnas = columnas_orden(modelo)
+    limite = args.get("limit", LIMITE_POR_DEFECTO, type=int)
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    cursor = args.get("cursor")
+    if cursor:
+        valores = decodificar_cursor(cursor, columnas)
+        consulta = consulta.filter(tuple_(*columnas) > tuple_(*valores))
+
+    filas = consulta.order_by(*columnas).limit(limite + 1).all()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = codificar_cursor([getattr(ultima, c.key) for c in columnas])
+    return filas, siguiente
+
+
+def listar(consulta, modelo, args, serializar):
+    """Filtra, pagina si se pide y serializa; devuelve el cuerpo de la respuesta."""
+    consulta = aplicar_filtros(consulta, modelo, args)
+
+    if not paginado(args):
+        return [serializar(fila) for fila in consulta.order_by(*columnas_orden(modelo)).all()]
+
+    filas, siguiente = paginar(consulta, modelo, args)
+    return {
+        "items": [serializar(fila) for fila in filas],
+        "next_cursor": siguiente
+    }
+
+
+def respuesta_listado(consulta, modelo, args, serializar):
+    """Como listar(), pero devuelve la respuesta HTTP y admite `stream=1`."""
+    if pide_streaming(args) and not paginado(args):
+        consulta = aplicar_filtros(consulta, modelo, args)
+        return json_en_streaming(consulta.order_by(*columnas_orden(modelo)), serializar)
+    return jsonify(listar(consulta, modelo, args, serializar)), 200
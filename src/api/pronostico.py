@@ -0,0 +1,177 @@
+"""
+Proyección a fin de mes de ventas, gastos y porcentaje de gasto.
+
+Para cada restaurante se ajusta un perfil por día de la semana: la media de
+ventas y de gastos de cada lunes, martes, etc. de las últimas SEMANAS semanas
+hasta la fecha de corte (hoy por defecto). La proyección del mes es lo ya
+registrado hasta el corte más el perfil aplicado a los días que faltan, así
+que tiene en cuenta los días transcurridos y que no todos los días venden
+igual.
+
+El ajuste se hace de una vez para todos los restaurantes con el motor de
+api/analitica.py (una consulta y operaciones sobre matrices). Los parámetros
+de cada restaurante se guardan en la caché (api/cache.py) con la versión de
+sus datos (api/versiones.py): cuando entra una venta o un gasto sube la
+versión de ese restaurante y en la siguiente petición solo se reajustan los
+restaurantes cuya versión ha cambiado. Con todo en caché, una petición es
+una consulta de versiones y unas pocas operaciones con arrays.
+"""
+import os
+from calendar import monthrange
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select, func, tuple_
+
+from api.models import db, VersionDatos
+from api.cache import obtener_backend
+from api import analitica
+
+
+SEMANAS = int(os.getenv("PRONOSTICO_SEMANAS", 8))
+
+
+def _limites(anio, mes, corte):
+    inicio = date(anio, mes, 1)
+    fin = date(anio, mes, monthrange(anio, mes)[1])
+    return inicio, fin, min(corte, fin)
+
+
+def _meses(desde, hasta):
+    """(año, mes) de todos los meses entre dos fechas."""
+    meses = []
+    anio, mes = desde.year, desde.month
+    while (anio, mes) <= (hasta.year, hasta.month):
+        meses.append((anio, mes))
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return meses
+
+
+def _por_dia_semana(desde, hasta):
+    """Número de días de cada día de la semana (lunes=0) en [desde, hasta]."""
+    if hasta < desde:
+        return np.zeros(7, dtype=np.int64)
+    dias = (desde.weekday() + np.arange((hasta - desde).days + 1)) % 7
+    return np.bincount(dias, minlength=7)
+
+
+def ventana(anio, mes, corte):
+    """Rango de días que usa el ajuste: las últimas SEMANAS semanas y lo que va de mes."""
+    inicio, _, corte = _limites(anio, mes, corte)
+    return min(corte - timedelta(days=7 * SEMANAS - 1), inicio), corte
+
+
+def versiones(restaurantes, anio, mes, corte):
+    """{restaurante_id: versión} de los meses que cubre el ajuste (una consulta)."""
+    desde, hasta = ventana(anio, mes, corte)
+    return dict(db.session.execute(
+        select(VersionDatos.restaurante_id, func.sum(VersionDatos.version))
+        .where(VersionDatos.restaurante_id.in_(restaurantes),
+               tuple_(VersionDatos.anio, VersionDatos.mes).in_(_meses(desde, hasta)))
+        .group_by(VersionDatos.restaurante_id)
+    ).all())
+
+
+def ajustar(restaurantes, anio, mes, corte):
+    """
+    Ajusta a la vez los parámetros de todos los restaurantes indicados:
+    {restaurante_id: {"perfil_ventas": [7], "perfil_gastos": [7],
+    "ventas": céntimos del mes hasta el corte, "gastos": ...}}.
+    """
+    inicio, _, corte = _limites(anio, mes, corte)
+    desde, hasta = ventana(anio, mes, corte)
+    diario = analitica.Diario(desde, hasta, restaurantes=restaurantes)
+    ventas = diario.matriz("ventas", restaurantes)
+    gastos = diario.matriz("gastos", restaurantes)
+
+    dias = np.arange(diario.num_dias)
+    dia_semana = (desde.weekday() + dias) % 7
+    en_ventana = dias >= diario.num_dias - 7 * SEMANAS
+    # Matriz días x 7: qué días de la ventana caen en cada día de la semana
+    semana = (dia_semana[:, None] == np.arange(7)) & en_ventana[:, None]
+    veces = np.maximum(semana.sum(axis=0), 1)
+    perfil_ventas = (ventas @ semana) / veces
+    perfil_gastos = (gastos @ semana) / veces
+
+    en_mes = dias >= (inicio - desde).days
+    real_ventas = ventas[:, en_mes].sum(axis=1)
+    real_gastos = gastos[:, en_mes].sum(axis=1)
+
+    return {restaurante_id: {
+        "perfil_ventas": perfil_ventas[i].tolist(),
+        "perfil_gastos": perfil_gastos[i].tolist(),
+        "ventas": int(real_ventas[i]),
+        "gastos": int(real_gastos[i]),
+    } for i, restaurante_id in enumerate(restaurantes)}
+
+
+def parametros(restaurantes, anio, mes, corte):
+    """
+    Parámetros de cada restaurante, de la caché si su versión no ha cambiado;
+    los que faltan o están desfasados se ajustan juntos.
+    """
+    actuales = versiones(restaurantes, anio, mes, corte)
+    backend = obtener_backend()
+    clave = "pronostico:{}:{}-{}:{}".format
+    resultado = {}
+    for restaurante_id in restaurantes:
+        guardado = backend.obtener(clave(restaurante_id, anio, mes, corte)) if backend else None
+        if guardado is not None and guardado["version"] == actuales.get(restaurante_id, 0):
+            resultado[restaurante_id] = guardado
+
+    pendientes = [r for r in restaurantes if r not in resultado]
+    if pendientes:
+        for restaurante_id, datos in ajustar(pendientes, anio, mes, corte).items():
+            datos["version"] = actuales.get(restaurante_id, 0)
+            resultado[restaurante_id] = datos
+            if backend:
+                backend.guardar(clave(restaurante_id, anio, mes, corte), datos)
+    return resultado, len(pendientes)
+
+
+def proyectar(restaurantes, anio, mes, corte=None):
+    """
+    Proyección del mes para cada restaurante (en el orden recibido).
+    `corte` es el último día con datos que se tiene en cuenta (hoy por defecto).
+    """
+    corte = corte or date.today()
+    restaurantes = [int(r) for r in restaurantes]
+    inicio, fin, corte = _limites(anio, mes, corte)
+    datos, ajustados = parametros(restaurantes, anio, mes, corte)
+
+    transcurridos = max((corte - inicio).days + 1, 0)
+    restantes = _por_dia_semana(max(corte + timedelta(days=1), inicio), fin)
+
+    filas = [datos[r] for r in restaurantes]
+    real_ventas = np.array([f["ventas"] for f in filas], dtype=np.int64)
+    real_gastos = np.array([f["gastos"] for f in filas], dtype=np.int64)
+    perfil_ventas = np.array([f["perfil_ventas"] for f in filas]).reshape(-1, 7)
+    perfil_gastos = np.array([f["perfil_gastos"] for f in filas]).reshape(-1, 7)
+    ventas = real_ventas + np.rint(perfil_ventas @ restantes).astype(np.int64)
+    gastos = real_gastos + np.rint(perfil_gastos @ restantes).astype(np.int64)
+    promedio = np.rint(real_ventas / max(transcurridos, 1)).astype(np.int64)
+
+    return {
+        "anio": anio,
+        "mes": mes,
+        "corte": corte.isoformat(),
+        "dias_transcurridos": transcurridos,
+        "dias_restantes": int(restantes.sum()),
+        "reajustados": ajustados,
+        "restaurantes": [{
+            "restaurante_id": restaurante_id,
+            "ventas_actuales": v_real,
+            "gastos_actuales": g_real,
+            "promedio_diario": media,
+            "proyeccion_ventas": v,
+            "proyeccion_gastos": g,
+            "porcentaje_actual": p_real,
+            "porcentaje_proyectado": p,
+        } for restaurante_id, v_real, g_real, media, v, g, p_real, p in zip(
+            restaurantes,
+            analitica.a_euros(real_ventas), analitica.a_euros(real_gastos),
+            analitica.a_euros(promedio),
+            analitica.a_euros(ventas), analitica.a_euros(gastos),
+            analitica.porcentaje(real_gastos, real_ventas).tolist(),
+            analitica.porcentaje(gastos, ventas).tolist())]
+    }
@@ -0,0 +1,282 @@
+"""
+Tablas de resumen (rollups) que se mantienen al día con cada alta, edición o
+borrado de ventas y gastos, para que los dashboards no tengan que recorrer
+todas las transacciones en cada carga. Los totales se acumulan en céntimos
+enteros (api/dinero.py), así que no arrastran errores de redondeo. Con los
+mismos incrementos se actualiza estado_margen (api/margenes.py).
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import event, inspect, select, func, insert, update, delete, literal, union_all, extract, cast, Integer
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, Venta, Gasto, ResumenDiario, ResumenMensual, EstadoMargen
+from api.utils import filtro_mes
+from api.dinero import a_centimos, a_euros
+from api.margenes import evaluar_margenes, reevaluar_restaurantes
+
+
+CAMPOS_RESUMIDOS = {
+    Venta: ("restaurante_id", "fecha", "monto_cent"),
+    Gasto: ("restaurante_id", "fecha", "monto_cent", "categoria", "proveedor_id"),
+}
+
+
+def a_fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    return valor
+
+
+def _centimos(valores):
+    """Monto en céntimos de unos valores que traen monto_cent o monto (euros)."""
+    if "monto_cent" in valores:
+        return int(valores["monto_cent"])
+    return a_centimos(valores["monto"])
+
+
+def _aporte_diario(modelo, valores, signo):
+    """Incremento que una venta o un gasto aporta a su fila de resumen_diario."""
+    clave = (int(valores["restaurante_id"]), a_fecha(valores["fecha"]))
+    if modelo is Venta:
+        return clave, {"total_ventas_cent": signo * _centimos(valores), "num_ventas": signo}
+    return clave, {"total_gastos_cent": signo * _centimos(valores), "num_gastos": signo}
+
+
+def _aporte_mensual(modelo, valores, signo):
+    """Incremento que una venta o un gasto aporta a su fila de resumen_mensual."""
+    fecha = a_fecha(valores["fecha"])
+    if modelo is Venta:
+        clave = ("venta", int(valores["restaurante_id"]), fecha.year, fecha.month, "", 0)
+    else:
+        clave = ("gasto", int(valores["restaurante_id"]), fecha.year, fecha.month,
+                 valores["categoria"] or "", int(valores["proveedor_id"] or 0))
+    return clave, {"total_cent": signo * _centimos(valores), "cantidad": signo}
+
+
+def _valores_actuales(obj):
+    return {campo: getattr(obj, campo) for campo in CAMPOS_RESUMIDOS[type(obj)]}
+
+
+def _valores_guardados(session, obj):
+    """Lee de la base de datos los valores previos a la edición."""
+    modelo = type(obj)
+    columnas = [getattr(modelo, campo) for campo in CAMPOS_RESUMIDOS[modelo]]
+    fila = session.execute(
+        select(*columnas).where(modelo.id == obj.id)).one_or_none()
+    return fila._asdict() if fila is not None else None
+
+
+def _cambio_relevante(obj):
+    estado = inspect(obj)
+    return any(estado.attrs[campo].history.has_changes()
+               for campo in CAMPOS_RESUMIDOS[type(obj)])
+
+
+def upsert_sumando(session, tabla, claves, filas):
+    """
+    Inserta cada fila o, si ya existe su clave, le suma los incrementos.
+    Usa ON CONFLICT en Postgres y SQLite; en otros motores hace UPDATE + INSERT.
+    """
+    if not filas:
+        return
+    columnas = [c for c in filas[0] if c not in claves]
+    dialecto = session.get_bind().dialect.name
+
+    if dialecto in ("postgresql", "sqlite"):
+        insertar = (postgresql if dialecto == "postgresql" else sqlite).insert
+        stmt = insertar(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabla.c[c] for c in claves],
+            set_={c: tabla.c[c] + stmt.excluded[c] for c in columnas}
+        )
+        session.execute(stmt, filas)
+        return
+
+    for fila in filas:
+        condicion = [tabla.c[c] == fila[c] for c in claves]
+        resultado = session.execute(update(tabla).where(*condicion).values(
+            {c: tabla.c[c] + fila[c] for c in columnas}))
+        if resultado.rowcount == 0:
+            session.execute(insert(tabla).values(fila))
+
+
+def _aplicar_diario(session, deltas):
+    filas = []
+    for (restaurante_id, fecha), incrementos in deltas.items():
+        fila = {"restaurante_id": restaurante_id, "fecha": fecha,
+                "total_ventas_cent": 0, "total_gastos_cent": 0,
+                "num_ventas": 0, "num_gastos": 0}
+        for campo, valor in incrementos.items():
+            fila[campo] += valor
+        filas.append(fila)
+    upsert_sumando(session, ResumenDiario.__table__,
+                   ("restaurante_id", "fecha"), filas)
+
+
+def _aplicar_mensual(session, deltas):
+    claves = ("tipo", "restaurante_id", "anio", "mes", "categoria", "proveedor_id")
+    filas = [dict(zip(claves, clave), total_cent=incrementos["total_cent"],
+                  cantidad=incrementos["cantidad"])
+             for clave, incrementos in deltas.items()]
+    upsert_sumando(session, ResumenMensual.__table__, claves, filas)
+
+
+def _aplicar_margen(session, deltas):
+    """
+    Suma a estado_margen los incrementos del mes y reevalúa la banda solo de
+    los restaurantes y meses tocados.
+    """
+    meses = defaultdict(lambda: [0, 0])
+    for (restaurante_id, fecha), incrementos in deltas.items():
+        mes = meses[(restaurante_id, fecha.year, fecha.month)]
+        mes[0] += incrementos.get("total_ventas_cent", 0)
+        mes[1] += incrementos.get("total_gastos_cent", 0)
+    filas = [{"restaurante_id": restaurante_id, "anio": anio, "mes": mes,
+              "ventas_cent": ventas, "gastos_cent": gastos}
+             for (restaurante_id, anio, mes), (ventas, gastos) in meses.items()]
+    upsert_sumando(session, EstadoMargen.__table__, ("restaurante_id", "anio", "mes"), filas)
+    evaluar_margenes(session, list(meses))
+
+
+@event.listens_for(db.session, "before_flush")
+def _actualizar_resumenes(session, flush_context, instances):
+    cambios = []
+
+    for obj in session.new:
+        if type(obj) in CAMPOS_RESUMIDOS:
+            cambios.append((type(obj), _valores_actuales(obj), 1))
+
+    for obj in session.deleted:
+        if type(obj) in CAMPOS_RESUMIDOS:
+            cambios.append((type(obj), _valores_actuales(obj), -1))
+
+    for obj in session.dirty:
+        if type(obj) in CAMPOS_RESUMIDOS and _cambio_relevante(obj):
+            anteriores = _valores_guardados(session, obj)
+            if anteriores is not None:
+                cambios.append((type(obj), anteriores, -1))
+            cambios.append((type(obj), _valores_actuales(obj), 1))
+
+    if cambios:
+        registrar_cambios(session, cambios)
+
+
+def registrar_cambios(session, cambios):
+    """
+    Aplica a las tablas de resumen una lista de cambios
+    (modelo, {campo: valor}, signo); el importe va en monto_cent o, en
+    euros, en monto. Útil también para inserciones masivas que no pasan
+    por el ORM.
+    """
+    diario = defaultdict(lambda: defaultdict(int))
+    mensual = defaultdict(lambda: defaultdict(int))
+    for modelo, valores, signo in cambios:
+        for deltas, aporte in ((diario, _aporte_diario), (mensual, _aporte_mensual)):
+            clave, incrementos = aporte(modelo, valores, signo)
+            for campo, valor in incrementos.items():
+                deltas[clave][campo] += valor
+    _aplicar_diario(session, diario)
+    _aplicar_mensual(session, mensual)
+    _aplicar_margen(session, diario)
+
+
+def reconstruir_resumen_diario():
+    """Vuelve a calcular resumen_diario desde cero a partir de ventas y gastos."""
+    ventas = select(
+        Venta.restaurante_id, Venta.fecha,
+        func.sum(Venta.monto_cent).label("total_ventas_cent"),
+        literal(0).label("total_gastos_cent"),
+        func.count().label("num_ventas"),
+        literal(0).label("num_gastos")
+    ).group_by(Venta.restaurante_id, Venta.fecha)
+
+    gastos = select(
+        Gasto.restaurante_id, Gasto.fecha,
+        literal(0).label("total_ventas_cent"),
+        func.sum(Gasto.monto_cent).label("total_gastos_cent"),
+        literal(0).label("num_ventas"),
+        func.count().label("num_gastos")
+    ).group_by(Gasto.restaurante_id, Gasto.fecha)
+
+    union = union_all(ventas, gastos).subquery()
+    agregado = select(
+        union.c.restaurante_id, union.c.fecha,
+        func.sum(union.c.total_ventas_cent), func.sum(union.c.total_gastos_cent),
+        func.sum(union.c.num_ventas), func.sum(union.c.num_gastos)
+    ).group_by(union.c.restaurante_id, union.c.fecha)
+
+    tabla = ResumenDiario.__table__
+    db.session.execute(delete(tabla))
+    db.session.execute(insert(tabla).from_select(
+        ["restaurante_id", "fecha", "total_ventas_cent", "total_gastos_cent",
+         "num_ventas", "num_gastos"], agregado))
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(tabla))
+
+
+def reconstruir_resumen_mensual():
+    """Vuelve a calcular resumen_mensual desde cero a partir de ventas y gastos."""
+    anio_venta = cast(extract("year", Venta.fecha), Integer)
+    mes_venta = cast(extract("month", Venta.fecha), Integer)
+    ventas = select(
+        literal("venta"), Venta.restaurante_id, anio_venta, mes_venta,
+        literal(""), literal(0), func.sum(Venta.monto_cent), func.count()
+    ).group_by(Venta.restaurante_id, anio_venta, mes_venta)
+
+    anio_gasto = cast(extract("year", Gasto.fecha), Integer)
+    mes_gasto = cast(extract("month", Gasto.fecha), Integer)
+    categoria = func.coalesce(Gasto.categoria, "")
+    gastos = select(
+        literal("gasto"), Gasto.restaurante_id, anio_gasto, mes_gasto,
+        categoria, Gasto.proveedor_id, func.sum(Gasto.monto_cent), func.count()
+    ).group_by(Gasto.restaurante_id, anio_gasto, mes_gasto,
+               categoria, Gasto.proveedor_id)
+
+    tabla = ResumenMensual.__table__
+    columnas = ["tipo", "restaurante_id", "anio", "mes", "categoria",
+                "proveedor_id", "total_cent", "cantidad"]
+    db.session.execute(delete(tabla))
+    db.session.execute(insert(tabla).from_select(columnas, ventas))
+    db.session.execute(insert(tabla).from_select(columnas, gastos))
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(tabla))
+
+
+def reconstruir_estado_margen():
+    """
+    Vuelve a calcular estado_margen desde resumen_diario (que debe estar al
+    día) y reevalúa todos los estados sin enviar avisos.
+    """
+    anio = cast(extract("year", ResumenDiario.fecha), Integer)
+    mes = cast(extract("month", ResumenDiario.fecha), Integer)
+    agregado = select(
+        ResumenDiario.restaurante_id, anio, mes,
+        func.sum(ResumenDiario.total_ventas_cent), func.sum(ResumenDiario.total_gastos_cent)
+    ).group_by(ResumenDiario.restaurante_id, anio, mes)
+
+    tabla = EstadoMargen.__table__
+    db.session.execute(delete(tabla))
+    db.session.execute(insert(tabla).from_select(
+        ["restaurante_id", "anio", "mes", "ventas_cent", "gastos_cent"], agregado))
+    restaurantes = db.session.scalars(select(tabla.c.restaurante_id).distinct()).all()
+    reevaluar_restaurantes(db.session, restaurantes)
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(tabla))
+
+
+def totales_mes(restaurante_id, mes, ano):
+    """Devuelve (ventas, gastos) totales del mes para un restaurante."""
+    ventas, gastos = db.session.execute(
+        select(
+            func.coalesce(func.sum(ResumenDiario.total_ventas_cent), 0),
+            func.coalesce(func.sum(ResumenDiario.total_gastos_cent), 0)
+        ).where(
+            ResumenDiario.restaurante_id == restaurante_id,
+            *filtro_mes(ResumenDiario.fecha, mes, ano)
+        )
+    ).one()
+    return a_euros(ventas), a_euros(gastos)
@@ -2,20 +2,37 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 from flask import Flask, request, jsonify, url_for, Blueprint
-from api.models import db, Usuario, Venta, Gasto, FacturaAlbaran, Proveedor, MargenObjetivo, Restaurante
-from api.utils import generate_sitemap, APIException
+from api.models import db, Usuario, Venta, Gasto, FacturaAlbaran, Proveedor, MargenObjetivo, Restaurante, ResumenMensual
+from api.utils import generate_sitemap, APIException, filtro_mes
+from api.resumenes import totales_mes
+from api.dinero import suma_euros
+from api.dashboard import dashboard_restaurante, SECCIONES
+from api.overview import overview_admin, SECCIONES as SECCIONES_OVERVIEW
+from api.series import calcular_serie
+from api.pronostico import proyectar
+from api.margenes import estado_margenes
+from api.paginacion import respuesta_listado
+from api.streaming import json_en_streaming, pide_streaming
+from api.exportar import exportar
+from api.exportar_parquet import exportar_parquet
+from api.cache import cacheado, estadisticas as estadisticas_cache
+from api.versiones import con_etag
+from api.sesion import crear_token, sesion_actual, usuario_actual
 from flask_cors import CORS
-from sqlalchemy import select, func, extract, desc,text
+from sqlalchemy import select, func, desc,text
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required, decode_token
 from werkzeug.security import generate_password_hash, check_password_hash
 from api.mail.mailer import send_reset_email
 import json
 import traceback
-from api.email_utils import send_email
+from api.outbox import encolar_email
+from api.notificaciones import notificar_eventos
+from api.carga_gastos import validar_gastos, insertar_gastos, MAX_FILAS as MAX_FILAS_CARGA
+from api.importar_csv import importar_csv
+from api.ventas import guardar_ventas, validar_ventas, eventos_carga as eventos_carga_ventas, MODOS as MODOS_VENTA, MAX_FILAS as MAX_FILAS_VENTAS, OTRO_RESTAURANTE as VENTA_DE_OTRO_RESTAURANTE
 from datetime import datetime, timedelta, date
-import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 import random
 import unicodedata
 from calendar import monthrange
@@ -24,68 +41,6 @@ from calendar import monthrange
 
 api = Blueprint('api', __name__)
 
-def send_email(to_email, subject, html_content):
-    """
-    Envía un correo utilizando SendGrid.
-    - Usa EMAIL_SENDER como remitente desde .env
-    - Usa SENDGRID_API_KEY para autenticación
-    """
-
-    try:
-        message = Mail(
-            from_email=os.getenv("EMAIL_SENDER", "OhMyChef <ohmychefapp@gmail.com>"),
-            to_emails=to_email,
-            subject=subject,
-            html_content=html_content
-        )
-
-        sg = SendGridAPIClient(os.getenv("SENDGRID_API_KEY"))
-        response = sg.send(message)
-
-        print(f"✅ Correo enviado a {to_email}")
-        return True
-
-    except Exception as e:
-        print("❌ Error al enviar correo:", str(e))
-        return False
-
-def notificar_admin_sobre_evento(tipo, datos):
-    subject = ""
-    html_content = ""
-
-    if tipo == "venta":
-        subject = f"Nueva venta registrada en {datos['restaurante']}"
-        html_content = f"""
-        <h4>📥 Venta registrada:</h4>
-        <ul>
-            <li><strong>Restaurante:</strong> {datos['restaurante']}</li>
-            <li><strong>Monto:</strong> {datos['monto']}€</li>
-            <li><strong>Turno:</strong> {datos['turno']}</li>
-            <li><strong>Fecha:</strong> {datos['fecha']}</li>
-            <li><strong>Usuario:</strong> {datos['usuario']}</li>
-        </ul>
-        """
-
-    elif tipo == "gasto":
-        subject = f"Nuevo gasto registrado en {datos['restaurante']}"
-        html_content = f"""
-        <h4>📤 Gasto registrado:</h4>
-        <ul>
-            <li><strong>Restaurante:</strong> {datos['restaurante']}</li>
-            <li><strong>Proveedor:</strong> {datos['proveedor']}</li>
-            <li><strong>Categoría:</strong> {datos.get('categoria', 'Sin categoría')}</li>
-            <li><strong>Monto:</strong> {datos['monto']}€</li>
-            <li><strong>Fecha:</strong> {datos['fecha']}</li>
-            <li><strong>Usuario:</strong> {datos['usuario']}</li>
-        </ul>
-        """
-
-    admin_email = os.getenv("EMAIL_ADMIN", "admin@ohmychef.com")
-    send_email(admin_email, subject, html_content)
-
-
-
-
 @api.route('/forgot-password', methods=['POST'])
 def forgot_password():
     try:
@@ -138,11 +93,8 @@ def reset_password():
 @api.route('/usuarios', methods=['GET'])
 @jwt_required()
 def get_usuarios():
-    usuarios = Usuario.query.all()
-
-    resultados = []
-    for u in usuarios:
-        resultados.append({
+    def serializar(u):
+        return {
             "id": u.id,
             "nombre": u.nombre,
             "email": u.email,
@@ -150,9 +102,13 @@ def get_usuarios():
             "status": u.status,
             "restaurante_id": u.restaurante_id,
             "restaurante_nombre": u.restaurante.nombre if u.restaurante else None
-        })
+        }
 
-    return jsonify(resultados), 200
+    try:
+        consulta = Usuario.query.options(joinedload(Usuario.restaurante))
+        return respuesta_listado(consulta, Usuario, request.args, serializar)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
 
 @api.route("/register", methods=["POST"])
@@ -170,7 +126,9 @@ def register():
         if total_users > 0:
             if not current_user_id:
                 return jsonify({"error": "No autorizado"}), 403
-            current_user = db.session.get(Usuario, current_user_id)
+            # Rol leído de la base de datos: un admin degradado o borrado
+            # conserva el claim en su token hasta que caduca
+            current_user = usuario_actual()
             if not current_user or current_user.rol != "admin":
                 return jsonify({"error": "Solo el admin puede crear usuarios"}), 403
 
@@ -196,11 +154,8 @@ def register():
             restaurante_id=data.get("restaurante_id")
         )
         db.session.add(new_user)
-        db.session.commit()
-
-        # 📬 Enviar correo con SendGrid
-        from api.email_utils import send_email
 
+        # 📬 Correo de bienvenida (outbox, misma transacción que el usuario)
         subject = "Bienvenido a OhMyChef!"
         html_content = f"""
         <h3>Hola {data['nombre']},</h3>
@@ -223,7 +178,8 @@ def register():
         <p style="font-size:0.8em;color:gray;"><em>Este mensaje ha sido generado automáticamente. No respondas a este correo.</em></p>
         """
 
-        send_email(to_email=data["email"], subject=subject, html_content=html_content)
+        encolar_email(data["email"], subject, html_content)
+        db.session.commit()
 
         return jsonify({"msg": "Usuario creado correctamente"}), 201
 
@@ -258,8 +214,7 @@ def obtener_usuario(id):
 def editar_usuario(id):
     try:
         data = request.json
-        current_user_id = get_jwt_identity()
-        current_user = db.session.get(Usuario, current_user_id)
+        current_user = sesion_actual()
 
         if not current_user or current_user.rol != "admin":
             return jsonify({"error": "Solo el admin puede actualizar usuarios"}), 403
@@ -302,8 +257,7 @@ def editar_usuario(id):
 @jwt_required()
 def eliminar_usuario(id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = db.session.get(Usuario, current_user_id)
+        current_user = usuario_actual()
 
         if not current_user or current_user.rol != "admin":
             return jsonify({"error": "Solo el admin puede eliminar usuarios"}), 403
@@ -313,7 +267,7 @@ def eliminar_usuario(id):
         if not user_to_delete:
             return jsonify({"error": "Usuario no encontrado"}), 404
 
-        if user_to_delete.id == current_user_id:
+        if user_to_delete.id == current_user.id:
             return jsonify({"error": "No puedes eliminar tu propia cuenta de administrador"}), 400
 
         db.session.delete(user_to_delete)
@@ -326,20 +280,21 @@ def eliminar_usuario(id):
 
 @api.route('/ventas', methods=['GET'])
 @jwt_required()
+@con_etag(None, por_usuario=False)
 def get_ventas():
-    ventas = Venta.query.all()
-
-    resultados = []
-    for v in ventas:
-        resultados.append({
+    def serializar(v):
+        return {
             "id": v.id,
             "fecha": v.fecha.isoformat(),
             "monto": v.monto,
             "turno": v.turno,
             "restaurante_id": v.restaurante_id
-        })
+        }
 
-    return jsonify(resultados), 200
+    try:
+        return respuesta_listado(Venta.query, Venta, request.args, serializar)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
     # AUTENTCACION JWT - AUTENTCACION JWT - AUTENTCACION JWT- AUTENTCACION JWT - AUTENTCACION JWT - AUTENTCACION JWT
     # - AUTENTCACION JWT - AUTENTCACION JWT - AUTENTCACION JWT - AUTENTCACION JWT
@@ -362,7 +317,7 @@ def login():
         if not check_password_hash(user.password, data["password"]):
             return jsonify({"success": False, "msg": "Email o contraseña incorrectos"}), 401
 
-        token = create_access_token(identity=str(user.id))
+        token = crear_token(user)
 
         data = user.serialize()
 
@@ -389,55 +344,55 @@ def crear_venta():
     if not data:
         return jsonify({"msg": "Datos no recibidos"}), 400
 
-    fecha = data.get("fecha")
-    monto = data.get("monto")
-    turno = data.get("turno")
-    restaurante_id = data.get("restaurante_id")
+    # Lista de ventas (varios turnos o relleno de meses anteriores)
+    if isinstance(data, list) or isinstance(data.get("ventas"), list):
+        return crear_ventas_lote(data)
 
-    if not fecha or not monto or not restaurante_id:
-        return jsonify({"msg": "Faltan campos obligatorios"}), 400
+    sesion = sesion_actual()
+    if sesion is None:
+        return jsonify({"msg": "Usuario no encontrado"}), 404
+
+    # Si ya hay venta para ese día y turno: rechazar (409), reemplazar o acumular
+    modo = data.get("modo") or request.args.get("modo", "rechazar")
+    if modo not in MODOS_VENTA:
+        return jsonify({"msg": f"Modo no válido. Opciones: {', '.join(MODOS_VENTA)}"}), 400
+
+    # Misma validación y permisos que el alta por lotes
+    validas, errores = validar_ventas([data], sesion)
+    if errores:
+        errores = errores[0]["errores"]
+        codigo = 403 if VENTA_DE_OTRO_RESTAURANTE in errores else 400
+        return jsonify({"msg": errores[0], "errores": errores}), codigo
+    venta = validas[0][1]
 
     try:
-        # Validar duplicados por fecha, turno y restaurante
-        venta_existente = db.session.query(Venta).filter_by(
-            fecha=fecha,
-            turno=turno,
-            restaurante_id=restaurante_id
-        ).first()
+        # El índice único decide si la venta ya existe (sin SELECT previo)
+        estado = guardar_ventas([venta], modo)[0]
 
-        if venta_existente:
+        if estado == "duplicada":
+            db.session.rollback()
             return jsonify({"msg": "Ya existe una venta para este día y turno"}), 409
 
-        nueva_venta = Venta(
-            fecha=fecha,
-            monto=monto,
-            turno=turno,
-            restaurante_id=restaurante_id
-        )
-        db.session.add(nueva_venta)
-        db.session.commit()
-
-        # 📨 Notificación protegida
+        # 📨 Notificación protegida (outbox, se confirma junto a la venta)
         try:
-            restaurante = Restaurante.query.get(restaurante_id)
-            usuario = Usuario.query.get(get_jwt_identity())
-
-            print("✅ Venta registrada correctamente:")
-            print("  Restaurante:", restaurante.nombre if restaurante else "Desconocido")
-            print("  Usuario:", usuario.nombre if usuario else "Sistema")
-
-            notificar_admin_sobre_evento("venta", {
-                "restaurante": restaurante.nombre if restaurante else "Desconocido",
-                "monto": monto,
-                "turno": turno,
-                "fecha": fecha,
-                "usuario": usuario.nombre if usuario else "Sistema"
-            })
+            notificar_eventos("venta", [{
+                "restaurante_id": venta["restaurante_id"],
+                "usuario_id": sesion.id,
+                "monto": venta["monto"],
+                "turno": venta["turno"],
+                "fecha": venta["fecha"].isoformat()
+            }])
         except Exception as e:
             print("⚠️ Error al notificar al admin:", str(e))
 
-        return jsonify({"msg": "Venta creada correctamente"}), 201
+        db.session.commit()
+        if estado == "creada":
+            return jsonify({"msg": "Venta creada correctamente", "estado": estado}), 201
+        return jsonify({"msg": f"Venta {estado} correctamente", "estado": estado}), 200
 
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"msg": "Datos no válidos", "error": str(e)}), 400
     except Exception as e:
         db.session.rollback()
         print("❌ ERROR en /ventas:", str(e))
@@ -445,6 +400,60 @@ def crear_venta():
 
 
 
+def crear_ventas_lote(data):
+    """
+    Alta masiva de ventas en una transacción. Acepta una lista o
+    {"ventas": [...], "modo": ...}. Las filas con errores se saltan y cada
+    fila recibe su estado: creada, duplicada, reemplazada, acumulada o error.
+    """
+    sesion = sesion_actual()
+    if sesion is None:
+        return jsonify({"msg": "Usuario no encontrado"}), 404
+
+    filas = data if isinstance(data, list) else data["ventas"]
+    modo = (data.get("modo") if isinstance(data, dict) else None) or request.args.get("modo", "rechazar")
+    if modo not in MODOS_VENTA:
+        return jsonify({"msg": f"Modo no válido. Opciones: {', '.join(MODOS_VENTA)}"}), 400
+    if not filas:
+        return jsonify({"msg": "La lista de ventas está vacía"}), 400
+    if len(filas) > MAX_FILAS_VENTAS:
+        return jsonify({"msg": f"Máximo {MAX_FILAS_VENTAS} ventas por petición"}), 413
+
+    validas, errores = validar_ventas(filas, sesion)
+    resultados = [{"fila": e["fila"], "estado": "error", "errores": e["errores"]} for e in errores]
+
+    try:
+        estados = guardar_ventas([venta for _, venta in validas], modo)
+        resultados += [{"fila": indice, "estado": estado}
+                       for (indice, _), estado in zip(validas, estados)]
+        resultados.sort(key=lambda r: r["fila"])
+
+        guardadas = [venta for (_, venta), estado in zip(validas, estados) if estado != "duplicada"]
+        # 📨 Un único aviso por restaurante para todo el lote
+        if guardadas:
+            try:
+                notificar_eventos("carga_ventas", eventos_carga_ventas(guardadas, sesion.id))
+            except Exception as error_envio:
+                print("❌ Error al enviar notificación de ventas (lote):", str(error_envio))
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print("❌ ERROR en ventas (lote):", str(e))
+        return jsonify({"msg": "Error al registrar ventas", "error": str(e)}), 500
+
+    totales = {estado: sum(1 for r in resultados if r["estado"] == estado)
+               for estado in ("creada", "duplicada", "reemplazada", "acumulada", "error")}
+    if totales["creada"]:
+        codigo = 201
+    elif guardadas:
+        codigo = 200
+    else:
+        codigo = 409 if totales["duplicada"] else 400
+    return jsonify({"msg": "Ventas procesadas", "modo": modo, "totales": totales,
+                    "resultados": resultados}), codigo
+
+
 @api.route('/ventas/<int:id>', methods=['GET'])
 @jwt_required()
 def obtener_venta(id):
@@ -484,6 +493,9 @@ def editar_venta(id):
     try:
         db.session.commit()
         return jsonify({"msg": "Venta actualizada"}), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"msg": "Ya existe una venta para este día y turno"}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "Error al actualizar la venta", "error": str(e)}), 500
@@ -508,12 +520,10 @@ def eliminar_venta(id):
 
 @api.route('/gastos', methods=['GET'])
 @jwt_required()
+@con_etag(None, por_usuario=False)
 def get_gastos():
-    gastos = Gasto.query.all()
-
-    resultados = []
-    for g in gastos:
-        resultados.append({
+    def serializar(g):
+        return {
             "id": g.id,
             "fecha": g.fecha.isoformat(),
             "monto": g.monto,
@@ -523,9 +533,12 @@ def get_gastos():
             "restaurante_id": g.restaurante_id,
             "nota": g.nota,
             "archivo_adjunto": g.archivo_adjunto
-        })
+        }
 
-    return jsonify(resultados), 200
+    try:
+        return respuesta_listado(Gasto.query, Gasto, request.args, serializar)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
 
 @api.route('/gastos', methods=['POST'])
@@ -538,6 +551,7 @@ def crear_gasto():
 
     if isinstance(data, list):
         try:
+            eventos = []
             for g in data:
                 if not g.get("fecha") or not g.get("monto") or not g.get("proveedor_id") or not g.get("usuario_id") or not g.get("restaurante_id"):
                     return jsonify({"msg": "Faltan campos obligatorios en uno de los gastos"}), 400
@@ -553,25 +567,20 @@ def crear_gasto():
                     archivo_adjunto=g.get("archivo_adjunto")
                 )
                 db.session.add(nuevo_gasto)
+                eventos.append({
+                    "restaurante_id": g["restaurante_id"],
+                    "usuario_id": g["usuario_id"],
+                    "proveedor_id": g["proveedor_id"],
+                    "categoria": g.get("categoria"),
+                    "monto": g["monto"],
+                    "fecha": g["fecha"]
+                })
 
-                # 📨 Notificación individual
-                try:
-                    restaurante = Restaurante.query.get(g["restaurante_id"])
-                    usuario = Usuario.query.get(g["usuario_id"])
-                    proveedor = Proveedor.query.get(g["proveedor_id"])
-
-                    print("📤 Gasto lote:", g["monto"], "→", restaurante.nombre)
-
-                    notificar_admin_sobre_evento("gasto", {
-                        "restaurante": restaurante.nombre if restaurante else "Desconocido",
-                        "proveedor": proveedor.nombre if proveedor else "Sin proveedor",
-                        "categoria": g.get("categoria"),
-                        "monto": g["monto"],
-                        "fecha": g["fecha"],
-                        "usuario": usuario.nombre if usuario else "Sistema"
-                    })
-                except Exception as error_envio:
-                    print("❌ Error al enviar notificación del gasto (lote):", str(error_envio))
+            # 📨 Un único correo por restaurante para todo el lote
+            try:
+                notificar_eventos("gasto", eventos)
+            except Exception as error_envio:
+                print("❌ Error al enviar notificación del gasto (lote):", str(error_envio))
 
             db.session.commit()
             return jsonify({"msg": "Gastos registrados correctamente"}), 201
@@ -606,28 +615,21 @@ def crear_gasto():
                 archivo_adjunto=archivo_adjunto
             )
             db.session.add(nuevo_gasto)
-            db.session.commit()
 
-            # 📨 Notificación individual
+            # 📨 Notificación individual (outbox, se confirma junto al gasto)
             try:
-                restaurante = Restaurante.query.get(restaurante_id)
-                usuario = Usuario.query.get(usuario_id)
-                proveedor = Proveedor.query.get(proveedor_id)
-
-                print("📤 Gasto individual:", monto, "→", restaurante.nombre)
-                print("✅ Gasto registrado como:", usuario.nombre if usuario else "Sistema")
-
-                notificar_admin_sobre_evento("gasto", {
-                    "restaurante": restaurante.nombre if restaurante else "Desconocido",
-                    "proveedor": proveedor.nombre if proveedor else "Sin proveedor",
+                notificar_eventos("gasto", [{
+                    "restaurante_id": restaurante_id,
+                    "usuario_id": usuario_id,
+                    "proveedor_id": proveedor_id,
                     "categoria": categoria,
                     "monto": monto,
-                    "fecha": fecha,
-                    "usuario": usuario.nombre if usuario else "Sistema"
-                })
+                    "fecha": fecha
+                }])
             except Exception as error_envio:
                 print("❌ Error al enviar notificación del gasto:", str(error_envio))
 
+            db.session.commit()
             return jsonify({"msg": "Gasto registrado correctamente"}), 201
 
         except Exception as e:
@@ -636,6 +638,45 @@ def crear_gasto():
             return jsonify({"msg": "Error al registrar el gasto", "error": str(e)}), 500
 
 
+@api.route('/gastos/lote', methods=['POST'])
+@jwt_required()
+def crear_gastos_lote():
+    """
+    Carga masiva de gastos: valida todo el lote y, si no hay errores, lo
+    inserta en una sola transacción. Con errores no se guarda nada y se
+    devuelve el detalle por fila.
+    """
+    sesion = sesion_actual()
+    if sesion is None:
+        return jsonify({"msg": "Usuario no encontrado"}), 404
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("gastos")
+    if not isinstance(data, list) or not data:
+        return jsonify({"msg": "Se esperaba una lista de gastos"}), 400
+    if len(data) > MAX_FILAS_CARGA:
+        return jsonify({"msg": f"Máximo {MAX_FILAS_CARGA} gastos por carga"}), 413
+
+    gastos, errores = validar_gastos(data, sesion)
+    if errores:
+        return jsonify({
+            "msg": "Hay gastos con errores, no se ha guardado ninguno",
+            "total": len(data),
+            "con_errores": len(errores),
+            "errores": errores
+        }), 400
+
+    try:
+        insertados = insertar_gastos(gastos, usuario_id=sesion.id)
+        db.session.commit()
+        return jsonify({"msg": "Gastos registrados correctamente", "insertados": insertados}), 201
+    except Exception as e:
+        db.session.rollback()
+        print("❌ ERROR en carga masiva de gastos:", str(e))
+        return jsonify({"msg": "Error al registrar gastos", "error": str(e)}), 500
+
+
 
 
 @api.route('/gastos/<int:id>', methods=['GET'])
@@ -716,21 +757,22 @@ def eliminar_gastos_por_usuario(usuario_id):
 
 @api.route('/facturas', methods=['GET'])
 @jwt_required()
+@con_etag(None, por_usuario=False)
 def get_facturas():
-    facturas = FacturaAlbaran.query.all()
-
-    resultados = []
-    for f in facturas:
-        resultados.append({
+    def serializar(f):
+        return {
             "id": f.id,
             "proveedor_id": f.proveedor_id,
             "restaurante_id": f.restaurante_id,
             "fecha": f.fecha.isoformat(),
             "monto": f.monto,
             "descripcion": f.descripcion
-        })
+        }
 
-    return jsonify(resultados), 200
+    try:
+        return respuesta_listado(FacturaAlbaran.query, FacturaAlbaran, request.args, serializar)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
 
 @api.route('/facturas', methods=['POST'])
@@ -831,15 +873,10 @@ def eliminar_factura(id):
 
 @api.route('/proveedores', methods=['GET'])
 @jwt_required()
+@con_etag(None, por_usuario=False)
 def get_proveedores():
-    restaurante_id = request.args.get("restaurante_id", type=int)
-    if restaurante_id:
-        proveedores = Proveedor.query.filter_by(restaurante_id=restaurante_id).all()
-    else:
-        
-        proveedores = Proveedor.query.all()
-    resultados = [
-        {
+    def serializar(p):
+        return {
             "id": p.id,
             "nombre": p.nombre,
             "categoria": p.categoria,
@@ -847,9 +884,11 @@ def get_proveedores():
             "telefono": p.telefono,
             "direccion": p.direccion
         }
-        for p in proveedores
-    ]
-    return jsonify(resultados), 200
+
+    try:
+        return respuesta_listado(Proveedor.query, Proveedor, request.args, serializar)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
 
 @api.route('/proveedores', methods=['POST'])
@@ -952,18 +991,18 @@ def eliminar_proveedor(id):
 @api.route('/margen', methods=['GET'])
 @jwt_required()
 def get_margen():
-    margenes = MargenObjetivo.query.all()
-
-    resultados = []
-    for m in margenes:
-        resultados.append({
+    def serializar(m):
+        return {
             "id": m.id,
             "restaurante_id": m.restaurante_id,
             "porcentaje_min": m.porcentaje_min,
             "porcentaje_max": m.porcentaje_max
-        })
+        }
 
-    return jsonify(resultados), 200
+    try:
+        return respuesta_listado(MargenObjetivo.query, MargenObjetivo, request.args, serializar)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
 
 @api.route('/margen', methods=['POST'])
@@ -1054,6 +1093,38 @@ def eliminar_margen(id):
         return jsonify({"msg": "Error al eliminar margen", "error": str(e)}), 500
 
 
+@api.route('/margen/estado', methods=['GET'])
+@jwt_required()
+def estado_margen():
+    """
+    Estado de cada restaurante frente a su margen objetivo en el mes
+    (por_debajo, dentro, por_encima, sin_ventas o sin_objetivo), con el gasto
+    sobre ventas acumulado. Parámetros: mes y ano (por defecto el actual).
+    Se lee de estado_margen, que se actualiza con cada venta o gasto.
+    """
+    try:
+        usuario = sesion_actual()
+        if not usuario:
+            return jsonify({"msg": "Usuario no válido"}), 404
+
+        hoy = date.today()
+        mes = request.args.get("mes", hoy.month, type=int)
+        ano = request.args.get("ano", hoy.year, type=int)
+        if not 1 <= mes <= 12:
+            return jsonify({"msg": "Mes no válido"}), 400
+
+        # Chef y encargado solo ven su restaurante
+        restaurante_id = None
+        if usuario.rol != "admin":
+            if not usuario.restaurante_id:
+                return jsonify({"msg": "Usuario sin restaurante asignado"}), 403
+            restaurante_id = usuario.restaurante_id
+        return jsonify(estado_margenes(ano, mes, restaurante_id)), 200
+
+    except Exception as e:
+        return jsonify({"msg": "Error al calcular el estado de los márgenes", "error": str(e)}), 500
+
+
 @api.route('/restaurantes', methods=['GET'])
 @jwt_required()
 def get_restaurantes():
@@ -1160,9 +1231,7 @@ def editar_restaurante(id):
 @jwt_required()
 def eliminar_restaurante(id):
     try:
-        current_user_id = get_jwt_identity()
-        current_user = db.session.get(Usuario, current_user_id)
-
+        current_user = usuario_actual()
         if not current_user or current_user.rol != "admin":
             return jsonify({"error": "Solo el admin puede eliminar restaurantes"}), 403
 
@@ -1199,10 +1268,11 @@ def eliminar_restaurante(id):
 
 @api.route("/gastos/resumen-mensual", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def resumen_gastos_mensual():
     try:
-        user_id = int(get_jwt_identity())
-        usuario = db.session.query(Usuario).get(user_id)
+        usuario = sesion_actual()
 
         if not usuario:
             return jsonify({"msg": "Usuario no encontrado"}), 404
@@ -1215,42 +1285,8 @@ def resumen_gastos_mensual():
         if not mes or not anio:
             return jsonify({"msg": "Mes y año son requeridos"}), 400
 
-        gastos = db.session.query(
-            Proveedor.nombre.label("proveedor"),
-            extract("day", Gasto.fecha).label("dia"),
-            func.sum(Gasto.monto).label("total")
-        ).join(Proveedor).filter(
-            Gasto.restaurante_id == restaurante_id,
-            extract("month", Gasto.fecha) == mes,
-            extract("year", Gasto.fecha) == anio
-        ).group_by(Proveedor.nombre, extract("day", Gasto.fecha)).all()
-
-        # Organizar datos en formato tipo tabla
-        resumen = {}
-        totales = {}
-        proveedores = set()
-        dias = set()
-
-        for fila in gastos:
-            proveedor = fila.proveedor
-            dia = int(fila.dia)
-            monto = float(fila.total)
-
-            proveedores.add(proveedor)
-            dias.add(dia)
-
-            if proveedor not in resumen:
-                resumen[proveedor] = {}
-            resumen[proveedor][dia] = monto
-
-            totales[proveedor] = totales.get(proveedor, 0) + monto
-
-        return jsonify({
-            "proveedores": sorted(proveedores),
-            "dias": sorted(dias),
-            "datos": resumen,
-            "totales": totales
-        }), 200
+        resultado = dashboard_restaurante(restaurante_id, mes, anio, {"resumen_mensual"})
+        return jsonify(resultado["resumen_mensual"]), 200
 
     except Exception as e:
         return jsonify({"msg": "Error interno", "error": str(e)}), 500
@@ -1266,8 +1302,7 @@ def cambiar_password():
     if not actual or not nueva:
         return jsonify({"msg": "Faltan datos"}), 400
 
-    user_id = get_jwt_identity()
-    user = Usuario.query.get(user_id)
+    user = usuario_actual()
 
     if not user:
         return jsonify({"msg": "Usuario no encontrado"}), 404
@@ -1283,10 +1318,11 @@ def cambiar_password():
 
 @api.route("/gastos/porcentaje-mensual", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def porcentaje_gasto_mensual():
     try:
-        user_id = int(get_jwt_identity())
-        usuario = Usuario.query.get(user_id)
+        usuario = sesion_actual()
         if not usuario or not usuario.restaurante_id:
             return jsonify({"msg": "Usuario no válido"}), 404
 
@@ -1297,30 +1333,8 @@ def porcentaje_gasto_mensual():
         if not mes or not anio:
             return jsonify({"msg": "Mes y año requeridos"}), 400
 
-        total_gastos = db.session.query(
-            func.sum(Gasto.monto)
-        ).filter(
-            Gasto.restaurante_id == restaurante_id,
-            extract("month", Gasto.fecha) == mes,
-            extract("year", Gasto.fecha) == anio
-        ).scalar() or 0
-
-        total_ventas = db.session.query(
-            func.sum(Venta.monto)
-        ).filter(
-            Venta.restaurante_id == restaurante_id,
-            extract("month", Venta.fecha) == mes,
-            extract("year", Venta.fecha) == anio
-        ).scalar() or 0
-
-        porcentaje = round((total_gastos / total_ventas)
-                           * 100, 2) if total_ventas else 0
-
-        return jsonify({
-            "gastos": round(total_gastos, 2),
-            "ventas": round(total_ventas, 2),
-            "porcentaje": porcentaje
-        }), 200
+        resultado = dashboard_restaurante(restaurante_id, mes, anio, {"porcentaje"})
+        return jsonify(resultado["porcentaje"]), 200
 
     except Exception as e:
         return jsonify({"msg": "Error interno", "error": str(e)}), 500
@@ -1330,17 +1344,7 @@ def porcentaje_gasto_mensual():
 @jwt_required()
 def resumen_porcentaje(restaurante_id, mes, ano):
 
-    ventas = db.session.query(func.sum(Venta.monto)).filter(
-        Venta.restaurante_id == restaurante_id,
-        extract('month', Venta.fecha) == mes,
-        extract('year', Venta.fecha) == ano
-    ).scalar() or 0
-
-    gastos = db.session.query(func.sum(Gasto.monto)).filter(
-        Gasto.restaurante_id == restaurante_id,
-        extract('month', Gasto.fecha) == mes,
-        extract('year', Gasto.fecha) == ano
-    ).scalar() or 0
+    ventas, gastos = totales_mes(restaurante_id, mes, ano)
 
     porcentaje = round((gastos / ventas) * 100, 2) if ventas > 0 else 0
 
@@ -1353,10 +1357,11 @@ def resumen_porcentaje(restaurante_id, mes, ano):
 
 @api.route("/gastos/resumen-diario", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def resumen_diario_chef_encargado():
     try:
-        user_id = int(get_jwt_identity())
-        usuario = Usuario.query.get(user_id)
+        usuario = sesion_actual()
 
         if not usuario or not usuario.restaurante_id:
             return jsonify({"msg": "Usuario no válido"}), 404
@@ -1368,56 +1373,50 @@ def resumen_diario_chef_encargado():
         if not mes or not ano:
             return jsonify({"msg": "Faltan parámetros"}), 400
 
-        ventas_diarias = db.session.query(
-            extract("day", Venta.fecha).label("dia"),
-            func.sum(Venta.monto).label("ventas")
-        ).filter(
-            Venta.restaurante_id == restaurante_id,
-            extract("month", Venta.fecha) == mes,
-            extract("year", Venta.fecha) == ano
-        ).group_by(
-            extract("day", Venta.fecha)
-        ).all()
+        resultado = dashboard_restaurante(restaurante_id, mes, ano, {"resumen_diario"})
+        return jsonify(resultado["resumen_diario"]), 200
 
-        gastos_diarios = db.session.query(
-            extract("day", Gasto.fecha).label("dia"),
-            func.sum(Gasto.monto).label("gastos")
-        ).filter(
-            Gasto.restaurante_id == restaurante_id,
-            extract("month", Gasto.fecha) == mes,
-            extract("year", Gasto.fecha) == ano
-        ).group_by(
-            extract("day", Gasto.fecha)
-        ).all()
+    except Exception as e:
+        return jsonify({"msg": "Error interno", "error": str(e)}), 500
 
-        resumen = []
-        dias = set()
 
-        ventas_dict = {int(v.dia): float(v.ventas) for v in ventas_diarias}
-        gastos_dict = {int(g.dia): float(g.gastos) for g in gastos_diarios}
-        dias.update(ventas_dict.keys())
-        dias.update(gastos_dict.keys())
+@api.route("/dashboard/restaurante", methods=["GET"])
+@jwt_required()
+@con_etag()
+@cacheado()
+def dashboard_restaurante_endpoint():
+    try:
+        usuario = sesion_actual()
+        if not usuario:
+            return jsonify({"msg": "Usuario no válido"}), 404
 
-        for dia in sorted(dias):
-            ventas = ventas_dict.get(dia, 0)
-            gastos = gastos_dict.get(dia, 0)
-            porcentaje = round((gastos / ventas) * 100, 2) if ventas > 0 else 0
+        # El admin puede consultar cualquier restaurante
+        restaurante_id = usuario.restaurante_id
+        if usuario.rol == "admin":
+            restaurante_id = request.args.get("restaurante_id", type=int)
+        if not restaurante_id:
+            return jsonify({"msg": "Restaurante no indicado"}), 400
 
-            resumen.append({
-                "dia": dia,
-                "ventas": ventas,
-                "gastos": gastos,
-                "porcentaje": porcentaje
-            })
+        mes = request.args.get("mes", type=int)
+        ano = request.args.get("ano", type=int)
+        if not mes or not ano:
+            return jsonify({"msg": "Mes y año requeridos"}), 400
 
-        return jsonify(resumen), 200
+        secciones = request.args.get("secciones")
+        secciones = [s.strip() for s in secciones.split(",") if s.strip()] if secciones else SECCIONES
+
+        return jsonify(dashboard_restaurante(restaurante_id, mes, ano, secciones)), 200
 
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
     except Exception as e:
         return jsonify({"msg": "Error interno", "error": str(e)}), 500
 
 
 @api.route("/admin/gastos/resumen-diario", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def resumen_diario_admin():
     try:
         restaurante_id = request.args.get("restaurante_id", type=int)
@@ -1427,49 +1426,8 @@ def resumen_diario_admin():
         if not restaurante_id or not mes or not ano:
             return jsonify({"msg": "Faltan parámetros"}), 400
 
-        ventas_diarias = db.session.query(
-            extract("day", Venta.fecha).label("dia"),
-            func.sum(Venta.monto).label("ventas")
-        ).filter(
-            Venta.restaurante_id == restaurante_id,
-            extract("month", Venta.fecha) == mes,
-            extract("year", Venta.fecha) == ano
-        ).group_by(
-            extract("day", Venta.fecha)
-        ).all()
-
-        gastos_diarios = db.session.query(
-            extract("day", Gasto.fecha).label("dia"),
-            func.sum(Gasto.monto).label("gastos")
-        ).filter(
-            Gasto.restaurante_id == restaurante_id,
-            extract("month", Gasto.fecha) == mes,
-            extract("year", Gasto.fecha) == ano
-        ).group_by(
-            extract("day", Gasto.fecha)
-        ).all()
-
-        resumen = []
-        dias = set()
-
-        ventas_dict = {int(v.dia): float(v.ventas) for v in ventas_diarias}
-        gastos_dict = {int(g.dia): float(g.gastos) for g in gastos_diarios}
-        dias.update(ventas_dict.keys())
-        dias.update(gastos_dict.keys())
-
-        for dia in sorted(dias):
-            ventas = ventas_dict.get(dia, 0)
-            gastos = gastos_dict.get(dia, 0)
-            porcentaje = round((gastos / ventas) * 100, 2) if ventas > 0 else 0
-
-            resumen.append({
-                "dia": dia,
-                "ventas": ventas,
-                "gastos": gastos,
-                "porcentaje": porcentaje
-            })
-
-        return jsonify(resumen), 200
+        resultado = dashboard_restaurante(restaurante_id, mes, ano, {"resumen_diario"})
+        return jsonify(resultado["resumen_diario"]), 200
 
     except Exception as e:
         return jsonify({"msg": "Error interno", "error": str(e)}), 500
@@ -1477,10 +1435,11 @@ def resumen_diario_admin():
 
 @api.route('/gastos/categorias-resumen', methods=['GET'])
 @jwt_required()
+@con_etag()
+@cacheado()
 def gastos_por_categoria():
     try:
-        user_id = int(get_jwt_identity())
-        usuario = Usuario.query.get(user_id)
+        usuario = sesion_actual()
 
         if not usuario or not usuario.restaurante_id:
             return jsonify({"msg": "Usuario no válido"}), 404
@@ -1492,19 +1451,8 @@ def gastos_por_categoria():
         if not mes or not ano:
             return jsonify({"msg": "Mes y año requeridos"}), 400
 
-        resumen = db.session.query(
-            Gasto.categoria,
-            func.sum(Gasto.monto).label("total")
-        ).filter(
-            Gasto.restaurante_id == restaurante_id,
-            extract("month", Gasto.fecha) == mes,
-            extract("year", Gasto.fecha) == ano
-        ).group_by(Gasto.categoria).all()
-
-        resultado = [{"categoria": r.categoria or "Sin categoría",
-                      "total": float(r.total)} for r in resumen]
-
-        return jsonify(resultado), 200
+        resultado = dashboard_restaurante(restaurante_id, mes, ano, {"categorias"})
+        return jsonify(resultado["categorias"]), 200
 
     except Exception as e:
         return jsonify({"msg": "Error interno", "error": str(e)}), 500
@@ -1512,10 +1460,11 @@ def gastos_por_categoria():
 
 @api.route("/ventas/resumen-diario", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def resumen_ventas_diario():
     try:
-        user_id = int(get_jwt_identity())
-        usuario = Usuario.query.get(user_id)
+        usuario = sesion_actual()
 
         if not usuario or not usuario.restaurante_id:
             return jsonify({"msg": "Usuario no válido"}), 404
@@ -1527,30 +1476,50 @@ def resumen_ventas_diario():
         if not mes or not ano:
             return jsonify({"msg": "Mes y año requeridos"}), 400
 
-        ventas_diarias = db.session.query(
-            extract("day", Venta.fecha).label("dia"),
-            func.sum(Venta.monto).label("monto")
-        ).filter(
-            Venta.restaurante_id == restaurante_id,
-            extract("month", Venta.fecha) == mes,
-            extract("year", Venta.fecha) == ano
-        ).group_by(
-            extract("day", Venta.fecha)
-        ).order_by(
-            extract("day", Venta.fecha)
-        ).all()
+        resultado = dashboard_restaurante(restaurante_id, mes, ano, {"ventas_diarias"})
+        return jsonify(resultado["ventas_diarias"]), 200
 
-        resultado = [{"dia": int(row.dia), "monto": float(row.monto)}
-                     for row in ventas_diarias]
+    except Exception as e:
+        return jsonify({"msg": "Error interno", "error": str(e)}), 500
 
-        return jsonify(resultado), 200
 
+@api.route('/admin/overview', methods=['GET'])
+@jwt_required()
+@con_etag()
+@cacheado()
+def overview_admin_endpoint():
+    try:
+        usuario = sesion_actual()
+        if not usuario or usuario.rol != "admin":
+            return jsonify({"msg": "No autorizado"}), 403
+
+        mes = int(request.args.get("mes", datetime.now().month))
+        ano = int(request.args.get("ano", datetime.now().year))
+
+        secciones = request.args.get("secciones")
+        secciones = [s.strip() for s in secciones.split(",") if s.strip()] if secciones else SECCIONES_OVERVIEW
+
+        return jsonify(overview_admin(mes, ano, secciones)), 200
+
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
     except Exception as e:
-        return jsonify({"msg": "Error interno", "error": str(e)}), 500
+        return jsonify({"msg": "Error al generar el resumen", "error": str(e)}), 500
+
+
+@api.route('/admin/cache', methods=['GET'])
+@jwt_required()
+def estado_cache():
+    usuario = sesion_actual()
+    if not usuario or usuario.rol != "admin":
+        return jsonify({"msg": "No autorizado"}), 403
+    return jsonify(estadisticas_cache()), 200
 
 
 @api.route('/admin/resumen-general', methods=['GET'])
 @jwt_required()
+@con_etag()
+@cacheado()
 def resumen_general_admin():
     try:
         # Obtener mes y año actual si no se pasan como query
@@ -1558,37 +1527,7 @@ def resumen_general_admin():
         mes = int(request.args.get("mes", datetime.now().month))
         anio = int(request.args.get("ano", datetime.now().year))
 
-        restaurantes = Restaurante.query.all()
-        resumen = []
-
-        for r in restaurantes:
-            # Ventas totales del mes
-            total_ventas = db.session.query(
-                db.func.sum(Venta.monto)
-            ).filter(
-                Venta.restaurante_id == r.id,
-                db.extract("month", Venta.fecha) == mes,
-                db.extract("year", Venta.fecha) == anio
-            ).scalar() or 0
-
-            # Gastos totales del mes
-            total_gastos = db.session.query(
-                db.func.sum(Gasto.monto)
-            ).filter(
-                Gasto.restaurante_id == r.id,
-                db.extract("month", Gasto.fecha) == mes,
-                db.extract("year", Gasto.fecha) == anio
-            ).scalar() or 0
-
-            porcentaje_gasto = round(
-                (total_gastos / total_ventas) * 100, 2) if total_ventas > 0 else 0
-
-            resumen.append({
-                "restaurante_id": r.id,
-                "nombre": r.nombre,
-                "venta_total": round(total_ventas, 2),
-                "porcentaje_gasto": porcentaje_gasto
-            })
+        resumen = overview_admin(mes, anio, {"resumen_general"})["resumen_general"]
 
         return jsonify(resumen), 200
 
@@ -1596,8 +1535,168 @@ def resumen_general_admin():
         return jsonify({"msg": "Error al generar el resumen", "error": str(e)}), 500
 
 
+@api.route("/series", methods=["GET"])
+@jwt_required()
+def series():
+    try:
+        usuario = sesion_actual()
+        if not usuario:
+            return jsonify({"msg": "Usuario no válido"}), 404
+
+        metrica = request.args.get("metrica", "ventas")
+        granularidad = request.args.get("granularidad", "dia")
+        agrupar = request.args.get("agrupar") or None
+        restaurante_id = request.args.get("restaurante_id", type=int)
+        desde = request.args.get("desde")
+        hasta = request.args.get("hasta")
+        acumulado = request.args.get("acumulado") in ("1", "true")
+
+        if not desde or not hasta:
+            return jsonify({"msg": "Los parámetros 'desde' y 'hasta' son requeridos"}), 400
+
+        # Chef y encargado solo ven su restaurante
+        if usuario.rol != "admin":
+            if not usuario.restaurante_id:
+                return jsonify({"msg": "Usuario sin restaurante asignado"}), 403
+            restaurante_id = usuario.restaurante_id
+
+        resultado = calcular_serie(
+            metrica, granularidad,
+            date.fromisoformat(desde), date.fromisoformat(hasta),
+            agrupar=agrupar, restaurante_id=restaurante_id, acumulado=acumulado
+        )
+        return jsonify(resultado), 200
+
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        return jsonify({"msg": "Error al calcular la serie", "error": str(e)}), 500
+
+
+@api.route("/pronostico", methods=["GET"])
+@jwt_required()
+def pronostico():
+    """
+    Proyección a fin de mes de ventas, gastos y porcentaje de gasto por
+    restaurante. Parámetros: mes, ano, restaurante_id (opcional) y fecha de
+    corte (opcional, por defecto hoy).
+    """
+    try:
+        usuario = sesion_actual()
+        if not usuario:
+            return jsonify({"msg": "Usuario no válido"}), 404
+
+        hoy = date.today()
+        mes = request.args.get("mes", hoy.month, type=int)
+        ano = request.args.get("ano", hoy.year, type=int)
+        corte = request.args.get("fecha")
+        corte = date.fromisoformat(corte) if corte else hoy
+        restaurante_id = request.args.get("restaurante_id", type=int)
+
+        # Chef y encargado solo ven su restaurante
+        if usuario.rol != "admin":
+            if not usuario.restaurante_id:
+                return jsonify({"msg": "Usuario sin restaurante asignado"}), 403
+            restaurante_id = usuario.restaurante_id
+        if restaurante_id:
+            restaurantes = [restaurante_id]
+        else:
+            restaurantes = db.session.scalars(
+                select(Restaurante.id).where(Restaurante.activo == True).order_by(Restaurante.id)).all()
+
+        return jsonify(proyectar(restaurantes, ano, mes, corte)), 200
+
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        return jsonify({"msg": "Error al calcular la proyección", "error": str(e)}), 500
+
+
+@api.route("/export/<tipo>", methods=["GET"])
+@jwt_required()
+def exportar_datos(tipo):
+    try:
+        usuario = sesion_actual()
+        if not usuario:
+            return jsonify({"msg": "Usuario no válido"}), 404
+
+        args = request.args.copy()
+        # Chef y encargado solo exportan su restaurante
+        if usuario.rol != "admin":
+            if not usuario.restaurante_id:
+                return jsonify({"msg": "Usuario sin restaurante asignado"}), 403
+            args["restaurante_id"] = usuario.restaurante_id
+
+        return exportar(tipo, args.get("formato", "csv"), args)
+
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except ImportError:
+        return jsonify({"msg": "La exportación a XLSX requiere openpyxl"}), 501
+    except Exception as e:
+        return jsonify({"msg": "Error al exportar", "error": str(e)}), 500
+
+
+@api.route("/importar", methods=["POST"])
+@jwt_required()
+def importar_datos():
+    """
+    Importa ventas o gastos desde un CSV (multipart: archivo, perfil y, para
+    el admin, restaurante_id). Las filas válidas se guardan y las rechazadas
+    se devuelven con su línea y el motivo.
+    """
+    sesion = sesion_actual()
+    if not sesion:
+        return jsonify({"msg": "Usuario no válido"}), 404
+
+    archivo = request.files.get("archivo")
+    if archivo is None:
+        return jsonify({"msg": "No se ha enviado ningún archivo"}), 400
+
+    restaurante_id = request.form.get("restaurante_id", type=int)
+    # Chef y encargado solo importan en su restaurante
+    if sesion.rol != "admin":
+        restaurante_id = sesion.restaurante_id
+    if not restaurante_id or db.session.get(Restaurante, restaurante_id) is None:
+        return jsonify({"msg": "Restaurante no encontrado"}), 404
+
+    try:
+        resumen = importar_csv(archivo.stream, request.form.get("perfil", "ventas"),
+                               restaurante_id, sesion.id)
+        db.session.commit()
+        codigo = 201 if resumen["insertadas"] else 200
+        return jsonify({"msg": "Importación completada", **resumen}), codigo
+    except (ValueError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print("❌ ERROR en importación CSV:", str(e))
+        return jsonify({"msg": "Error al importar", "error": str(e)}), 500
+
+
+@api.route("/admin/exportar-parquet", methods=["POST"])
+@jwt_required()
+def exportar_parquet_admin():
+    try:
+        usuario = sesion_actual()
+        if not usuario or usuario.rol != "admin":
+            return jsonify({"msg": "Acceso no autorizado"}), 403
+
+        data = request.get_json(silent=True) or {}
+        resumen = exportar_parquet(completo=bool(data.get("completo")))
+        return jsonify(resumen), 200
+
+    except ImportError:
+        return jsonify({"msg": "La exportación a Parquet requiere pyarrow"}), 501
+    except Exception as e:
+        return jsonify({"msg": "Error al exportar a Parquet", "error": str(e)}), 500
+
+
 @api.route("/admin/ventas-diarias", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def ventas_diarias_admin():
     try:
         restaurante_id = request.args.get("restaurante_id")
@@ -1609,8 +1708,7 @@ def ventas_diarias_admin():
 
         ventas = db.session.query(Venta).filter(
             Venta.restaurante_id == restaurante_id,
-            extract("month", Venta.fecha) == mes,
-            extract("year", Venta.fecha) == ano
+            *filtro_mes(Venta.fecha, mes, ano)
         ).order_by(Venta.fecha.asc()).all()
 
         return jsonify([v.serialize() for v in ventas]), 200
@@ -1630,24 +1728,23 @@ def admin_resumen_porcentaje():
         if not restaurante_id or not mes or not ano:
             return jsonify({"msg": "Parámetros incompletos"}), 400
 
-        total_ventas = db.session.query(func.sum(Venta.monto)).filter(
+        total_ventas = db.session.query(suma_euros(Venta.monto_cent)).filter(
             Venta.restaurante_id == restaurante_id,
-            extract('month', Venta.fecha) == mes,
-            extract('year', Venta.fecha) == ano
+            *filtro_mes(Venta.fecha, mes, ano)
         ).scalar() or 0
 
-        total_gastos = db.session.query(func.sum(Gasto.monto)).filter(
+        total_gastos = db.session.query(suma_euros(Gasto.monto_cent)).filter(
             Gasto.restaurante_id == restaurante_id,
-            extract('month', Gasto.fecha) == mes,
-            extract('year', Gasto.fecha) == ano
+            *filtro_mes(Gasto.fecha, mes, ano)
         ).scalar() or 0
 
         porcentaje = round((total_gastos / total_ventas) *
                            100, 2) if total_ventas > 0 else 0
-        promedio_diario = round(
-            total_ventas / 30, 2) if total_ventas > 0 else 0
-        proyeccion = round((total_ventas / (mes * 30)) * 30,
-                           2) if mes > 0 and total_ventas > 0 else 0
+        # Media por día transcurrido y proyección por perfil semanal (api/pronostico.py);
+        # dependen de la fecha de hoy, por eso este endpoint no usa ETag ni caché
+        pronostico = proyectar([int(restaurante_id)], ano, mes)["restaurantes"][0]
+        promedio_diario = pronostico["promedio_diario"]
+        proyeccion = pronostico["proyeccion_ventas"]
 
         return jsonify({
             "total_ventas": round(total_ventas, 2),
@@ -1663,34 +1760,36 @@ def admin_resumen_porcentaje():
 
 @api.route("/admin/gastos/por-dia", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def gastos_por_dia_admin():
     try:
-        user_id = int(get_jwt_identity())
-        usuario = Usuario.query.get(user_id)
+        usuario = sesion_actual()
         if not usuario or usuario.rol != "admin":
             return jsonify({"msg": "Acceso no autorizado"}), 403
         mes = int(request.args.get("mes", 0))
         anio = int(request.args.get("ano", 0))
         if not mes or not anio:
             return jsonify({"msg": "Mes y año requeridos"}), 400
-        total_gastado = db.session.query(func.sum(Gasto.monto)).filter(
-            extract("month", Gasto.fecha) == mes,
-            extract("year", Gasto.fecha) == anio
-        ).scalar() or 0
+        filtro_gastos_mes = (
+            ResumenMensual.tipo == "gasto",
+            ResumenMensual.anio == anio,
+            ResumenMensual.mes == mes
+        )
+        total_gastado = db.session.query(
+            suma_euros(ResumenMensual.total_cent)).filter(*filtro_gastos_mes).scalar() or 0
         restaurantes_activos = db.session.query(
             Restaurante.id).filter(Restaurante.activo == True).count()
         proveedor_mas_usado = db.session.query(
-            Proveedor.nombre, func.count(Gasto.id).label("cantidad")
-        ).join(Gasto).filter(
-            extract("month", Gasto.fecha) == mes,
-            extract("year", Gasto.fecha) == anio
+            Proveedor.nombre, func.sum(ResumenMensual.cantidad).label("cantidad")
+        ).join(ResumenMensual, ResumenMensual.proveedor_id == Proveedor.id).filter(
+            *filtro_gastos_mes
         ).group_by(Proveedor.nombre).order_by(desc("cantidad")).first()
         proveedor_nombre = proveedor_mas_usado[0] if proveedor_mas_usado else "Sin datos"
         restaurante_top = db.session.query(
-            Restaurante.nombre, func.sum(Gasto.monto).label("total")
-        ).join(Gasto).filter(
-            extract("month", Gasto.fecha) == mes,
-            extract("year", Gasto.fecha) == anio
+            Restaurante.nombre, suma_euros(ResumenMensual.total_cent).label("total")
+        ).join(ResumenMensual, ResumenMensual.restaurante_id == Restaurante.id).filter(
+            *filtro_gastos_mes
         ).group_by(Restaurante.nombre).order_by(desc("total")).first()
         restaurante_nombre = restaurante_top[0] if restaurante_top else "Sin datos"
         return jsonify({
@@ -1707,51 +1806,22 @@ def gastos_por_dia_admin():
 
 @api.route('/resumen-gastos', methods=['GET'])
 @jwt_required()
+@con_etag()
+@cacheado()
 def resumen_gastos_admin():
     try:
         from datetime import datetime
         mes = int(request.args.get("mes", datetime.now().month))
         ano = int(request.args.get("ano", datetime.now().year))
-        restaurantes = Restaurante.query.all()
-        total_gastado = 0
-        proveedor_contador = {}
-        restaurante_gastos = {}
-        for r in restaurantes:
-            # Gastos totales del restaurante
-            gastos = Gasto.query.filter(
-                Gasto.restaurante_id == r.id,
-                db.extract("month", Gasto.fecha) == mes,
-                db.extract("year", Gasto.fecha) == ano
-            ).all()
-            for g in gastos:
-                total_gastado += g.monto
-                # Contar proveedores
-                if g.proveedor_id:
-                    proveedor_contador[g.proveedor_id] = proveedor_contador.get(g.proveedor_id, 0) + 1
-            # Sumar gasto total por restaurante
-            restaurante_gastos[r.nombre] = restaurante_gastos.get(r.nombre, 0) + sum([g.monto for g in gastos])
-        # Proveedor más usado
-        proveedor_top = "No disponible"
-        if proveedor_contador:
-            proveedor_id = max(proveedor_contador, key=proveedor_contador.get)
-            proveedor = Proveedor.query.get(proveedor_id)
-            proveedor_top = proveedor.nombre if proveedor else "No disponible"
-        # Restaurante con más gasto
-        restaurante_top = "No disponible"
-        if restaurante_gastos:
-            restaurante_top = max(restaurante_gastos, key=restaurante_gastos.get)
-        resumen = {
-            "total_gastado": round(total_gastado, 2),
-            "restaurantes_activos": len(restaurantes),
-            "proveedor_top": proveedor_top,
-            "restaurante_top": restaurante_top
-        }
+        resumen = overview_admin(mes, ano, {"resumen_gastos"})["resumen_gastos"]
         return jsonify(resumen), 200
     except Exception as e:
         return jsonify({ "msg": "Error al obtener el resumen", "error": str(e) }), 500
 
 @api.route("/gasto-por-restaurante", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def gasto_por_restaurante():
     try:
         # Obtener parámetros de la URL
@@ -1765,13 +1835,16 @@ def gasto_por_restaurante():
         ano = int(ano_str)
         # Obtener todos los restaurantes
         restaurantes = Restaurante.query.all()
+        totales = dict(db.session.query(
+            ResumenMensual.restaurante_id, suma_euros(ResumenMensual.total_cent)
+        ).filter(
+            ResumenMensual.tipo == "gasto",
+            ResumenMensual.anio == ano,
+            ResumenMensual.mes == mes
+        ).group_by(ResumenMensual.restaurante_id).all())
         resultado = []
         for r in restaurantes:
-            gastos = db.session.query(db.func.sum(Gasto.monto)).filter(
-                Gasto.restaurante_id == r.id,
-                db.extract("month", Gasto.fecha) == mes,
-                db.extract("year", Gasto.fecha) == ano
-            ).scalar() or 0
+            gastos = totales.get(r.id, 0)
             resultado.append({
                 "restaurante": r.nombre,
                 "total_gastado": round(gastos, 2)
@@ -1783,37 +1856,61 @@ def gasto_por_restaurante():
             "error": str(e)
         }), 500
 
+def evolucion_mensual(tipo, ano, campo_total, desglose=False):
+    """
+    Totales de los 12 meses del año (opcionalmente por restaurante)
+    a partir de una sola consulta agrupada sobre resumen_mensual.
+    """
+    restaurantes = Restaurante.query.all()
+    if not restaurantes:
+        return []
+
+    filas = db.session.query(
+        ResumenMensual.mes,
+        ResumenMensual.restaurante_id,
+        suma_euros(ResumenMensual.total_cent)
+    ).filter(
+        ResumenMensual.tipo == tipo,
+        ResumenMensual.anio == ano
+    ).group_by(ResumenMensual.mes, ResumenMensual.restaurante_id).all()
+
+    totales = {(mes, rid): total for mes, rid, total in filas}
+
+    resultado = []
+    for mes in range(1, 13):
+        por_restaurante = [{
+            "restaurante_id": r.id,
+            "nombre": r.nombre,
+            campo_total: round(totales.get((mes, r.id), 0), 2)
+        } for r in restaurantes]
+        item = {
+            "mes": mes,
+            campo_total: round(sum(totales.get((mes, r.id), 0) for r in restaurantes), 2)
+        }
+        if desglose:
+            item["restaurantes"] = por_restaurante
+        resultado.append(item)
+    return resultado
+
+
 @api.route('/gasto-evolucion-mensual', methods=['GET'])
 @jwt_required()
+@con_etag("ano")
+@cacheado("ano")
 def evolucion_gasto_mensual():
     try:
         from datetime import datetime
         ano = int(request.args.get("ano", datetime.now().year))
-        # Obtener todos los restaurantes
-        restaurantes = Restaurante.query.all()
-        if not restaurantes:
-            return jsonify([]), 200
-        resultado = []
-        # Por cada mes del año
-        for mes in range(1, 13):
-            total_mes = 0
-            for restaurante in restaurantes:
-                gastos = Gasto.query.filter(
-                    Gasto.restaurante_id == restaurante.id,
-                    db.extract('year', Gasto.fecha) == ano,
-                    db.extract('month', Gasto.fecha) == mes
-                ).all()
-                total_mes += sum([g.monto for g in gastos])
-            resultado.append({
-                "mes": mes,
-                "total_gastado": round(total_mes, 2)
-            })
+        desglose = request.args.get("desglose") == "restaurante"
+        resultado = evolucion_mensual("gasto", ano, "total_gastado", desglose)
         return jsonify(resultado), 200
     except Exception as e:
         return jsonify({"msg": "Error al calcular la evolución mensual", "error": str(e)}), 500
     
 @api.route('/proveedores-top', methods=['GET'])
 @jwt_required()
+@con_etag()
+@cacheado()
 def get_proveedores_top():
     mes = request.args.get("mes")
     ano = request.args.get("ano")
@@ -1823,14 +1920,15 @@ def get_proveedores_top():
         resultados = (
             db.session.query(
                 Proveedor.nombre,
-                func.count(Gasto.id).label("veces_usado"),
-                func.sum(Gasto.monto).label("total_gastado")
+                func.sum(ResumenMensual.cantidad).label("veces_usado"),
+                suma_euros(ResumenMensual.total_cent).label("total_gastado")
             )
-            .join(Gasto, Gasto.proveedor_id == Proveedor.id)
-            .filter(func.extract("month", Gasto.fecha) == int(mes))
-            .filter(func.extract("year", Gasto.fecha) == int(ano))
+            .join(ResumenMensual, ResumenMensual.proveedor_id == Proveedor.id)
+            .filter(ResumenMensual.tipo == "gasto")
+            .filter(ResumenMensual.mes == int(mes))
+            .filter(ResumenMensual.anio == int(ano))
             .group_by(Proveedor.nombre)
-            .order_by(func.sum(Gasto.monto).desc())
+            .order_by(suma_euros(ResumenMensual.total_cent).desc())
             .limit(5)
             .all()
         )
@@ -1850,69 +1948,36 @@ def get_proveedores_top():
 
 @api.route('/resumen-ventas', methods=['GET'])
 @jwt_required()
+@con_etag()
+@cacheado()
 def resumen_ventas_admin():
     try:
         from datetime import datetime
         mes = int(request.args.get("mes", datetime.now().month))
         ano = int(request.args.get("ano", datetime.now().year))
-        restaurantes = Restaurante.query.all()
-        total_vendido = 0
-        restaurante_ventas = {}
-        for r in restaurantes:
-            ventas = Venta.query.filter(
-                Venta.restaurante_id == r.id,
-                db.extract("month", Venta.fecha) == mes,
-                db.extract("year", Venta.fecha) == ano
-            ).all()
-            monto_total_restaurante = sum([v.monto for v in ventas])
-            total_vendido += monto_total_restaurante
-            restaurante_ventas[r.nombre] = monto_total_restaurante
-        restaurante_top = "No disponible"
-        if restaurante_ventas:
-            restaurante_top = max(restaurante_ventas, key=restaurante_ventas.get)
-        promedio_por_restaurante = (
-            round(total_vendido / len(restaurante_ventas), 2)
-            if restaurante_ventas else 0
-        )
-        resumen = {
-            "total_vendido": round(total_vendido, 2),
-            "restaurantes_con_ventas": len(restaurante_ventas),
-            "restaurante_top": restaurante_top,
-            "promedio_por_restaurante": promedio_por_restaurante
-        }
+        resumen = overview_admin(mes, ano, {"resumen_ventas"})["resumen_ventas"]
         return jsonify(resumen), 200
     except Exception as e:
         return jsonify({ "msg": "Error al obtener el resumen de ventas", "error": str(e) }), 500
 
 @api.route('/venta-evolucion-mensual', methods=['GET'])
 @jwt_required()
+@con_etag("ano")
+@cacheado("ano")
 def evolucion_venta_mensual():
     try:
         from datetime import datetime
         ano = int(request.args.get("ano", datetime.now().year))
-        restaurantes = Restaurante.query.all()
-        if not restaurantes:
-            return jsonify([]), 200
-        resultado = []
-        for mes in range(1, 13):
-            total_mes = 0
-            for restaurante in restaurantes:
-                ventas = Venta.query.filter(
-                    Venta.restaurante_id == restaurante.id,
-                    db.extract('year', Venta.fecha) == ano,
-                    db.extract('month', Venta.fecha) == mes
-                ).all()
-                total_mes += sum([v.monto for v in ventas])
-            resultado.append({
-                "mes": mes,
-                "total_vendido": round(total_mes, 2)
-            })
+        desglose = request.args.get("desglose") == "restaurante"
+        resultado = evolucion_mensual("venta", ano, "total_vendido", desglose)
         return jsonify(resultado), 200
     except Exception as e:
         return jsonify({"msg": "Error al calcular la evolución mensual de ventas", "error": str(e)}), 500
 
 @api.route("/ventas-por-restaurante", methods=["GET"])
 @jwt_required()
+@con_etag()
+@cacheado()
 def ventas_por_restaurante():
     try:
         mes_str = request.args.get("mes")
@@ -1922,13 +1987,16 @@ def ventas_por_restaurante():
         mes = int(mes_str)
         ano = int(ano_str)
         restaurantes = Restaurante.query.all()
+        totales = dict(db.session.query(
+            ResumenMensual.restaurante_id, suma_euros(ResumenMensual.total_cent)
+        ).filter(
+            ResumenMensual.tipo == "venta",
+            ResumenMensual.anio == ano,
+            ResumenMensual.mes == mes
+        ).group_by(ResumenMensual.restaurante_id).all())
         resultado = []
         for r in restaurantes:
-            ventas = db.session.query(db.func.sum(Venta.monto)).filter(
-                Venta.restaurante_id == r.id,
-                db.extract("month", Venta.fecha) == mes,
-                db.extract("year", Venta.fecha) == ano
-            ).scalar() or 0
+            ventas = totales.get(r.id, 0)
             resultado.append({
                 "restaurante": r.nombre,
                 "total_vendido": round(ventas, 2)
@@ -1942,6 +2010,8 @@ def ventas_por_restaurante():
 
 @api.route('/restaurantes-top', methods=['GET'])
 @jwt_required()
+@con_etag()
+@cacheado()
 def get_restaurantes_top():
     mes = request.args.get("mes")
     ano = request.args.get("ano")
@@ -1951,14 +2021,15 @@ def get_restaurantes_top():
         resultados = (
             db.session.query(
                 Restaurante.nombre,
-                func.count(Venta.id).label("ventas_realizadas"),
-                func.sum(Venta.monto).label("total_vendido")
+                func.sum(ResumenMensual.cantidad).label("ventas_realizadas"),
+                suma_euros(ResumenMensual.total_cent).label("total_vendido")
             )
-            .join(Venta, Venta.restaurante_id == Restaurante.id)
-            .filter(func.extract("month", Venta.fecha) == int(mes))
-            .filter(func.extract("year", Venta.fecha) == int(ano))
+            .join(ResumenMensual, ResumenMensual.restaurante_id == Restaurante.id)
+            .filter(ResumenMensual.tipo == "venta")
+            .filter(ResumenMensual.mes == int(mes))
+            .filter(ResumenMensual.anio == int(ano))
             .group_by(Restaurante.nombre)
-            .order_by(func.sum(Venta.monto).desc())
+            .order_by(suma_euros(ResumenMensual.total_cent).desc())
             .limit(5)
             .all()
         )
@@ -1990,18 +2061,19 @@ def restaurante_tiene_ventas(id):
 
 @api.route('/ventas/encargado', methods=['GET'])
 @jwt_required()
+@con_etag()
 def obtener_ventas_encargado():
     mes = request.args.get("mes", type=int)
     ano = request.args.get("ano", type=int)
-    user_id = get_jwt_identity()
-    user = Usuario.query.get(user_id)
+    user = sesion_actual()
     if not user or not user.restaurante_id:
         return jsonify({"msg": "Usuario no válido o sin restaurante asignado"}), 400
+    if not mes or not ano:
+        return jsonify({"msg": "Mes y año requeridos"}), 400
     try:
         ventas = Venta.query.filter(
             Venta.restaurante_id == user.restaurante_id,
-            db.extract("month", Venta.fecha) == mes,
-            db.extract("year", Venta.fecha) == ano
+            *filtro_mes(Venta.fecha, mes, ano)
         ).all()
         resultados = []
         for v in ventas:
@@ -2018,6 +2090,7 @@ def obtener_ventas_encargado():
 
 @api.route("/ventas-detalle", methods=["GET"])
 @jwt_required()
+@con_etag(por_usuario=False)
 def ventas_detalle_por_restaurante():
     try:
         mes = request.args.get("mes")
@@ -2025,12 +2098,13 @@ def ventas_detalle_por_restaurante():
         restaurante_id = request.args.get("restaurante_id")
         if not mes or not ano or not restaurante_id:
             return jsonify({"msg": "Faltan parámetros"}), 422
-        ventas = Venta.query.filter(
+        consulta = Venta.query.filter(
             Venta.restaurante_id == int(restaurante_id),
-            db.extract("month", Venta.fecha) == int(mes),
-            db.extract("year", Venta.fecha) == int(ano)
-        ).all()
-        return jsonify([v.serialize() for v in ventas]), 200
+            *filtro_mes(Venta.fecha, mes, ano)
+        )
+        if pide_streaming(request.args):
+            return json_en_streaming(consulta.order_by(Venta.fecha, Venta.id), lambda v: v.serialize())
+        return jsonify([v.serialize() for v in consulta.all()]), 200
     except Exception as e:
         return jsonify({
             "msg": "Error al obtener ventas detalladas",
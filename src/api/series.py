@@ -0,0 +1,174 @@
+"""
+Series temporales genéricas (ventas, gastos o ratio) por día, semana, mes o
+trimestre, para cualquier rango de fechas y con agrupación opcional.
+Cada serie se calcula con una sola consulta y se devuelve sin huecos.
+Las filas se reparten por grupo y periodo con el motor de api/analitica.py
+(arrays de NumPy, sin bucles por fila); los importes se suman en céntimos y
+se pasan a euros al final. Con acumulado=True cada periodo lleva el total
+desde el inicio del rango.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select, func
+
+from api.models import Venta, Gasto, Proveedor, Restaurante, ResumenDiario
+from api import analitica
+
+
+METRICAS = ("ventas", "gastos", "ratio")
+GRANULARIDADES = ("dia", "semana", "mes", "trimestre")
+AGRUPACIONES = {
+    None: METRICAS,
+    "restaurante": METRICAS,
+    "categoria": ("gastos",),
+    "proveedor": ("gastos",),
+    "turno": ("ventas",),
+}
+MAX_PERIODOS = 1000
+
+
+def inicio_periodo(fecha, granularidad):
+    if granularidad == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == "mes":
+        return fecha.replace(day=1)
+    if granularidad == "trimestre":
+        return date(fecha.year, 3 * ((fecha.month - 1) // 3) + 1, 1)
+    return fecha
+
+
+def siguiente_periodo(inicio, granularidad):
+    if granularidad == "dia":
+        return inicio + timedelta(days=1)
+    if granularidad == "semana":
+        return inicio + timedelta(days=7)
+    meses = 1 if granularidad == "mes" else 3
+    mes = inicio.month - 1 + meses
+    return date(inicio.year + mes // 12, mes % 12 + 1, 1)
+
+
+def periodos(desde, hasta, granularidad):
+    """Inicios de todos los periodos que tocan el rango [desde, hasta]."""
+    resultado = []
+    actual = inicio_periodo(desde, granularidad)
+    while actual <= hasta:
+        resultado.append(actual)
+        if len(resultado) > MAX_PERIODOS:
+            raise ValueError(f"El rango pedido supera los {MAX_PERIODOS} periodos")
+        actual = siguiente_periodo(actual, granularidad)
+    return resultado
+
+
+def _consulta(metrica, agrupar, desde, hasta, restaurante_id):
+    """
+    Devuelve la consulta agrupada por fecha (y grupo) con las columnas
+    fecha, clave, nombre, ventas, gastos (importes en céntimos).
+    """
+    if agrupar in (None, "restaurante"):
+        # resumen_diario ya trae ventas y gastos juntos: una sola consulta
+        # sirve también para el ratio.
+        columnas = [analitica.fecha(ResumenDiario.fecha)]
+        agrupacion = [ResumenDiario.fecha]
+        if agrupar == "restaurante":
+            columnas += [ResumenDiario.restaurante_id.label("clave"),
+                         Restaurante.nombre.label("nombre")]
+            agrupacion += [ResumenDiario.restaurante_id, Restaurante.nombre]
+        consulta = select(
+            *columnas,
+            func.sum(ResumenDiario.total_ventas_cent).label("ventas"),
+            func.sum(ResumenDiario.total_gastos_cent).label("gastos")
+        ).where(
+            ResumenDiario.fecha >= desde,
+            ResumenDiario.fecha <= hasta
+        ).group_by(*agrupacion)
+        if agrupar == "restaurante":
+            consulta = consulta.join(
+                Restaurante, Restaurante.id == ResumenDiario.restaurante_id)
+        if restaurante_id:
+            consulta = consulta.where(ResumenDiario.restaurante_id == restaurante_id)
+        return consulta
+
+    if agrupar == "turno":
+        turno = func.coalesce(Venta.turno, "Sin turno")
+        consulta = select(
+            analitica.fecha(Venta.fecha), turno.label("clave"), turno.label("nombre"),
+            func.sum(Venta.monto_cent).label("ventas")
+        ).where(
+            Venta.fecha >= desde,
+            Venta.fecha <= hasta
+        ).group_by(Venta.fecha, turno)
+        if restaurante_id:
+            consulta = consulta.where(Venta.restaurante_id == restaurante_id)
+        return consulta
+
+    if agrupar == "categoria":
+        categoria = func.coalesce(Gasto.categoria, "Sin categoría")
+        consulta = select(
+            analitica.fecha(Gasto.fecha), categoria.label("clave"), categoria.label("nombre"),
+            func.sum(Gasto.monto_cent).label("gastos")
+        ).group_by(Gasto.fecha, categoria)
+    else:
+        consulta = select(
+            analitica.fecha(Gasto.fecha), Gasto.proveedor_id.label("clave"),
+            Proveedor.nombre.label("nombre"),
+            func.sum(Gasto.monto_cent).label("gastos")
+        ).join(
+            Proveedor, Proveedor.id == Gasto.proveedor_id
+        ).group_by(Gasto.fecha, Gasto.proveedor_id, Proveedor.nombre)
+
+    consulta = consulta.where(Gasto.fecha >= desde, Gasto.fecha <= hasta)
+    if restaurante_id:
+        consulta = consulta.where(Gasto.restaurante_id == restaurante_id)
+    return consulta
+
+
+def calcular_serie(metrica, granularidad, desde, hasta, agrupar=None, restaurante_id=None,
+                   acumulado=False):
+    if metrica not in METRICAS:
+        raise ValueError(f"Métrica no válida: {metrica}")
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad no válida: {granularidad}")
+    if agrupar not in AGRUPACIONES:
+        raise ValueError(f"Agrupación no válida: {agrupar}")
+    if metrica not in AGRUPACIONES[agrupar]:
+        raise ValueError(f"La métrica '{metrica}' no se puede agrupar por '{agrupar}'")
+    if desde > hasta:
+        raise ValueError("'desde' debe ser anterior a 'hasta'")
+
+    inicios = periodos(desde, hasta, granularidad)
+    columnas = analitica.cargar(_consulta(metrica, agrupar, desde, hasta, restaurante_id))
+    filas = len(columnas["fecha"])
+
+    if agrupar is None:
+        claves, nombres = [None], ["Total"]
+        grupo = np.zeros(filas, dtype=np.int64)
+    else:
+        claves, grupo, primera = analitica.agrupar(columnas["clave"])
+        claves, nombres = claves.tolist(), columnas["nombre"][primera].tolist()
+
+    forma = (len(claves), len(inicios))
+    periodo = analitica.posiciones(columnas["fecha"], np.array(inicios, dtype="datetime64[D]"))
+    ceros = np.zeros(filas, dtype=np.int64)
+    ventas = analitica.matriz(grupo, periodo, columnas.get("ventas", ceros), forma)
+    gastos = analitica.matriz(grupo, periodo, columnas.get("gastos", ceros), forma)
+    if acumulado:
+        ventas, gastos = analitica.acumulado(ventas), analitica.acumulado(gastos)
+
+    if metrica == "ratio":
+        valores = analitica.porcentaje(gastos, ventas).tolist()
+    else:
+        valores = [analitica.a_euros(fila) for fila in (ventas if metrica == "ventas" else gastos)]
+
+    orden = sorted(range(len(claves)), key=lambda i: str(nombres[i]))
+    return {
+        "metrica": metrica,
+        "granularidad": granularidad,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "agrupar": agrupar,
+        "acumulado": acumulado,
+        "periodos": [inicio.isoformat() for inicio in inicios],
+        "series": [{"clave": claves[i], "nombre": nombres[i], "valores": valores[i]}
+                   for i in orden]
+    }
@@ -0,0 +1,57 @@
+"""
+Usuario de la petición actual.
+
+El token que emite /login lleva como claims el rol, el restaurante y la
+moneda del usuario, así que la mayoría de endpoints autorizan con
+sesion_actual() sin consultar la base de datos. usuario_actual() carga la
+fila completa solo cuando hace falta (nombre, contraseña...) y una única vez
+por petición; las operaciones destructivas de admin (crear usuarios, borrar
+usuarios o restaurantes) comprueban el rol con usuario_actual() para que un
+admin degradado o borrado no las pueda hacer con un token antiguo. Los
+tokens emitidos antes de llevar claims siguen funcionando: para ellos
+sesion_actual() lee el usuario de la base de datos.
+"""
+from collections import namedtuple
+
+from flask import request
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity
+
+from api.models import db, Usuario
+
+
+CLAIMS = ("rol", "restaurante_id", "moneda")
+
+Sesion = namedtuple("Sesion", ("id",) + CLAIMS)
+
+
+def crear_token(usuario):
+    return create_access_token(
+        identity=str(usuario.id),
+        additional_claims={claim: getattr(usuario, claim) for claim in CLAIMS}
+    )
+
+
+def usuario_actual():
+    """Fila completa del usuario del token (None si no hay token o ya no existe)."""
+    identidad = get_jwt_identity()
+    if identidad is None:
+        return None
+    if "api.usuario_actual" not in request.environ:
+        request.environ["api.usuario_actual"] = db.session.get(Usuario, int(identidad))
+    return request.environ["api.usuario_actual"]
+
+
+def sesion_actual():
+    """id, rol, restaurante_id y moneda del usuario del token."""
+    identidad = get_jwt_identity()
+    if identidad is None:
+        return None
+
+    claims = get_jwt()
+    if "rol" in claims:
+        return Sesion(int(identidad), *(claims.get(claim) for claim in CLAIMS))
+
+    usuario = usuario_actual()
+    if usuario is None:
+        return None
+    return Sesion(usuario.id, *(getattr(usuario, claim) for claim in CLAIMS))
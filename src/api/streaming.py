@@ -0,0 +1,27 @@
+"""
+Respuestas JSON en streaming: la lista se escribe elemento a elemento
+mientras se leen las filas de la base de datos por lotes, así la memoria
+del worker no crece con el tamaño del resultado.
+"""
+from flask import Response, current_app, stream_with_context
+
+
+TAMANO_LOTE = 1000
+
+
+def json_en_streaming(consulta, serializar, tamano_lote=TAMANO_LOTE):
+    """
+    Devuelve una Response que emite un array JSON a partir de una Query.
+    Las filas se leen con yield_per (cursor de servidor en Postgres).
+    """
+    def generar():
+        yield "["
+        for i, fila in enumerate(consulta.yield_per(tamano_lote)):
+            yield ("," if i else "") + current_app.json.dumps(serializar(fila))
+        yield "]"
+
+    return Response(stream_with_context(generar()), mimetype="application/json")
+
+
+def pide_streaming(args):
+    return args.get("stream", "").lower() in ("1", "true", "si")
@@ -1,4 +1,5 @@
 from flask import jsonify, url_for
+from datetime import date
 
 class APIException(Exception):
     status_code = 400
@@ -39,3 +40,19 @@ def generate_sitemap(app):
         <p>Start working on your project by following the <a href="https://start.4geeksacademy.com/starters/full-stack" target="_blank">Quick Start</a></p>
         <p>Remember to specify a real endpoint path like: </p>
         <ul style="text-align: left;">"""+links_html+"</ul></div>"
+
+
+def rango_mes(mes, ano):
+    """Devuelve el rango [inicio, fin) de fechas de un mes."""
+    inicio = date(ano, mes, 1)
+    fin = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio, fin
+
+
+def filtro_mes(columna, mes, ano):
+    """
+    Condiciones para filtrar una columna de fecha por mes y año.
+    Usa un rango semiabierto en lugar de extract() para que pueda usar índices.
+    """
+    inicio, fin = rango_mes(int(mes), int(ano))
+    return columna >= inicio, columna < fin
@@ -0,0 +1,238 @@
+"""
+Alta de ventas sin duplicados, garantizada por la base de datos.
+
+La tabla ventas tiene un índice único sobre (restaurante_id, fecha, turno);
+una venta sin turno cuenta como turno ''. guardar_ventas() inserta con
+INSERT ... ON CONFLICT DO NOTHING (Postgres y SQLite), así que no hace falta
+consultar antes si la venta existe y dos tablets que envían a la vez no
+pueden crear la misma venta dos veces. Las filas que chocan con una venta
+existente se resuelven según el modo:
+  - rechazar (por defecto): se devuelven como duplicadas.
+  - reemplazar: el monto nuevo sustituye al guardado.
+  - acumular: el monto nuevo se suma al guardado.
+Para reemplazar y acumular la venta existente se bloquea (SELECT ... FOR
+UPDATE) antes de modificarla, y los resúmenes y las versiones de datos se
+ajustan en la misma transacción.
+
+Los montos se manejan en céntimos enteros (monto_cent), así que reemplazar y
+acumular son exactos.
+
+validar_ventas() revisa un lote completo (por ejemplo, un año de turnos de un
+restaurante nuevo) con una sola consulta de restaurantes, para que el alta
+masiva se haga en una petición y una transacción.
+"""
+import math
+import os
+from collections import OrderedDict, defaultdict
+from datetime import date
+
+from sqlalchemy import select, update, bindparam, func, literal_column, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, Venta, Restaurante
+from api.dinero import a_centimos, a_euros
+from api.resumenes import a_fecha, registrar_cambios
+from api.versiones import incrementar_versiones
+
+
+MAX_FILAS = int(os.getenv("VENTAS_LOTE_MAX", 5000))
+MODOS = ("rechazar", "reemplazar", "acumular")
+ESTADOS = {"rechazar": "duplicada", "reemplazar": "reemplazada", "acumular": "acumulada"}
+OTRO_RESTAURANTE = "No puedes registrar ventas de otro restaurante"
+
+TURNO = func.coalesce(Venta.turno, literal_column("''"))
+CLAVE = (Venta.restaurante_id, Venta.fecha, TURNO)
+
+
+def clave_venta(fila):
+    return int(fila["restaurante_id"]), a_fecha(fila["fecha"]), fila.get("turno") or ""
+
+
+def _insertar_nuevas(filas):
+    """Inserta las filas que no chocan con ninguna venta y devuelve sus claves."""
+    dialecto = db.session.get_bind().dialect.name
+    insertar = (postgresql if dialecto == "postgresql" else sqlite).insert
+    stmt = insertar(Venta.__table__).on_conflict_do_nothing(index_elements=list(CLAVE))
+    insertadas = set()
+    for fila in db.session.execute(stmt.returning(*CLAVE), filas):
+        insertadas.add((fila[0], a_fecha(fila[1]), fila[2]))
+    return insertadas
+
+
+def _bloquear_existentes(claves):
+    """{clave: (id, monto_cent)} de las ventas existentes, bloqueadas hasta el commit."""
+    filas = db.session.execute(
+        select(Venta.id, Venta.monto_cent, *CLAVE)
+        .where(tuple_(*CLAVE).in_(list(claves)))
+        .with_for_update()
+    ).all()
+    return {(r, a_fecha(f), t): (id_, monto) for id_, monto, r, f, t in filas}
+
+
+def _agrupar(filas, modo):
+    """
+    Junta las filas que repiten clave dentro de la misma petición:
+    {clave: (monto_cent, índices)}. Al rechazar vale la primera, al reemplazar
+    la última y al acumular la suma.
+    """
+    grupos = OrderedDict()
+    for indice, fila in enumerate(filas):
+        clave = clave_venta(fila)
+        if clave not in grupos:
+            grupos[clave] = (fila["monto_cent"], [indice])
+            continue
+        monto, indices = grupos[clave]
+        if modo == "reemplazar":
+            monto = fila["monto_cent"]
+        elif modo == "acumular":
+            monto += fila["monto_cent"]
+        grupos[clave] = (monto, indices + [indice])
+    return grupos
+
+
+def guardar_ventas(filas, modo="rechazar"):
+    """
+    Guarda una lista de ventas (dicts con restaurante_id, fecha, monto en
+    euros o monto_cent, y turno) en la transacción actual y devuelve el estado de cada una:
+    "creada", "duplicada", "reemplazada" o "acumulada". No hace commit.
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo no válido. Opciones: {', '.join(MODOS)}")
+    if not filas:
+        return []
+
+    filas = [{"restaurante_id": int(f["restaurante_id"]), "fecha": a_fecha(f["fecha"]),
+              "monto_cent": f["monto_cent"] if "monto_cent" in f else a_centimos(f["monto"]),
+              "turno": f.get("turno") or None} for f in filas]
+    grupos = _agrupar(filas, modo)
+    estados = [None] * len(filas)
+    cambios = []
+
+    def fila_de(clave, monto):
+        return {"restaurante_id": clave[0], "fecha": clave[1], "monto_cent": monto,
+                "turno": filas[grupos[clave][1][0]]["turno"]}
+
+    insertadas = _insertar_nuevas([fila_de(clave, monto) for clave, (monto, _) in grupos.items()])
+    conflictos = {}
+    for clave, (monto, indices) in grupos.items():
+        if clave in insertadas:
+            estados[indices[0]] = "creada"
+            for indice in indices[1:]:
+                estados[indice] = ESTADOS[modo]
+            cambios.append((Venta, fila_de(clave, monto), 1))
+        elif modo == "rechazar":
+            for indice in indices:
+                estados[indice] = "duplicada"
+        else:
+            conflictos[clave] = monto
+
+    if conflictos:
+        existentes = _bloquear_existentes(conflictos)
+        actualizaciones = []
+        for clave, monto in conflictos.items():
+            indices = grupos[clave][1]
+            if clave not in existentes:
+                # Se borró entre el INSERT y el bloqueo: se vuelve a intentar
+                estado = guardar_ventas([fila_de(clave, monto)], modo)[0]
+                for indice in indices:
+                    estados[indice] = estado
+                continue
+            id_, anterior = existentes[clave]
+            nuevo = monto if modo == "reemplazar" else anterior + monto
+            actualizaciones.append({"_id": id_, "_monto": nuevo})
+            cambios.append((Venta, fila_de(clave, anterior), -1))
+            cambios.append((Venta, fila_de(clave, nuevo), 1))
+            for indice in indices:
+                estados[indice] = ESTADOS[modo]
+        if actualizaciones:
+            tabla = Venta.__table__
+            db.session.execute(
+                update(tabla).where(tabla.c.id == bindparam("_id")).values(monto_cent=bindparam("_monto")),
+                actualizaciones)
+
+    if cambios:
+        registrar_cambios(db.session, cambios)
+        incrementar_versiones(db.session, {(f["restaurante_id"], f["fecha"].year, f["fecha"].month)
+                                           for _, f, _ in cambios})
+    return estados
+
+
+def _validar_fila(v, restaurantes, sesion):
+    faltan = [campo for campo in ("fecha", "monto", "restaurante_id") if v.get(campo) in (None, "")]
+    if faltan:
+        return None, [f"Faltan campos obligatorios: {', '.join(faltan)}"]
+
+    errores = []
+    try:
+        fecha = a_fecha(v["fecha"])
+        if not isinstance(fecha, date):
+            raise ValueError
+    except (TypeError, ValueError):
+        fecha = None
+        errores.append("Fecha no válida (formato YYYY-MM-DD)")
+    try:
+        monto = float(v["monto"])
+        if not math.isfinite(monto) or monto <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        monto = None
+        errores.append("El monto debe ser un número mayor que 0")
+    try:
+        restaurante_id = int(v["restaurante_id"])
+    except (TypeError, ValueError):
+        restaurante_id = None
+
+    if restaurante_id not in restaurantes:
+        errores.append("Restaurante no encontrado")
+    elif sesion.rol != "admin" and restaurante_id != sesion.restaurante_id:
+        errores.append(OTRO_RESTAURANTE)
+    if v.get("turno") and len(str(v["turno"])) > 50:
+        errores.append("turno supera los 50 caracteres")
+
+    if errores:
+        return None, errores
+    return {"fecha": fecha, "monto": monto, "turno": v.get("turno") or None,
+            "restaurante_id": restaurante_id}, []
+
+
+def validar_ventas(filas, sesion):
+    """
+    Devuelve (ventas válidas con su índice, errores por fila). Los
+    restaurantes se comprueban con una única consulta.
+    """
+    ids = set()
+    for v in filas:
+        if isinstance(v, dict):
+            try:
+                ids.add(int(v.get("restaurante_id")))
+            except (TypeError, ValueError):
+                pass
+    restaurantes = set(db.session.scalars(
+        select(Restaurante.id).where(Restaurante.id.in_(ids)))) if ids else set()
+
+    validas, errores = [], []
+    for indice, v in enumerate(filas):
+        if not isinstance(v, dict):
+            errores.append({"fila": indice, "errores": ["La fila debe ser un objeto"]})
+            continue
+        venta, errores_fila = _validar_fila(v, restaurantes, sesion)
+        if errores_fila:
+            errores.append({"fila": indice, "errores": errores_fila})
+        else:
+            validas.append((indice, venta))
+    return validas, errores
+
+
+def eventos_carga(ventas, usuario_id):
+    """Un evento "carga_ventas" por restaurante con el número de ventas, el total y las fechas."""
+    por_restaurante = defaultdict(list)
+    for v in ventas:
+        por_restaurante[v["restaurante_id"]].append(v)
+    return [{
+        "restaurante_id": restaurante_id,
+        "usuario_id": usuario_id,
+        "num_ventas": len(lista),
+        "monto": a_euros(sum(a_centimos(v["monto"]) for v in lista)),
+        "desde": min(v["fecha"] for v in lista).isoformat(),
+        "hasta": max(v["fecha"] for v in lista).isoformat(),
+    } for restaurante_id, lista in por_restaurante.items()]
@@ -0,0 +1,171 @@
+"""
+Versión de los datos por restaurante y mes, y GET condicional (ETag).
+
+Cada alta, edición o borrado de una venta, gasto o factura incrementa, en la
+misma transacción, el contador de version_datos de su restaurante y mes (y el
+del mes anterior si la edición lo cambia de mes). Los cambios en restaurantes
+o proveedores incrementan la fila global (0, 0, 0).
+
+Los endpoints de resumen y de listado calculan su ETag a partir de la suma de
+las versiones que cubren su respuesta y contestan 304 a If-None-Match sin
+tocar las tablas de ventas y gastos. La caché de respuestas (api/cache.py)
+usa la misma versión en sus claves.
+
+El 304 se contesta antes de que el endpoint compruebe permisos, así que el
+ETag se firma con la clave de la app e incluye el usuario: solo coincide con
+uno que el propio endpoint ya entregó a ese usuario con un 200, para el mismo
+rol, alcance y versión.
+"""
+import hashlib
+import hmac
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, request, make_response
+from sqlalchemy import event, inspect, select, func, and_, or_, true
+
+from api.models import db, Venta, Gasto, FacturaAlbaran, Restaurante, Proveedor, VersionDatos
+from api.resumenes import a_fecha, upsert_sumando
+from api.sesion import sesion_actual
+
+
+MODELOS_CON_PERIODO = (Venta, Gasto, FacturaAlbaran)
+MODELOS_GLOBALES = (Restaurante, Proveedor)
+GLOBAL = (0, 0, 0)
+
+
+def _periodo(restaurante_id, fecha):
+    if restaurante_id is None or fecha is None:
+        return None
+    fecha = a_fecha(fecha)
+    return int(restaurante_id), fecha.year, fecha.month
+
+
+def _periodo_guardado(session, obj):
+    """
+    (restaurante_id, año, mes) previo a la edición. Se lee de la base de
+    datos: si el objeto venía expirado (tras un commit) el historial de los
+    atributos no guarda el valor anterior.
+    """
+    estado = inspect(obj)
+    if not (estado.attrs.restaurante_id.history.has_changes()
+            or estado.attrs.fecha.history.has_changes()):
+        return None
+    modelo = type(obj)
+    fila = session.execute(
+        select(modelo.restaurante_id, modelo.fecha).where(modelo.id == obj.id)).one_or_none()
+    return _periodo(*fila) if fila is not None else None
+
+
+def incrementar_versiones(session, periodos):
+    """Suma 1 a la versión de cada (restaurante_id, año, mes)."""
+    filas = [{"restaurante_id": r, "anio": a, "mes": m, "version": 1}
+             for r, a, m in sorted(periodos)]
+    upsert_sumando(session, VersionDatos.__table__, ("restaurante_id", "anio", "mes"), filas)
+
+
+@event.listens_for(db.session, "before_flush")
+def _registrar_versiones(session, flush_context, instances):
+    periodos = set()
+
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(obj, MODELOS_GLOBALES):
+            periodos.add(GLOBAL)
+        elif isinstance(obj, MODELOS_CON_PERIODO):
+            anterior = _periodo_guardado(session, obj) if obj in session.dirty else None
+            periodos.update(p for p in (_periodo(obj.restaurante_id, obj.fecha), anterior) if p)
+
+    if periodos:
+        incrementar_versiones(session, periodos)
+
+
+def version_datos(restaurante_id=None, anio=None, mes=None):
+    """
+    Suma de las versiones que cubren el alcance pedido (None = todos) más la
+    global. Solo crece, así que cualquier cambio en los datos la modifica.
+    """
+    condiciones = [true()]
+    if restaurante_id:
+        condiciones.append(VersionDatos.restaurante_id == restaurante_id)
+    if anio:
+        condiciones.append(VersionDatos.anio == anio)
+    if mes:
+        condiciones.append(VersionDatos.mes == mes)
+
+    es_global = and_(VersionDatos.restaurante_id == GLOBAL[0],
+                     VersionDatos.anio == GLOBAL[1], VersionDatos.mes == GLOBAL[2])
+    return db.session.scalar(
+        select(func.coalesce(func.sum(VersionDatos.version), 0))
+        .where(or_(and_(*condiciones), es_global)))
+
+
+def alcance(usuario, periodo, por_usuario):
+    """
+    (restaurante_id, año, mes) del que depende la respuesta.
+    Con por_usuario=True los no admin ven su propio restaurante; si piden
+    otro, el alcance pasa a ser todos los restaurantes.
+    periodo: "mes", "ano" o None (todo el histórico).
+    """
+    pedido = request.args.get("restaurante_id", type=int)
+    restaurante_id = pedido
+    if por_usuario and usuario.rol != "admin":
+        restaurante_id = usuario.restaurante_id
+        if pedido and pedido != restaurante_id:
+            restaurante_id = None
+
+    ahora = datetime.now()
+    anio = mes = None
+    if periodo in ("mes", "ano"):
+        anio = request.args.get("ano", ahora.year, type=int)
+    if periodo == "mes":
+        mes = request.args.get("mes", ahora.month, type=int)
+    return restaurante_id, anio, mes
+
+
+def contexto_version(periodo="mes", por_usuario=True):
+    """
+    Clave de la petición (endpoint, query string, rol y alcance) y versión de
+    sus datos. Se calcula una vez por petición y la comparten el ETag y la caché.
+    """
+    if "api.contexto_version" not in request.environ:
+        contexto = None
+        usuario = sesion_actual()
+        if usuario:
+            restaurante_id, anio, mes = alcance(usuario, periodo, por_usuario)
+            consulta = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+            contexto = {
+                "usuario_id": usuario.id,
+                "clave": f"{request.path}?{consulta}|{usuario.rol}|{restaurante_id}|{anio}-{mes}",
+                "version": version_datos(restaurante_id, anio, mes)
+            }
+        request.environ["api.contexto_version"] = contexto
+    return request.environ["api.contexto_version"]
+
+
+def con_etag(periodo="mes", por_usuario=True):
+    """
+    Añade ETag a las respuestas 200 y contesta 304 si el cliente ya tiene
+    esa versión. Va debajo de @jwt_required() y encima de @cacheado().
+    """
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            contexto = contexto_version(periodo, por_usuario)
+            if contexto is None:
+                return f(*args, **kwargs)
+
+            etag = hmac.new(
+                current_app.config["JWT_SECRET_KEY"].encode(),
+                f"{contexto['usuario_id']}|{contexto['clave']}|{contexto['version']}".encode(),
+                hashlib.sha1).hexdigest()
+            if etag in request.if_none_match:
+                respuesta = make_response("", 304)
+            else:
+                respuesta = make_response(f(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            respuesta.set_etag(etag)
+            respuesta.headers["Cache-Control"] = "private, no-cache"
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,116 @@
+"""
+Configuración común de las pruebas.
+
+La app se importa apuntando a una base SQLite temporal, o a TEST_DATABASE_URL
+si se define (por ejemplo un Postgres de pruebas), nunca a DATABASE_URL. La
+caché de respuestas se desactiva y cada prueba empieza con las tablas vacías.
+
+Se ejecutan con: $ pipenv run pytest
+"""
+import os
+import sys
+import tempfile
+import warnings
+
+import pytest
+from sqlalchemy import event, MetaData
+from sqlalchemy.exc import SAWarning
+from werkzeug.security import generate_password_hash
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+
+_CARPETA = tempfile.mkdtemp(prefix="pruebas-api-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_CARPETA}/pruebas.db"
+os.environ.setdefault("JWT_SECRET_KEY", "clave-de-pruebas-de-al-menos-32-bytes")
+os.environ["CACHE_BACKEND"] = "ninguna"
+
+from app import app as _app  # noqa: E402
+from api.models import db as _db, Usuario, Restaurante  # noqa: E402
+from api.sesion import crear_token  # noqa: E402
+
+
+def _borrar_todo():
+    # Reflejando la base también se borran las tablas que no están en los
+    # modelos (alembic_version si una prueba ha corrido las migraciones)
+    metadata = MetaData()
+    with warnings.catch_warnings():
+        # SQLite no refleja el índice por expresión de ventas; se borra con la tabla
+        warnings.simplefilter("ignore", SAWarning)
+        metadata.reflect(bind=_db.engine)
+    metadata.drop_all(bind=_db.engine)
+
+
+@pytest.fixture
+def app():
+    _app.config["TESTING"] = True
+    with _app.app_context():
+        _borrar_todo()
+        _db.create_all()
+        yield _app
+        _db.session.remove()
+        _borrar_todo()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def es_postgres(app):
+    return _db.engine.dialect.name == "postgresql"
+
+
+@pytest.fixture
+def crear_restaurantes(db):
+    def crear(n, prefijo="R"):
+        restaurantes = [Restaurante(nombre=f"{prefijo}{i}") for i in range(n)]
+        db.session.add_all(restaurantes)
+        db.session.commit()
+        return restaurantes
+    return crear
+
+
+@pytest.fixture
+def crear_usuario(db):
+    def crear(rol="admin", restaurante=None):
+        numero = db.session.query(Usuario).count() + 1
+        usuario = Usuario(nombre=f"{rol}{numero}", email=f"{rol}{numero}@pruebas.local",
+                          password=generate_password_hash("pruebas"), rol=rol,
+                          restaurante_id=restaurante.id if restaurante else None)
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario
+    return crear
+
+
+@pytest.fixture
+def cabeceras(app):
+    """Cabeceras de autorización con el token del usuario."""
+    def crear(usuario):
+        return {"Authorization": "Bearer " + crear_token(usuario)}
+    return crear
+
+
+@pytest.fixture
+def contar_consultas(db):
+    """Ejecuta la función recibida y devuelve cuántas sentencias SQL ha lanzado."""
+    def contar(funcion):
+        sentencias = []
+
+        def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+            sentencias.append(sentencia)
+
+        event.listen(db.engine, "before_cursor_execute", registrar)
+        try:
+            funcion()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", registrar)
+        return len(sentencias)
+    return contar
@@ -0,0 +1,129 @@
+"""
+POST /api/ventas: la venta suelta y el lote pasan por la misma validación y
+los mismos permisos (validar_ventas), y el lote devuelve el estado de cada
+fila con un código que resume el resultado.
+"""
+from datetime import date
+
+import pytest
+
+from api import routes
+from api.models import Venta
+
+
+@pytest.fixture
+def datos(crear_restaurantes, crear_usuario):
+    uno, dos = crear_restaurantes(2)
+    return {"uno": uno, "dos": dos, "admin": crear_usuario("admin"), "encargado": crear_usuario("encargado", uno)}
+
+
+def _venta(restaurante, dia=1, monto=100, turno="comida"):
+    return {"fecha": f"2025-03-{dia:02d}", "monto": monto, "turno": turno, "restaurante_id": restaurante.id}
+
+
+def _montos(db):
+    return sorted((v.restaurante_id, v.fecha.day, v.turno, v.monto) for v in db.session.query(Venta))
+
+
+def test_venta_suelta(db, cliente, cabeceras, datos):
+    autorizacion = cabeceras(datos["encargado"])
+    respuesta = cliente.post("/api/ventas", json=_venta(datos["uno"]), headers=autorizacion)
+    assert (respuesta.status_code, respuesta.get_json()["estado"]) == (201, "creada")
+
+    assert cliente.post("/api/ventas", json=_venta(datos["uno"], monto=5), headers=autorizacion).status_code == 409
+    respuesta = cliente.post("/api/ventas?modo=acumular", json=_venta(datos["uno"], monto=5), headers=autorizacion)
+    assert (respuesta.status_code, respuesta.get_json()["estado"]) == (200, "acumulada")
+    assert _montos(db) == [(datos["uno"].id, 1, "comida", 105)]
+
+
+@pytest.mark.parametrize("cambios, error", [
+    ({"monto": "abc"}, "El monto debe ser un número mayor que 0"),
+    ({"monto": "NaN"}, "El monto debe ser un número mayor que 0"),
+    ({"monto": -5}, "El monto debe ser un número mayor que 0"),
+    ({"fecha": "01/03/2025"}, "Fecha no válida (formato YYYY-MM-DD)"),
+    ({"restaurante_id": 9999}, "Restaurante no encontrado"),
+    ({"turno": "t" * 51}, "turno supera los 50 caracteres"),
+    ({"monto": None}, "Faltan campos obligatorios: monto"),
+])
+def test_venta_suelta_no_valida(db, cliente, cabeceras, datos, cambios, error):
+    respuesta = cliente.post("/api/ventas", json={**_venta(datos["uno"]), **cambios},
+                             headers=cabeceras(datos["encargado"]))
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["errores"] == [error]
+    assert _montos(db) == []
+
+
+def test_venta_suelta_de_otro_restaurante(db, cliente, cabeceras, datos):
+    respuesta = cliente.post("/api/ventas", json=_venta(datos["dos"]), headers=cabeceras(datos["encargado"]))
+    assert respuesta.status_code == 403
+    assert respuesta.get_json()["msg"] == "No puedes registrar ventas de otro restaurante"
+    assert _montos(db) == []
+
+    # El admin sí puede
+    assert cliente.post("/api/ventas", json=_venta(datos["dos"]), headers=cabeceras(datos["admin"])).status_code == 201
+
+
+@pytest.mark.parametrize("modo, previas, lote, codigo, estados", [
+    # Alguna creada: 201
+    ("rechazar", [], [1, 2], 201, ["creada", "creada"]),
+    ("rechazar", [1], [1, 2, "mal"], 201, ["duplicada", "creada", "error"]),
+    # Ninguna creada pero alguna guardada: 200
+    ("reemplazar", [1], [1], 200, ["reemplazada"]),
+    ("acumular", [1, 2], [1, 2, "mal"], 200, ["acumulada", "acumulada", "error"]),
+    # Nada guardado: 409 si hay duplicadas, 400 si solo hay errores
+    ("rechazar", [1, 2], [1, 2, "mal"], 409, ["duplicada", "duplicada", "error"]),
+    ("rechazar", [], ["mal", "otro"], 400, ["error", "error"]),
+    # Repetidas dentro del lote: la primera se crea, el resto sigue el modo
+    ("rechazar", [], [3, 3], 201, ["creada", "duplicada"]),
+    ("acumular", [], [3, 3], 201, ["creada", "acumulada"]),
+])
+def test_lote_codigos_y_estados(db, cliente, cabeceras, datos, modo, previas, lote, codigo, estados):
+    uno, dos = datos["uno"], datos["dos"]
+    autorizacion = cabeceras(datos["encargado"])
+    for dia in previas:
+        db.session.add(Venta(fecha=date(2025, 3, dia), monto=100, turno="comida", restaurante_id=uno.id))
+    db.session.commit()
+
+    filas = []
+    for fila in lote:
+        if fila == "mal":
+            filas.append(_venta(uno, monto="abc"))
+        elif fila == "otro":
+            filas.append(_venta(dos))
+        else:
+            filas.append(_venta(uno, dia=fila, monto=10))
+
+    respuesta = cliente.post("/api/ventas", json={"ventas": filas, "modo": modo}, headers=autorizacion)
+    assert respuesta.status_code == codigo
+    cuerpo = respuesta.get_json()
+    assert [r["estado"] for r in cuerpo["resultados"]] == estados
+    assert [r["fila"] for r in cuerpo["resultados"]] == list(range(len(lote)))
+    for estado in set(estados):
+        assert cuerpo["totales"][estado] == estados.count(estado)
+    if "otro" in lote:
+        assert cuerpo["resultados"][lote.index("otro")]["errores"] == ["No puedes registrar ventas de otro restaurante"]
+
+
+def test_lote_montos_segun_modo(db, cliente, cabeceras, datos):
+    autorizacion = cabeceras(datos["admin"])
+    uno = datos["uno"]
+    cliente.post("/api/ventas", json=[_venta(uno, 1, 100), _venta(uno, 2, 100)], headers=autorizacion)
+
+    cliente.post("/api/ventas?modo=reemplazar", json=[_venta(uno, 1, 40), _venta(uno, 1, 30)], headers=autorizacion)
+    cliente.post("/api/ventas", json={"modo": "acumular", "ventas": [_venta(uno, 2, 0.1), _venta(uno, 2, 0.2)]},
+                 headers=autorizacion)
+    assert _montos(db) == [(uno.id, 1, "comida", 30), (uno.id, 2, "comida", 100.3)]
+
+
+def test_lote_limites(cliente, cabeceras, monkeypatch, datos):
+    autorizacion = cabeceras(datos["admin"])
+    monkeypatch.setattr(routes, "MAX_FILAS_VENTAS", 3)
+
+    filas = [_venta(datos["uno"], dia) for dia in range(1, 5)]
+    respuesta = cliente.post("/api/ventas", json=filas, headers=autorizacion)
+    assert respuesta.status_code == 413
+    assert respuesta.get_json()["msg"] == "Máximo 3 ventas por petición"
+
+    assert cliente.post("/api/ventas", json=filas[:3], headers=autorizacion).status_code == 201
+    assert cliente.post("/api/ventas", json={"ventas": []}, headers=autorizacion).status_code == 400
+    assert cliente.post("/api/ventas", json={"ventas": filas, "modo": "otro"}, headers=autorizacion).status_code == 400
@@ -0,0 +1,35 @@
+"""Porcentaje de gasto sobre ventas (api/analitica.porcentaje)."""
+import numpy as np
+import pytest
+
+from api.analitica import porcentaje
+
+
+@pytest.mark.parametrize("gastos, ventas, esperado", [
+    (1, 20000, 0.01),            # 0.005 %: el empate sube
+    (1, 20001, 0.0),             # un poco menos de 0.005 %
+    (2675, 100000, 2.68),        # round(2.675, 2) en float daría 2.67
+    (48144, 320000, 15.05),      # 15.045 exacto
+    (1, 3, 33.33),
+    (2, 3, 66.67),
+    (300, 100, 300.0),
+    (0, 100, 0.0),
+    (-1, 20000, -0.01),          # los empates negativos se alejan del cero
+    (-2675, 100000, -2.68),
+    (-1, 3, -33.33),
+    (100, 0, 0.0),               # sin ventas
+    (100, -5, 0.0),
+])
+def test_porcentaje_redondea_con_empates_lejos_del_cero(gastos, ventas, esperado):
+    assert float(porcentaje(gastos, ventas)) == esperado
+
+
+def test_porcentaje_de_arrays():
+    gastos = np.array([1, 2675, -1, 500, 0])
+    ventas = np.array([20000, 100000, 20000, 0, 7])
+    assert porcentaje(gastos, ventas).tolist() == [0.01, 2.68, -0.01, 0.0, 0.0]
+
+
+def test_porcentaje_sin_desbordar_con_importes_grandes():
+    # 10 millones de euros en céntimos: gastos * 20000 cabe en int64
+    assert float(porcentaje(10**9, 4 * 10**9)) == 25.0
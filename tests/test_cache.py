@@ -0,0 +1,104 @@
+"""
+Caché de respuestas (api/cache.py): un acierto no consulta los datos, y una
+escritura solo invalida las entradas de su restaurante y mes. Las pruebas
+activan la caché con configurar_cache(), ya que conftest la desactiva.
+"""
+from datetime import date
+
+import pytest
+
+from api import cache, routes
+from api.models import Venta
+
+URL = "/api/dashboard/restaurante?mes={mes}&ano=2025"
+
+
+@pytest.fixture
+def memoria(app):
+    backend = cache.CacheMemoria()
+    cache.configurar_cache(backend)
+    yield backend
+    cache.configurar_cache(None)
+
+
+@pytest.fixture
+def datos(db, crear_restaurantes, crear_usuario):
+    uno, dos = crear_restaurantes(2)
+    for restaurante in (uno, dos):
+        for mes in (2, 3):
+            db.session.add(Venta(fecha=date(2025, mes, 1), monto=100, turno="comida",
+                                 restaurante_id=restaurante.id))
+    db.session.commit()
+    return {"uno": uno, "dos": dos, "admin": crear_usuario("admin"),
+            "encargado_uno": crear_usuario("encargado", uno), "encargado_dos": crear_usuario("encargado", dos)}
+
+
+def _pedir(cliente, autorizacion, mes=3):
+    respuesta = cliente.get(URL.format(mes=mes), headers=autorizacion)
+    assert respuesta.status_code == 200
+    return respuesta
+
+
+def test_acierto_no_consulta_los_datos(cliente, cabeceras, contar_consultas, monkeypatch, memoria, datos):
+    autorizacion = cabeceras(datos["encargado_uno"])
+    respuestas = []
+    fallo = contar_consultas(lambda: respuestas.append(_pedir(cliente, autorizacion)))
+    assert respuestas[0].headers["X-Cache"] == "MISS"
+
+    def sin_llamar(*args, **kwargs):
+        raise AssertionError("un acierto de caché no debe calcular el dashboard")
+
+    monkeypatch.setattr(routes, "dashboard_restaurante", sin_llamar)
+    acierto = contar_consultas(lambda: respuestas.append(_pedir(cliente, autorizacion)))
+    assert respuestas[1].headers["X-Cache"] == "HIT"
+    assert respuestas[1].get_json() == respuestas[0].get_json()
+    # Solo quedan la sesión y la versión de los datos
+    assert acierto < fallo
+    assert memoria.estadisticas() == {"aciertos": 1, "fallos": 1, "entradas": 1}
+
+
+def test_escritura_invalida_solo_su_restaurante_y_mes(db, cliente, cabeceras, memoria, datos):
+    uno, dos = cabeceras(datos["encargado_uno"]), cabeceras(datos["encargado_dos"])
+    for autorizacion, mes in ((uno, 3), (uno, 2), (dos, 3)):
+        assert _pedir(cliente, autorizacion, mes).headers["X-Cache"] == "MISS"
+
+    db.session.add(Venta(fecha=date(2025, 3, 20), monto=50, turno="cena", restaurante_id=datos["uno"].id))
+    db.session.commit()
+
+    respuesta = _pedir(cliente, uno)
+    assert respuesta.headers["X-Cache"] == "MISS"
+    assert respuesta.get_json()["porcentaje"]["ventas"] == 150
+    assert _pedir(cliente, uno, 2).headers["X-Cache"] == "HIT"
+    assert _pedir(cliente, dos).headers["X-Cache"] == "HIT"
+
+
+def test_escritura_invalida_las_vistas_de_todos_los_restaurantes(db, cliente, cabeceras, memoria, datos):
+    admin = cabeceras(datos["admin"])
+    url = "/api/admin/overview?mes={mes}&ano=2025"
+    for mes in (2, 3):
+        assert cliente.get(url.format(mes=mes), headers=admin).headers["X-Cache"] == "MISS"
+
+    db.session.add(Venta(fecha=date(2025, 3, 20), monto=50, turno="cena", restaurante_id=datos["dos"].id))
+    db.session.commit()
+
+    assert cliente.get(url.format(mes=3), headers=admin).headers["X-Cache"] == "MISS"
+    assert cliente.get(url.format(mes=2), headers=admin).headers["X-Cache"] == "HIT"
+
+
+def test_redis(cliente, cabeceras, datos):
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = cache.CacheRedis(fakeredis.FakeRedis())
+    cache.configurar_cache(backend)
+    try:
+        autorizacion = cabeceras(datos["encargado_uno"])
+        primera = _pedir(cliente, autorizacion)
+        segunda = _pedir(cliente, autorizacion)
+        assert (primera.headers["X-Cache"], segunda.headers["X-Cache"]) == ("MISS", "HIT")
+        assert segunda.get_json() == primera.get_json()
+        assert segunda.mimetype == "application/json"
+        assert backend.cliente.ttl(next(iter(backend.cliente.scan_iter("cache:/api/*")))) > 0
+
+        estado = cliente.get("/api/admin/cache", headers=cabeceras(datos["admin"])).get_json()
+        assert estado == {"backend": "redis", "aciertos": 1, "fallos": 1, "ratio": 0.5}
+    finally:
+        cache.configurar_cache(None)
@@ -0,0 +1,126 @@
+"""
+Carga masiva de gastos (/api/gastos/lote, api/carga_gastos.py): con
+cualquier fila errónea no se guarda nada y se devuelve el detalle por fila;
+si todo es válido, el INSERT de Core deja los resúmenes igual que si se
+reconstruyeran.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from api.carga_gastos import validar_gastos
+from api.models import Gasto, Outbox, Proveedor, ResumenDiario, ResumenMensual, VersionDatos
+from api.resumenes import reconstruir_resumen_diario, reconstruir_resumen_mensual
+from api.sesion import Sesion
+
+
+@pytest.fixture
+def datos(db, crear_restaurantes, crear_usuario):
+    uno, dos = crear_restaurantes(2)
+    proveedores = [Proveedor(nombre=f"P{r.id}", categoria="alimentos", restaurante_id=r.id) for r in (uno, dos)]
+    db.session.add_all(proveedores)
+    db.session.commit()
+    return {"uno": uno, "dos": dos, "proveedor_uno": proveedores[0], "proveedor_dos": proveedores[1],
+            "admin": crear_usuario("admin"), "encargado": crear_usuario("encargado", uno)}
+
+
+def _gasto(restaurante, proveedor, dia=10, monto=25.5, **extra):
+    return {"fecha": f"2025-03-{dia:02d}", "monto": monto, "categoria": "alimentos",
+            "restaurante_id": restaurante.id, "proveedor_id": proveedor.id, **extra}
+
+
+def _filas(db, modelo):
+    columnas = list(modelo.__table__.columns)
+    return sorted(tuple(f) for f in db.session.execute(select(*columnas)).all()
+                  if any(f._mapping[c.name] for c in columnas if c.name.startswith(("total", "num", "cantidad"))))
+
+
+def test_errores_por_fila_sin_guardar_nada(db, cliente, cabeceras, datos):
+    uno, proveedor = datos["uno"], datos["proveedor_uno"]
+    lote = [
+        _gasto(uno, proveedor),
+        _gasto(uno, proveedor, monto="abc"),
+        {"fecha": "2025-13-40", "monto": -3, "restaurante_id": uno.id, "proveedor_id": proveedor.id},
+        _gasto(uno, datos["proveedor_dos"]),
+        {"monto": 10},
+        "no soy un gasto",
+        _gasto(uno, proveedor, categoria="x" * 101, usuario_id=9999),
+        _gasto(uno, proveedor, monto=float("inf")),
+    ]
+
+    respuesta = cliente.post("/api/gastos/lote", json={"gastos": lote}, headers=cabeceras(datos["encargado"]))
+    assert respuesta.status_code == 400
+    cuerpo = respuesta.get_json()
+    assert (cuerpo["total"], cuerpo["con_errores"]) == (8, 7)
+    assert {e["fila"]: e["errores"] for e in cuerpo["errores"]} == {
+        1: ["El monto debe ser un número mayor que 0"],
+        2: ["Fecha no válida (formato YYYY-MM-DD)", "El monto debe ser un número mayor que 0"],
+        3: ["El proveedor no pertenece al restaurante"],
+        4: ["Faltan campos obligatorios: fecha, proveedor_id, restaurante_id"],
+        5: ["La fila debe ser un objeto"],
+        6: ["Usuario no encontrado", "categoria supera los 100 caracteres"],
+        7: ["El monto debe ser un número mayor que 0"],
+    }
+
+    for modelo in (Gasto, ResumenDiario, ResumenMensual, Outbox):
+        assert db.session.query(modelo).count() == 0, modelo.__name__
+    assert db.session.query(VersionDatos).filter(VersionDatos.restaurante_id == uno.id).count() == 0
+
+
+def test_solo_su_restaurante(db, cliente, cabeceras, datos):
+    lote = [_gasto(datos["uno"], datos["proveedor_uno"]), _gasto(datos["dos"], datos["proveedor_dos"])]
+
+    respuesta = cliente.post("/api/gastos/lote", json=lote, headers=cabeceras(datos["encargado"]))
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["errores"] == [
+        {"fila": 1, "errores": ["No puedes registrar gastos de otro restaurante"]}]
+    assert db.session.query(Gasto).count() == 0
+
+    respuesta = cliente.post("/api/gastos/lote", json=lote, headers=cabeceras(datos["admin"]))
+    assert respuesta.status_code == 201
+    assert respuesta.get_json()["insertados"] == 2
+    assert {g.usuario_id for g in db.session.query(Gasto)} == {datos["admin"].id}
+
+
+def test_resumenes_iguales_a_reconstruirlos(db, cliente, cabeceras, datos):
+    uno, dos = datos["uno"], datos["dos"]
+    # Un gasto previo por el ORM, para que la carga sume sobre filas existentes
+    db.session.add(Gasto(fecha=date(2025, 3, 10), monto=4.99, categoria="alimentos", restaurante_id=uno.id,
+                         proveedor_id=datos["proveedor_uno"].id, usuario_id=datos["admin"].id))
+    db.session.commit()
+    lote = ([_gasto(uno, datos["proveedor_uno"], dia=d % 28 + 1, monto=d + 0.15) for d in range(40)]
+            + [_gasto(uno, datos["proveedor_uno"], categoria=None), _gasto(dos, datos["proveedor_dos"], dia=31)]
+            + [dict(_gasto(uno, datos["proveedor_uno"]), fecha="2025-04-01")])
+
+    respuesta = cliente.post("/api/gastos/lote", json=lote, headers=cabeceras(datos["admin"]))
+    assert respuesta.status_code == 201
+
+    for modelo, reconstruir in ((ResumenDiario, reconstruir_resumen_diario),
+                                (ResumenMensual, reconstruir_resumen_mensual)):
+        mantenido = _filas(db, modelo)
+        reconstruir()
+        assert mantenido == _filas(db, modelo), modelo.__name__
+
+    versiones = dict(db.session.execute(select(
+        VersionDatos.restaurante_id * 100 + VersionDatos.mes, VersionDatos.version)
+        .where(VersionDatos.restaurante_id != 0)).all())
+    assert versiones == {uno.id * 100 + 3: 2, uno.id * 100 + 4: 1, dos.id * 100 + 3: 1}
+
+    # Un único aviso por restaurante para toda la carga
+    asuntos = sorted(db.session.scalars(select(Outbox.asunto)))
+    assert asuntos == ["Carga de 1 gastos en R1", "Carga de 42 gastos en R0"]
+
+
+def test_validar_consultas_constantes(db, contar_consultas, datos):
+    sesion = Sesion(datos["admin"].id, "admin", None, None)
+
+    def consultas(n):
+        lote = [_gasto(datos["uno" if i % 2 else "dos"], datos["proveedor_uno" if i % 2 else "proveedor_dos"])
+                for i in range(n)]
+        resultado = []
+        numero = contar_consultas(lambda: resultado.append(validar_gastos(lote, sesion)))
+        assert resultado[0][1] == [] and len(resultado[0][0]) == n
+        return numero
+
+    assert consultas(2) == consultas(200) == 3
@@ -0,0 +1,77 @@
+"""Elección del transporte de correo y envío del correo de restablecer contraseña."""
+import pytest
+
+from api.mail import servicio
+from api.mail.mailer import send_reset_email
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    for variable in ("EMAIL_TRANSPORTE", "SENDGRID_API_KEY", "MAIL_SERVER", "MAIL_PORT"):
+        monkeypatch.delenv(variable, raising=False)
+    yield monkeypatch
+    servicio.configurar_servicio(None)
+
+
+def test_sin_sendgrid_se_usa_smtp(entorno):
+    assert servicio.crear_transporte().nombre == "smtp"
+
+
+def test_con_clave_de_sendgrid_se_usa_sendgrid(entorno):
+    pytest.importorskip("requests")
+    entorno.setenv("SENDGRID_API_KEY", "SG.prueba")
+    assert servicio.crear_transporte().nombre == "sendgrid"
+
+
+def test_email_transporte_manda(entorno):
+    entorno.setenv("SENDGRID_API_KEY", "SG.prueba")
+    entorno.setenv("EMAIL_TRANSPORTE", "falso")
+    assert servicio.crear_transporte().nombre == "falso"
+
+
+def test_transporte_no_valido(entorno):
+    with pytest.raises(ValueError):
+        servicio.crear_transporte("paloma")
+
+
+def test_reset_por_smtp_sin_sendgrid(entorno):
+    enviados = []
+
+    class SMTPFalso:
+        def __init__(self, servidor, puerto, timeout=None):
+            self.servidor = (servidor, puerto)
+
+        def starttls(self):
+            pass
+
+        def login(self, usuario, password):
+            self.usuario = usuario
+
+        def send_message(self, mensaje):
+            enviados.append((self.servidor, self.usuario, mensaje["To"], mensaje["Subject"]))
+
+    entorno.setenv("EMAIL_USER", "cocina@example.com")
+    entorno.setenv("EMAIL_PASS", "secreta")
+    entorno.setattr(servicio.smtplib, "SMTP", SMTPFalso)
+
+    assert send_reset_email("chef@example.com", "token")["success"]
+    assert enviados == [(("smtp.gmail.com", 587), "cocina@example.com", "chef@example.com",
+                         "Restablece tu contraseña")]
+
+
+def test_transporte_sin_enviar_no_se_instancia():
+    class Incompleto(servicio.Transporte):
+        nombre = "incompleto"
+
+    with pytest.raises(TypeError):
+        Incompleto()
+
+
+def test_remitente_se_lee_al_crear_el_transporte(entorno):
+    entorno.delenv("EMAIL_USER", raising=False)
+    entorno.setenv("EMAIL_SENDER", "Cocina Central <cocina@example.com>")
+    assert servicio.TransporteSMTP().remitente == "Cocina Central <cocina@example.com>"
+
+    pytest.importorskip("requests")
+    assert servicio.TransporteSendGrid(api_key="SG.prueba").remitente == {
+        "email": "cocina@example.com", "name": "Cocina Central"}
@@ -0,0 +1,119 @@
+"""
+/dashboard/restaurante devuelve en una respuesta los mismos bloques que los
+endpoints individuales del dashboard, con como mucho dos consultas de datos
+aunque haya más restaurantes o más filas en el mes.
+"""
+from datetime import date
+
+import pytest
+
+from api.dashboard import dashboard_restaurante, SECCIONES
+from api.models import Gasto, Proveedor, Venta
+
+INDIVIDUALES = {
+    "resumen_diario": "/api/gastos/resumen-diario",
+    "ventas_diarias": "/api/ventas/resumen-diario",
+    "porcentaje": "/api/gastos/porcentaje-mensual",
+    "categorias": "/api/gastos/categorias-resumen",
+    "resumen_mensual": "/api/gastos/resumen-mensual",
+}
+
+
+def _movimientos(db, restaurante, usuario, dias=(3, 10, 17)):
+    proveedores = [Proveedor(nombre=f"{restaurante.nombre}-{categoria or 'otros'}", categoria=categoria,
+                             restaurante_id=restaurante.id)
+                   for categoria in ("alimentos", "bebidas", None)]
+    db.session.add_all(proveedores)
+    db.session.flush()
+    for dia in dias:
+        db.session.add(Venta(fecha=date(2025, 3, dia), monto=250.35, turno="comida",
+                             restaurante_id=restaurante.id))
+        db.session.add(Venta(fecha=date(2025, 3, dia), monto=410.1, turno="cena",
+                             restaurante_id=restaurante.id))
+        for i, proveedor in enumerate(proveedores):
+            db.session.add(Gasto(fecha=date(2025, 3, dia + i), monto=33.33 * (i + 1),
+                                 categoria=proveedor.categoria, proveedor_id=proveedor.id,
+                                 usuario_id=usuario.id, restaurante_id=restaurante.id))
+    db.session.commit()
+
+
+@pytest.fixture
+def datos(db, crear_restaurantes, crear_usuario):
+    restaurante, otro = crear_restaurantes(2)
+    admin = crear_usuario("admin")
+    encargado = crear_usuario("encargado", restaurante)
+    _movimientos(db, restaurante, admin)
+    _movimientos(db, otro, admin, dias=(5,))
+    # Fuera del mes: no debe aparecer en ningún bloque
+    db.session.add(Venta(fecha=date(2025, 4, 1), monto=999, turno="comida", restaurante_id=restaurante.id))
+    db.session.commit()
+    return {"restaurante": restaurante, "admin": admin, "encargado": encargado}
+
+
+def test_bloques_iguales_a_los_endpoints_individuales(cliente, cabeceras, datos):
+    autorizacion = cabeceras(datos["encargado"])
+    agrupado = cliente.get("/api/dashboard/restaurante?mes=3&ano=2025", headers=autorizacion)
+    assert agrupado.status_code == 200
+    agrupado = agrupado.get_json()
+    assert set(agrupado) == set(SECCIONES)
+
+    for seccion, url in INDIVIDUALES.items():
+        individual = cliente.get(f"{url}?mes=3&ano=2025", headers=autorizacion)
+        assert individual.status_code == 200, seccion
+        assert individual.get_json() == agrupado[seccion], seccion
+
+    assert [fila["dia"] for fila in agrupado["ventas_diarias"]] == [3, 10, 17]
+    assert agrupado["porcentaje"] == {"ventas": 1981.35, "gastos": 599.94, "porcentaje": 30.28}
+    assert agrupado["categorias"] == [{"categoria": "Sin categoría", "total": 299.97},
+                                      {"categoria": "alimentos", "total": 99.99},
+                                      {"categoria": "bebidas", "total": 199.98}]
+
+    # El admin elige restaurante y recibe lo mismo que su encargado
+    restaurante_id = datos["restaurante"].id
+    admin = cabeceras(datos["admin"])
+    assert cliente.get(f"/api/dashboard/restaurante?mes=3&ano=2025&restaurante_id={restaurante_id}",
+                       headers=admin).get_json() == agrupado
+    diario = cliente.get(f"/api/admin/gastos/resumen-diario?mes=3&ano=2025&restaurante_id={restaurante_id}",
+                         headers=admin)
+    assert diario.get_json() == agrupado["resumen_diario"]
+
+
+def test_secciones_pedidas(cliente, cabeceras, datos):
+    autorizacion = cabeceras(datos["encargado"])
+    respuesta = cliente.get("/api/dashboard/restaurante?mes=3&ano=2025&secciones=porcentaje,categorias",
+                            headers=autorizacion)
+    assert set(respuesta.get_json()) == {"porcentaje", "categorias"}
+
+    respuesta = cliente.get("/api/dashboard/restaurante?mes=3&ano=2025&secciones=porcentaje,otra",
+                            headers=autorizacion)
+    assert respuesta.status_code == 400
+    assert "otra" in respuesta.get_json()["msg"]
+
+
+@pytest.mark.parametrize("secciones, maximo", [
+    (SECCIONES, 2),
+    ({"resumen_diario", "ventas_diarias", "porcentaje"}, 1),
+    ({"categorias", "resumen_mensual"}, 1),
+])
+def test_como_mucho_dos_consultas(db, contar_consultas, datos, secciones, maximo):
+    restaurante_id = datos["restaurante"].id
+    db.session.expire_all()
+    assert contar_consultas(lambda: dashboard_restaurante(restaurante_id, 3, 2025, secciones)) <= maximo
+
+
+def test_consultas_constantes_con_mas_restaurantes_y_filas(db, cliente, cabeceras, crear_restaurantes,
+                                                          contar_consultas, datos):
+    autorizacion = cabeceras(datos["encargado"])
+    url = "/api/dashboard/restaurante?mes=3&ano=2025"
+
+    def consultas():
+        respuestas = []
+        numero = contar_consultas(lambda: respuestas.append(cliente.get(url, headers=autorizacion)))
+        assert respuestas[0].status_code == 200
+        return numero
+
+    pocas = consultas()
+    for restaurante in crear_restaurantes(10, "M"):
+        _movimientos(db, restaurante, datos["admin"])
+    _movimientos(db, datos["restaurante"], datos["admin"], dias=tuple(d for d in range(1, 27) if d not in (3, 10, 17)))
+    assert consultas() == pocas
@@ -0,0 +1,57 @@
+"""Conversión de importes a céntimos y sumas exactas (api/dinero.py)."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from api.dinero import a_centimos, a_euros, suma_euros
+from api.models import Venta
+
+
+@pytest.mark.parametrize("euros, centimos", [
+    # Medio céntimo redondea hacia arriba (lejos del cero)
+    (0.005, 1),
+    (0.004, 0),
+    (2.675, 268),    # el float es 2.67499999..., pero se redondea su decimal más corto
+    (1.005, 101),
+    (0.285, 29),
+    (12.345, 1235),
+    (-0.005, -1),
+    (-2.675, -268),
+    (-0.004, 0),
+    (0, 0),
+    (10, 1000),
+    ("2.675", 268),
+    ("-0.005", -1),
+    (Decimal("1.115"), 112),
+    (None, None),
+])
+def test_a_centimos_redondea_al_centimo_mas_cercano(euros, centimos):
+    assert a_centimos(euros) == centimos
+
+
+@pytest.mark.parametrize("centimos, euros", [(268, 2.68), (1, 0.01), (-1, -0.01), (0, 0), (None, None)])
+def test_a_euros(centimos, euros):
+    assert a_euros(centimos) == euros
+
+
+def test_ida_y_vuelta_sin_perdidas():
+    importes = [i / 100 for i in range(-1000, 100000, 7)]
+    assert [a_euros(a_centimos(x)) for x in importes] == importes
+
+
+@pytest.mark.parametrize("montos, total", [
+    ([0.1, 0.2], 0.3),                       # en float sería 0.30000000000000004
+    ([0.005, 2.675], 2.69),
+    ([2.675, -0.005, 0.005], 2.68),
+    ([0.1] * 10, 1.0),
+    ([], None),
+])
+def test_suma_euros_es_exacta(db, crear_restaurantes, montos, total):
+    restaurante_id = crear_restaurantes(1)[0].id
+    db.session.add_all(Venta(fecha=date(2025, 3, 1), monto=monto, turno=f"t{i}", restaurante_id=restaurante_id)
+                       for i, monto in enumerate(montos))
+    db.session.commit()
+
+    assert db.session.scalar(select(suma_euros(Venta.monto_cent))) == total
@@ -0,0 +1,118 @@
+"""
+GET condicional (api/versiones.py): 304 mientras no cambien los datos del
+alcance de la respuesta, nuevas versiones al mover filas de mes o de
+restaurante, y ningún 304 para un ETag de otro usuario, rol o alcance.
+"""
+import hashlib
+from datetime import date
+
+import pytest
+
+from api.models import Venta, VersionDatos
+from api.versiones import version_datos
+
+URL = "/api/dashboard/restaurante?mes={mes}&ano=2025"
+
+
+@pytest.fixture
+def datos(db, crear_restaurantes, crear_usuario):
+    uno, dos = crear_restaurantes(2)
+    venta = Venta(fecha=date(2025, 3, 10), monto=100, turno="comida", restaurante_id=uno.id)
+    db.session.add_all([venta, Venta(fecha=date(2025, 3, 10), monto=70, turno="cena", restaurante_id=dos.id)])
+    db.session.commit()
+    return {"uno": uno, "dos": dos, "venta": venta, "admin": crear_usuario("admin"),
+            "encargado_uno": crear_usuario("encargado", uno), "encargado_dos": crear_usuario("encargado", dos)}
+
+
+def _etag(cliente, url, autorizacion):
+    respuesta = cliente.get(url, headers=autorizacion)
+    assert respuesta.status_code == 200
+    assert respuesta.headers["Cache-Control"] == "private, no-cache"
+    return respuesta.headers["ETag"].strip('"')
+
+
+def _condicional(cliente, url, autorizacion, etag):
+    return cliente.get(url, headers={**autorizacion, "If-None-Match": f'"{etag}"'})
+
+
+def _versiones(db, restaurante_id):
+    filas = db.session.execute(db.select(VersionDatos.anio, VersionDatos.mes, VersionDatos.version)
+                               .where(VersionDatos.restaurante_id == restaurante_id))
+    return {(anio, mes): version for anio, mes, version in filas}
+
+
+def test_304_hasta_que_cambian_los_datos(db, cliente, cabeceras, datos):
+    autorizacion = cabeceras(datos["encargado_uno"])
+    url = URL.format(mes=3)
+    etag = _etag(cliente, url, autorizacion)
+
+    respuesta = _condicional(cliente, url, autorizacion, etag)
+    assert respuesta.status_code == 304
+    assert respuesta.data == b""
+
+    # Un cambio en otro restaurante no afecta
+    db.session.add(Venta(fecha=date(2025, 3, 11), monto=5, turno="comida", restaurante_id=datos["dos"].id))
+    db.session.commit()
+    assert _condicional(cliente, url, autorizacion, etag).status_code == 304
+
+    datos["venta"].monto = 120
+    db.session.commit()
+    respuesta = _condicional(cliente, url, autorizacion, etag)
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["porcentaje"]["ventas"] == 120
+    assert respuesta.headers["ETag"].strip('"') != etag
+
+
+@pytest.mark.parametrize("cambio", ["fecha", "restaurante_id"])
+def test_mover_la_venta_sube_las_dos_versiones(db, cliente, cabeceras, datos, cambio):
+    uno, dos = datos["uno"].id, datos["dos"].id
+    antes = {uno: _versiones(db, uno), dos: _versiones(db, dos)}
+    marzo, abril = URL.format(mes=3), URL.format(mes=4)
+    autorizacion = cabeceras(datos["admin"])
+    etags = {(r, url): _etag(cliente, f"{url}&restaurante_id={r}", autorizacion)
+             for r in (uno, dos) for url in (marzo, abril)}
+
+    venta = datos["venta"]
+    if cambio == "fecha":
+        venta.fecha = date(2025, 4, 2)
+        cambiados = {(uno, marzo), (uno, abril)}
+    else:
+        venta.restaurante_id = dos
+        cambiados = {(uno, marzo), (dos, marzo)}
+    db.session.commit()
+
+    despues = {uno: _versiones(db, uno), dos: _versiones(db, dos)}
+    for r in (uno, dos):
+        for mes in (3, 4):
+            esperado = antes[r].get((2025, mes), 0) + (1 if (r, URL.format(mes=mes)) in cambiados else 0)
+            assert despues[r].get((2025, mes), 0) == esperado, (r, mes)
+
+    for (r, url), etag in etags.items():
+        estado = _condicional(cliente, f"{url}&restaurante_id={r}", autorizacion, etag).status_code
+        assert estado == (200 if (r, url) in cambiados else 304), (r, url)
+
+
+def test_304_no_cruza_roles_ni_alcances(cliente, cabeceras, datos):
+    admin = cabeceras(datos["admin"])
+    uno, dos = cabeceras(datos["encargado_uno"]), cabeceras(datos["encargado_dos"])
+    overview = "/api/admin/overview?mes=3&ano=2025"
+
+    # El ETag del admin no abre el overview a un encargado
+    assert _condicional(cliente, overview, uno, _etag(cliente, overview, admin)).status_code == 403
+
+    # Ni uno calculado por el encargado para su propia clave y versión
+    clave = f"{overview.replace('mes=3&ano=2025', 'ano=2025&mes=3')}|encargado|{datos['uno'].id}|2025-3"
+    falso = hashlib.sha1(f"{clave}|{version_datos(datos['uno'].id, 2025, 3)}".encode()).hexdigest()
+    assert _condicional(cliente, overview, uno, falso).status_code == 403
+
+    # El encargado que pide otro restaurante recibe el suyo, no un 304 del admin
+    url = URL.format(mes=3) + f"&restaurante_id={datos['dos'].id}"
+    respuesta = _condicional(cliente, url, uno, _etag(cliente, url, admin))
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["porcentaje"]["ventas"] == 100
+
+    # Ni el de un encargado de otro restaurante en la misma URL
+    url = URL.format(mes=3)
+    respuesta = _condicional(cliente, url, dos, _etag(cliente, url, uno))
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["porcentaje"]["ventas"] == 70
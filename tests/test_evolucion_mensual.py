@@ -0,0 +1,47 @@
+"""
+/api/gasto-evolucion-mensual sale de una sola consulta agrupada sobre
+resumen_mensual: el número de sentencias no depende de cuántos restaurantes
+haya.
+"""
+from datetime import date
+
+import pytest
+
+from api.models import Gasto, Proveedor
+
+
+def _gastos(db, restaurantes, usuario):
+    for restaurante in restaurantes:
+        proveedor = Proveedor(nombre=f"P{restaurante.id}", restaurante_id=restaurante.id)
+        db.session.add(proveedor)
+        db.session.flush()
+        for mes in range(1, 13):
+            db.session.add(Gasto(fecha=date(2025, mes, 10), monto=10.5, restaurante_id=restaurante.id,
+                                 proveedor_id=proveedor.id, usuario_id=usuario.id,
+                                 categoria="alimentos"))
+    db.session.commit()
+
+
+@pytest.mark.parametrize("desglose", ["", "restaurante"])
+def test_consultas_constantes_con_el_numero_de_restaurantes(db, cliente, crear_usuario, cabeceras,
+                                                           crear_restaurantes, contar_consultas, desglose):
+    admin = crear_usuario("admin")
+    autorizacion = cabeceras(admin)
+    url = f"/api/gasto-evolucion-mensual?ano=2025&desglose={desglose}"
+
+    def consultas_con(restaurantes):
+        _gastos(db, restaurantes, admin)
+        respuestas = []
+        numero = contar_consultas(lambda: respuestas.append(cliente.get(url, headers=autorizacion)))
+        assert respuestas[0].status_code == 200
+        return numero, respuestas[0].get_json()
+
+    pocos, datos = consultas_con(crear_restaurantes(2, "N"))
+    assert [mes["total_gastado"] for mes in datos] == [21.0] * 12
+
+    muchos, datos = consultas_con(crear_restaurantes(10, "M"))
+    assert [mes["total_gastado"] for mes in datos] == [126.0] * 12
+    if desglose:
+        assert len(datos[0]["restaurantes"]) == 12
+
+    assert muchos == pocos
@@ -0,0 +1,66 @@
+"""Exportación de ventas, gastos y facturas (/api/export/<tipo>)."""
+import csv
+import io
+from datetime import date
+
+from api.models import Venta
+
+
+def _ventas(db, restaurantes, por_restaurante=3):
+    for restaurante in restaurantes:
+        for dia in range(1, por_restaurante + 1):
+            db.session.add(Venta(fecha=date(2025, 3, dia), monto=100, turno="noche",
+                                 restaurante_id=restaurante.id))
+    db.session.commit()
+
+
+def _filas_csv(respuesta):
+    return list(csv.reader(io.StringIO(respuesta.get_data(as_text=True).lstrip("\ufeff"))))[1:]
+
+
+def test_encargado_solo_exporta_su_restaurante(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    propio, otro = crear_restaurantes(2)
+    _ventas(db, [propio, otro])
+    encargado = cabeceras(crear_usuario("encargado", propio))
+
+    respuesta = cliente.get(f"/api/export/ventas?restaurante_id={otro.id}", headers=encargado)
+
+    assert respuesta.status_code == 200
+    assert {fila[2] for fila in _filas_csv(respuesta)} == {propio.nombre}
+
+
+def test_usuario_sin_restaurante_no_exporta(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    _ventas(db, crear_restaurantes(2))
+    chef = cabeceras(crear_usuario("chef"))
+
+    respuesta = cliente.get("/api/export/ventas", headers=chef)
+
+    assert respuesta.status_code == 403
+
+
+def test_admin_exporta_todos_los_restaurantes(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    restaurantes = crear_restaurantes(2)
+    _ventas(db, restaurantes)
+
+    respuesta = cliente.get("/api/export/ventas", headers=cabeceras(crear_usuario("admin")))
+
+    assert respuesta.status_code == 200
+    assert len(_filas_csv(respuesta)) == 6
+
+
+def test_xlsx_limitado_a_xlsx_max_filas(db, cliente, crear_restaurantes, crear_usuario, cabeceras, monkeypatch):
+    from api import exportar
+    _ventas(db, crear_restaurantes(2))
+    admin = cabeceras(crear_usuario("admin"))
+    monkeypatch.setattr(exportar, "XLSX_MAX_FILAS", 5)
+
+    grande = cliente.get("/api/export/ventas?formato=xlsx", headers=admin)
+    assert grande.status_code == 400
+    assert "formato=csv" in grande.get_json()["msg"]
+
+    acotada = cliente.get("/api/export/ventas?formato=xlsx&desde=2025-03-01&hasta=2025-03-02", headers=admin)
+    assert acotada.status_code == 200
+    assert acotada.mimetype.endswith("spreadsheetml.sheet")
+
+    # El CSV no tiene límite
+    assert len(_filas_csv(cliente.get("/api/export/ventas", headers=admin))) == 6
@@ -0,0 +1,89 @@
+"""
+Instantánea incremental en Parquet: una partición se reescribe cuando cambia
+cualquier columna exportada de cualquiera de sus filas, y solo entonces.
+"""
+from datetime import date
+
+import pytest
+
+from api.models import Gasto, Proveedor
+from api.exportar_parquet import exportar_parquet
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def gastos(db, crear_restaurantes, crear_usuario):
+    restaurantes = crear_restaurantes(2)
+    usuarios = [crear_usuario("admin"), crear_usuario("encargado", restaurantes[0])]
+    proveedores = [Proveedor(nombre=f"P{i}", restaurante_id=restaurantes[0].id) for i in range(2)]
+    db.session.add_all(proveedores)
+    db.session.flush()
+    for restaurante in restaurantes:
+        for dia in range(1, 4):
+            db.session.add(Gasto(fecha=date(2025, 3, dia), monto=10 * dia, categoria="alimentos",
+                                 proveedor_id=proveedores[0].id, usuario_id=usuarios[0].id,
+                                 restaurante_id=restaurante.id))
+    db.session.commit()
+    primero, segundo = db.session.query(Gasto).filter_by(restaurante_id=restaurantes[0].id).order_by(Gasto.id)[:2]
+    return {"primero": primero, "segundo": segundo, "proveedor": proveedores[1], "usuario": usuarios[1],
+            "particion": f"gastos/restaurante_id={restaurantes[0].id}/anio=2025"}
+
+
+def _cambiar_monto(datos):
+    datos["primero"].monto = 99
+
+
+def _intercambiar_montos(datos):
+    datos["primero"].monto, datos["segundo"].monto = datos["segundo"].monto, datos["primero"].monto
+
+
+def _mover_fecha(datos):
+    datos["primero"].fecha = date(2025, 11, 30)
+
+
+def _cambiar_categoria(datos):
+    datos["primero"].categoria = "bebidas"
+
+
+def _cambiar_nota(datos):
+    datos["primero"].nota = "revisar"
+
+
+def _nota_vacia(datos):
+    # NULL -> '' también es un cambio
+    datos["primero"].nota = ""
+
+
+def _cambiar_proveedor(datos):
+    datos["primero"].proveedor_id = datos["proveedor"].id
+
+
+def _cambiar_usuario(datos):
+    datos["primero"].usuario_id = datos["usuario"].id
+
+
+@pytest.mark.parametrize("editar", [
+    _cambiar_monto, _intercambiar_montos, _mover_fecha, _cambiar_categoria,
+    _cambiar_nota, _nota_vacia, _cambiar_proveedor, _cambiar_usuario,
+], ids=lambda f: f.__name__.lstrip("_"))
+def test_reescribe_solo_la_particion_editada(db, gastos, tmp_path, editar):
+    destino = str(tmp_path)
+    exportar_parquet(destino)
+    assert exportar_parquet(destino)["escritas"] == []
+
+    editar(gastos)
+    db.session.commit()
+
+    resumen = exportar_parquet(destino)
+    assert resumen["escritas"] == [gastos["particion"]]
+    assert resumen["omitidas"] == 1
+
+    tabla = pq.read_table(tmp_path / gastos["particion"] / "part-0.parquet").to_pylist()
+    fila = next(f for f in tabla if f["id"] == gastos["primero"].id)
+    assert fila["monto"] == gastos["primero"].monto
+    assert fila["fecha"] == gastos["primero"].fecha
+    assert fila["categoria"] == gastos["primero"].categoria
+    assert fila["nota"] == gastos["primero"].nota
+    assert fila["proveedor_id"] == gastos["primero"].proveedor_id
+    assert fila["usuario_id"] == gastos["primero"].usuario_id
@@ -0,0 +1,102 @@
+"""
+Importación de ventas desde CSV (api/importar_csv.py): las ventas pasan por
+guardar_ventas(), así que una venta que ya existe, que se repite en el
+archivo o que otra petición guarda a la vez es una línea rechazada y no
+aborta la importación.
+"""
+import io
+from datetime import date
+
+import pytest
+from sqlalchemy import select, text
+
+from api import importar_csv as modulo
+from api.importar_csv import importar_csv
+from api.models import Venta, ResumenDiario, ResumenMensual
+from api.resumenes import reconstruir_resumen_diario, reconstruir_resumen_mensual
+
+
+@pytest.fixture
+def restaurante(db, crear_restaurantes):
+    restaurante, = crear_restaurantes(1)
+    db.session.add(Venta(fecha=date(2025, 3, 1), monto=10, turno="comida", restaurante_id=restaurante.id))
+    db.session.commit()
+    return restaurante
+
+
+def _csv(lineas):
+    return io.BytesIO(("fecha,monto,turno\n" + "\n".join(lineas) + "\n").encode())
+
+
+def _ventas(db):
+    return sorted(db.session.execute(select(Venta.fecha, Venta.turno, Venta.monto_cent)).all())
+
+
+def test_duplicadas_son_lineas_rechazadas(db, restaurante, crear_usuario):
+    usuario = crear_usuario("admin")
+    archivo = _csv([
+        "2025-03-01,99,comida",     # 2: ya existe en la base de datos
+        "2025-03-01,20,cena",       # 3
+        "2025-03-02,30,comida",     # 4
+        "2025-03-01,21,cena",       # 5: repetida en el mismo lote
+        "2025-03-02,31,comida",     # 6: repetida en otro lote
+        "2025-03-03,x,comida",      # 7: monto no válido
+        "2025-03-03,40,",           # 8: sin turno
+        "2025-03-03,41,",           # 9: sin turno, repetida
+    ])
+
+    resumen = importar_csv(archivo, "ventas", restaurante.id, usuario.id, tamano_lote=4)
+    db.session.commit()
+
+    duplicada = ["Ya existe una venta para este día y turno"]
+    assert (resumen["insertadas"], resumen["rechazadas"]) == (3, 5)
+    assert resumen["rechazos"] == [
+        {"linea": 2, "errores": duplicada}, {"linea": 5, "errores": duplicada},
+        {"linea": 6, "errores": duplicada}, {"linea": 7, "errores": ["El monto debe ser un número mayor que 0"]},
+        {"linea": 9, "errores": duplicada},
+    ]
+    assert _ventas(db) == [(date(2025, 3, 1), "cena", 2000), (date(2025, 3, 1), "comida", 1000),
+                           (date(2025, 3, 2), "comida", 3000), (date(2025, 3, 3), None, 4000)]
+
+    for modelo, reconstruir in ((ResumenDiario, reconstruir_resumen_diario),
+                                (ResumenMensual, reconstruir_resumen_mensual)):
+        columnas = list(modelo.__table__.columns)
+        mantenido = sorted(db.session.execute(select(*columnas)).all())
+        reconstruir()
+        assert mantenido == sorted(db.session.execute(select(*columnas)).all()), modelo.__name__
+
+
+def test_venta_guardada_a_la_vez_no_aborta(db, monkeypatch, restaurante, crear_usuario):
+    usuario = crear_usuario("admin")
+    guardar = modulo.guardar_ventas
+
+    def otra_peticion_antes(filas, modo):
+        # Otra conexión confirma la misma venta justo antes del INSERT
+        with db.engine.begin() as conexion:
+            conexion.execute(text("INSERT INTO ventas (fecha, monto_cent, turno, restaurante_id) "
+                                  "VALUES ('2025-03-05', 500, 'cena', :r)"), {"r": restaurante.id})
+        monkeypatch.setattr(modulo, "guardar_ventas", guardar)
+        return guardar(filas, modo)
+
+    monkeypatch.setattr(modulo, "guardar_ventas", otra_peticion_antes)
+    db.session.commit()
+
+    resumen = importar_csv(_csv(["2025-03-04,10,cena", "2025-03-05,60,cena"]), "ventas",
+                           restaurante.id, usuario.id)
+    db.session.commit()
+
+    assert (resumen["insertadas"], resumen["rechazadas"]) == (1, 1)
+    assert resumen["rechazos"] == [{"linea": 3, "errores": ["Ya existe una venta para este día y turno"]}]
+    assert (date(2025, 3, 5), "cena", 500) in _ventas(db)
+
+
+def test_endpoint(db, cliente, cabeceras, restaurante, crear_usuario):
+    encargado = crear_usuario("encargado", restaurante)
+    datos = {"archivo": (_csv(["2025-03-01,5,comida", "2025-03-09,15,cena"]), "ventas.csv"), "perfil": "ventas"}
+
+    respuesta = cliente.post("/api/importar", data=datos, headers=cabeceras(encargado),
+                             content_type="multipart/form-data")
+    assert respuesta.status_code == 201
+    cuerpo = respuesta.get_json()
+    assert (cuerpo["insertadas"], cuerpo["rechazadas"]) == (1, 1)
+    assert cuerpo["rechazos"][0]["linea"] == 2
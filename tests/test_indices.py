@@ -0,0 +1,95 @@
+"""
+Las consultas por restaurante y mes (rango semiabierto de filtro_mes) deben
+resolverse con los índices (restaurante_id, fecha) que crean las migraciones,
+no recorriendo la tabla. Las pruebas corren las migraciones sobre la base de
+pruebas y miran el plan de la consulta.
+"""
+import os
+from datetime import date, timedelta
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import select, func, text, insert
+
+from api.models import Venta, Gasto, FacturaAlbaran, Restaurante, Proveedor
+from api.utils import filtro_mes
+
+MIGRACIONES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+INDICES = {
+    Venta: "ix_ventas_restaurante_fecha",
+    Gasto: "ix_gastos_restaurante_fecha",
+    FacturaAlbaran: "ix_facturas_restaurante_fecha",
+}
+
+
+@pytest.fixture
+def migrada(db):
+    db.session.remove()
+    db.drop_all()
+    upgrade(directory=MIGRACIONES)
+    return db
+
+
+def _consultas(modelo):
+    mes = filtro_mes(modelo.fecha, 3, 2025)
+    return [
+        select(modelo.id, modelo.fecha).where(modelo.restaurante_id == 1, *mes),
+        select(func.sum(modelo.monto_cent), func.count()).where(modelo.restaurante_id == 1, *mes),
+    ]
+
+
+def _sql(db, consulta):
+    return str(consulta.compile(db.engine, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.parametrize("modelo", list(INDICES), ids=lambda m: m.__tablename__)
+def test_plan_sqlite_usa_indice_restaurante_fecha(migrada, es_postgres, modelo):
+    if es_postgres:
+        pytest.skip("solo con SQLite")
+    # En ventas el índice único (restaurante_id, fecha, turno) tiene el mismo
+    # prefijo y SQLite lo trata como equivalente; en Postgres manda el de
+    # INCLUDE (ver la prueba de Postgres)
+    validos = {INDICES[modelo]}
+    if modelo is Venta:
+        validos.add("ux_ventas_restaurante_fecha_turno")
+
+    for consulta in _consultas(modelo):
+        plan = " ".join(fila[-1] for fila in migrada.session.execute(
+            text("EXPLAIN QUERY PLAN " + _sql(migrada, consulta))))
+        assert plan.startswith(f"SEARCH {modelo.__tablename__} USING"), plan
+        assert "(restaurante_id=? AND fecha>? AND fecha<?)" in plan, plan
+        assert any(f"INDEX {indice} " in plan for indice in validos), plan
+
+
+def _cargar_datos(db, usuario, restaurantes=20, dias=500):
+    """Filas suficientes para que las estadísticas de Postgres sean realistas."""
+    db.session.execute(insert(Restaurante.__table__), [{"nombre": f"R{i}"} for i in range(restaurantes)])
+    ids = db.session.scalars(select(Restaurante.id)).all()
+    db.session.execute(insert(Proveedor.__table__), [{"nombre": "P", "restaurante_id": r} for r in ids])
+    proveedores = dict(db.session.execute(select(Proveedor.restaurante_id, Proveedor.id)).all())
+    fechas = [date(2024, 1, 1) + timedelta(days=d) for d in range(dias)]
+    for modelo in INDICES:
+        filas = [{"restaurante_id": r, "fecha": f, "monto_cent": 1000} for r in ids for f in fechas]
+        for fila in filas:
+            if modelo is Gasto:
+                fila.update(proveedor_id=proveedores[fila["restaurante_id"]], usuario_id=usuario.id)
+            elif modelo is FacturaAlbaran:
+                fila.update(proveedor_id=proveedores[fila["restaurante_id"]])
+        db.session.execute(insert(modelo.__table__), filas)
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+        for modelo in INDICES:
+            conexion.execute(text(f"VACUUM ANALYZE {modelo.__tablename__}"))
+
+
+def test_plan_postgres_usa_indice_restaurante_fecha(migrada, es_postgres, crear_usuario):
+    if not es_postgres:
+        pytest.skip("necesita TEST_DATABASE_URL con un Postgres")
+    _cargar_datos(migrada, crear_usuario("admin"))
+    for modelo, indice in INDICES.items():
+        # Las sumas del mes salen solo del índice gracias al INCLUDE (monto_cent)
+        suma = _consultas(modelo)[1]
+        plan = "\n".join(fila[0] for fila in migrada.session.execute(
+            text("EXPLAIN " + _sql(migrada, suma))))
+        assert f"Index Only Scan using {indice} on {modelo.__tablename__}" in plan, plan
@@ -0,0 +1,44 @@
+"""Estado de los márgenes (/api/margen/estado): alcance por rol."""
+from datetime import date
+
+from api.models import Venta
+
+PARAMETROS = "mes=3&ano=2025"
+
+
+def _ventas(db, restaurantes):
+    for restaurante in restaurantes:
+        db.session.add(Venta(fecha=date(2025, 3, 1), monto=100, turno="noche", restaurante_id=restaurante.id))
+    db.session.commit()
+
+
+def _restaurantes(respuesta):
+    return [r["restaurante_id"] for r in respuesta.get_json()["restaurantes"]]
+
+
+def test_encargado_solo_ve_su_restaurante(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    propio, otro = crear_restaurantes(2)
+    _ventas(db, [propio, otro])
+
+    respuesta = cliente.get(f"/api/margen/estado?{PARAMETROS}",
+                            headers=cabeceras(crear_usuario("encargado", propio)))
+
+    assert respuesta.status_code == 200
+    assert _restaurantes(respuesta) == [propio.id]
+
+
+def test_usuario_sin_restaurante_no_ve_margenes(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    _ventas(db, crear_restaurantes(2))
+
+    respuesta = cliente.get(f"/api/margen/estado?{PARAMETROS}", headers=cabeceras(crear_usuario("chef")))
+
+    assert respuesta.status_code == 403
+
+
+def test_admin_ve_todos_los_restaurantes(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    restaurantes = crear_restaurantes(2)
+    _ventas(db, restaurantes)
+
+    respuesta = cliente.get(f"/api/margen/estado?{PARAMETROS}", headers=cabeceras(crear_usuario("admin")))
+
+    assert _restaurantes(respuesta) == [r.id for r in restaurantes]
@@ -0,0 +1,97 @@
+"""Migraciones que reescriben datos existentes."""
+import os
+
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+MIGRACIONES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+@pytest.fixture
+def migrar(db):
+    db.session.remove()
+    db.drop_all()
+
+    def migrar(revision):
+        upgrade(directory=MIGRACIONES, revision=revision)
+        db.session.remove()
+    return migrar
+
+
+def _ejecutar(db, sql, **parametros):
+    resultado = db.session.execute(text(sql), parametros)
+    db.session.commit()
+    return resultado
+
+
+@pytest.mark.parametrize("global_previa", [None, 3])
+def test_ventas_unicas_conserva_la_primera_e_invalida_la_cache(db, migrar, capfd, global_previa):
+    migrar("f2a7d9c4e806")
+    _ejecutar(db, "INSERT INTO restaurantes (id, nombre) VALUES (1, 'R')")
+    for fecha, monto in (("2025-03-01", 100), ("2025-03-01", 50), ("2025-03-02", 30), ("2025-03-01", 25)):
+        _ejecutar(db, "INSERT INTO ventas (fecha, monto, turno, restaurante_id) "
+                      "VALUES (:fecha, :monto, 'noche', 1)", fecha=fecha, monto=monto)
+    # Resúmenes como los dejaba el ORM, con las repetidas sumadas
+    _ejecutar(db, "INSERT INTO resumen_diario (restaurante_id, fecha, total_ventas, total_gastos, "
+                  "num_ventas, num_gastos) VALUES (1, '2025-03-01', 175, 12.5, 3, 1), "
+                  "(1, '2025-03-02', 30, 0, 1, 0)")
+    _ejecutar(db, "INSERT INTO resumen_mensual (tipo, restaurante_id, anio, mes, categoria, proveedor_id, "
+                  "total, cantidad) VALUES ('venta', 1, 2025, 3, '', 0, 205, 4), "
+                  "('gasto', 1, 2025, 3, 'alimentos', 0, 12.5, 1)")
+    _ejecutar(db, "INSERT INTO version_datos VALUES (1, 2025, 3, 2)")
+    if global_previa:
+        _ejecutar(db, "INSERT INTO version_datos VALUES (0, 0, 0, :v)", v=global_previa)
+
+    migrar("a5c3e8f1d247")
+
+    assert _ejecutar(db, "SELECT id, monto FROM ventas ORDER BY id").all() == [(1, 100), (3, 30)]
+    log = capfd.readouterr().err
+    assert ("[alembic.runtime.migration] ventas: borrada la venta 2 (restaurante 1, 2025-03-01, "
+            "turno 'noche', 50.00 €), repetida de la venta 1") in log
+    assert "borrada la venta 4 (restaurante 1, 2025-03-01, turno 'noche', 25.00 €)" in log
+    assert "ventas: 2 ventas repetidas borradas, 75.00 € en total" in log
+
+    diario = _ejecutar(db, "SELECT fecha, total_ventas, total_gastos, num_ventas, num_gastos "
+                           "FROM resumen_diario ORDER BY fecha").all()
+    assert [tuple(fila)[1:] for fila in diario] == [(100, 12.5, 1, 1), (30, 0, 1, 0)]
+    mensual = _ejecutar(db, "SELECT tipo, total, cantidad FROM resumen_mensual").all()
+    assert {tipo: (total, cantidad) for tipo, total, cantidad in mensual} == {"venta": (130, 2), "gasto": (12.5, 1)}
+    # La versión global entra en la clave de todas las entradas cacheadas
+    versiones = dict(_ejecutar(db, "SELECT anio, version FROM version_datos").all())
+    assert versiones == {2025: 2, 0: (global_previa or 0) + 1}
+
+
+def test_importes_en_centimos_registra_los_totales(db, migrar, capfd):
+    migrar("a5c3e8f1d247")
+    _ejecutar(db, "INSERT INTO restaurantes (id, nombre) VALUES (1, 'R')")
+    for dia, monto in ((1, 12.345), (2, 2.675), (3, 10)):
+        _ejecutar(db, "INSERT INTO ventas (fecha, monto, turno, restaurante_id) "
+                      "VALUES (:fecha, :monto, 'noche', 1)", fecha=f"2025-03-0{dia}", monto=monto)
+
+    # env.py configura el logging con alembic.ini (fileConfig): los mensajes
+    # de alembic.runtime.migration salen por stderr
+    migrar("c8e2f4a6b913")
+
+    assert sorted(_ejecutar(db, "SELECT monto_cent FROM ventas").scalars()) == [268, 1000, 1235]
+    assert ("[alembic.runtime.migration] ventas.monto: 3 filas, 25.0200 € -> 25.03 € "
+            "(2 con fracciones de céntimo redondeadas)") in capfd.readouterr().err
+
+
+def test_estado_margen_rellena_desde_los_resumenes(db, migrar, capfd):
+    migrar("c8e2f4a6b913")
+    _ejecutar(db, "INSERT INTO restaurantes (id, nombre) VALUES (1, 'R'), (2, 'S')")
+    _ejecutar(db, "INSERT INTO margen_objetivo (restaurante_id, porcentaje_min, porcentaje_max) "
+                  "VALUES (1, 20, 30)")
+    # 1: 30.005 % -> 30.01 %, por encima de la banda; 2: sin objetivo
+    for restaurante_id, fecha, ventas, gastos in ((1, "2025-03-01", 10000, 3000), (1, "2025-03-02", 10000, 3001),
+                                                  (2, "2025-03-01", 5000, 100)):
+        _ejecutar(db, "INSERT INTO resumen_diario (restaurante_id, fecha, total_ventas_cent, "
+                      "total_gastos_cent, num_ventas, num_gastos) VALUES (:r, :fecha, :ventas, :gastos, 1, 1)",
+                  r=restaurante_id, fecha=fecha, ventas=ventas, gastos=gastos)
+
+    migrar("d4f7a9c2e318")
+
+    estados = dict(_ejecutar(db, "SELECT restaurante_id, estado FROM estado_margen").all())
+    assert estados == {1: "por_encima", 2: "sin_objetivo"}
+    assert "[alembic.runtime.migration] estado_margen: 2 meses de restaurante evaluados" in capfd.readouterr().err
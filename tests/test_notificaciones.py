@@ -0,0 +1,112 @@
+"""
+Notificaciones en modo resumen (api/notificaciones.py): los eventos esperan
+en eventos_notificacion y vaciar_eventos() los convierte en un correo por
+restaurante cuando vence la ventana o se llena el lote, resolviendo todos
+los nombres en una sola consulta.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from api import notificaciones
+from api.models import EventoNotificacion, Outbox, Proveedor
+
+
+@pytest.fixture
+def modo_resumen(monkeypatch):
+    monkeypatch.setattr(notificaciones, "MODO", "resumen")
+    monkeypatch.setattr(notificaciones, "VENTANA", 15)
+    monkeypatch.setattr(notificaciones, "LOTE", 30)
+
+
+@pytest.fixture
+def datos(db, crear_restaurantes, crear_usuario):
+    uno, dos = crear_restaurantes(2)
+    proveedor = Proveedor(nombre="Verduras Paco", restaurante_id=uno.id)
+    db.session.add(proveedor)
+    db.session.commit()
+    return {"uno": uno, "dos": dos, "proveedor": proveedor, "usuario": crear_usuario("encargado", uno)}
+
+
+def _venta(restaurante, usuario, monto=100, turno="comida"):
+    return {"restaurante_id": restaurante.id, "usuario_id": usuario.id, "monto": monto,
+            "turno": turno, "fecha": "2025-03-10"}
+
+
+def _gasto(restaurante, usuario, proveedor, monto=40.5):
+    return {"restaurante_id": restaurante.id, "usuario_id": usuario.id, "proveedor_id": proveedor.id,
+            "categoria": "alimentos", "monto": monto, "fecha": "2025-03-10"}
+
+
+def _notificar(db, eventos):
+    for tipo, datos in eventos:
+        notificaciones.notificar_eventos(tipo, [datos])
+    db.session.commit()
+
+
+def test_modo_resumen_no_encola_al_momento(db, cliente, cabeceras, modo_resumen, datos):
+    respuesta = cliente.post("/api/ventas", headers=cabeceras(datos["usuario"]), json={
+        "fecha": "2025-03-10", "monto": 120, "turno": "comida", "restaurante_id": datos["uno"].id})
+    assert respuesta.status_code == 201
+
+    assert db.session.query(Outbox).count() == 0
+    evento, = db.session.query(EventoNotificacion).all()
+    assert (evento.restaurante_id, evento.tipo) == (datos["uno"].id, "venta")
+
+
+def test_ventana(db, modo_resumen, datos):
+    uno, dos, usuario = datos["uno"], datos["dos"], datos["usuario"]
+    _notificar(db, [("venta", _venta(uno, usuario)), ("venta", _venta(uno, usuario, 50.25, "cena")),
+                    ("gasto", _gasto(uno, usuario, datos["proveedor"])), ("venta", _venta(dos, usuario, 70))])
+    ahora = datetime.utcnow()
+
+    assert notificaciones.vaciar_eventos(ahora=ahora + timedelta(minutes=14)) == 0
+    assert db.session.query(EventoNotificacion).count() == 4
+    assert db.session.query(Outbox).count() == 0
+
+    assert notificaciones.vaciar_eventos(ahora=ahora + timedelta(minutes=15, seconds=1)) == 2
+    assert db.session.query(EventoNotificacion).count() == 0
+    correos = {c.asunto: c for c in db.session.query(Outbox)}
+    assert set(correos) == {"Resumen de actividad en R0: 2 ventas y 1 gastos", "Nueva venta registrada en R1"}
+    resumen = correos["Resumen de actividad en R0: 2 ventas y 1 gastos"].html
+    assert "150.25€" in resumen and "40.5€" in resumen
+    assert "Verduras Paco · alimentos" in resumen and datos["usuario"].nombre in resumen
+
+    # Ya no queda nada que vaciar
+    assert notificaciones.vaciar_eventos(ahora=ahora + timedelta(hours=1)) == 0
+
+
+def test_lote(db, modo_resumen, datos):
+    uno, dos, usuario = datos["uno"], datos["dos"], datos["usuario"]
+    _notificar(db, [("venta", _venta(uno, usuario, turno=f"t{i}")) for i in range(3)]
+               + [("venta", _venta(dos, usuario))])
+
+    assert notificaciones.vaciar_eventos(lote=4) == 0
+    assert notificaciones.vaciar_eventos(lote=3) == 1
+    asunto, = db.session.scalars(db.select(Outbox.asunto)).all()
+    assert asunto == "Resumen de actividad en R0: 3 ventas y 0 gastos"
+    restantes = db.session.scalars(db.select(EventoNotificacion.restaurante_id)).all()
+    assert restantes == [dos.id]
+
+
+def test_nombres_en_una_sola_consulta(db, contar_consultas, datos):
+    uno, dos, usuario, proveedor = datos["uno"], datos["dos"], datos["usuario"], datos["proveedor"]
+    eventos = [("venta", _venta(uno, usuario)), ("gasto", _gasto(uno, usuario, proveedor)),
+               ("venta", _venta(dos, usuario)), ("venta", {"restaurante_id": 999, "monto": 1, "fecha": "x"})]
+
+    nombres = {}
+    assert contar_consultas(lambda: nombres.update(notificaciones.resolver_nombres(eventos))) == 1
+    assert nombres == {("restaurante", uno.id): "R0", ("restaurante", dos.id): "R1",
+                       ("usuario", usuario.id): usuario.nombre, ("proveedor", proveedor.id): "Verduras Paco"}
+    assert notificaciones.resolver_nombres([("venta", {"monto": 1})]) == {}
+
+
+def test_consultas_constantes_con_mas_eventos(db, contar_consultas, modo_resumen, datos):
+    uno, usuario, proveedor = datos["uno"], datos["usuario"], datos["proveedor"]
+
+    def consultas(n):
+        _notificar(db, [("venta", _venta(uno, usuario, turno=f"t{i}")) for i in range(n)]
+                   + [("gasto", _gasto(uno, usuario, proveedor)) for _ in range(n)])
+        return contar_consultas(lambda: notificaciones.vaciar_eventos(lote=1))
+
+    assert consultas(2) == consultas(20)
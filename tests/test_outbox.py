@@ -0,0 +1,112 @@
+"""
+Outbox de correos (api/outbox.py): el correo se guarda en la transacción que
+lo provoca y el worker lo entrega, lo reintenta con espera exponencial o lo
+marca como fallido tras OUTBOX_MAX_INTENTOS.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from api import outbox
+from api.mail.servicio import TransporteFalso
+from api.models import Outbox, Venta
+
+INICIO = datetime(2025, 3, 10, 12, 0)
+
+
+def _encolar(db, n=1):
+    correos = [outbox.encolar_email(f"admin{i}@example.com", f"Asunto {i}", f"<p>{i}</p>") for i in range(n)]
+    for correo in correos:
+        correo.proximo_intento = INICIO
+    db.session.commit()
+    return correos
+
+
+def test_entrega_y_marca_enviado(db):
+    correos = _encolar(db, 3)
+    transporte = TransporteFalso()
+
+    assert outbox.entregar_pendientes(transporte, ahora=INICIO) == {"enviados": 3, "reintentos": 0, "fallidos": 0}
+    assert [c["destinatario"] for c in transporte.enviados] == [c.destinatario for c in correos]
+    assert {(c.estado, c.intentos, c.ultimo_error) for c in correos} == {("enviado", 1, None)}
+    assert all(c.enviado is not None for c in correos)
+
+    # Ya no quedan pendientes
+    assert outbox.entregar_pendientes(transporte, ahora=INICIO) == {"enviados": 0, "reintentos": 0, "fallidos": 0}
+    assert len(transporte.enviados) == 3
+
+
+def test_lotes_en_orden(db):
+    correos = _encolar(db, 5)
+    correos[0].proximo_intento = INICIO + timedelta(seconds=1)
+    db.session.commit()
+    transporte = TransporteFalso()
+
+    assert outbox.entregar_pendientes(transporte, tamano_lote=2, ahora=INICIO + timedelta(seconds=1))["enviados"] == 2
+    assert [c["asunto"] for c in transporte.enviados] == ["Asunto 1", "Asunto 2"]
+
+
+def test_espera_exponencial():
+    esperas = [outbox.espera_reintento(intentos).total_seconds() for intentos in range(1, 10)]
+    assert esperas == [30, 60, 120, 240, 480, 960, 1920, 3600, 3600]
+
+
+def test_reintenta_con_espera_y_despues_entrega(db):
+    correo, = _encolar(db)
+    caido = TransporteFalso(fallar=True)
+
+    assert outbox.entregar_pendientes(caido, ahora=INICIO) == {"enviados": 0, "reintentos": 1, "fallidos": 0}
+    assert (correo.estado, correo.intentos) == ("pendiente", 1)
+    assert correo.proximo_intento == INICIO + timedelta(seconds=30)
+    assert correo.ultimo_error == "Fallo simulado del transporte"
+
+    # Antes de que venza la espera no se vuelve a intentar
+    assert outbox.entregar_pendientes(caido, ahora=INICIO + timedelta(seconds=29))["reintentos"] == 0
+
+    momento = INICIO + timedelta(seconds=30)
+    outbox.entregar_pendientes(caido, ahora=momento)
+    assert correo.intentos == 2
+    assert correo.proximo_intento == momento + timedelta(seconds=60)
+
+    transporte = TransporteFalso()
+    assert outbox.entregar_pendientes(transporte, ahora=momento + timedelta(seconds=60))["enviados"] == 1
+    assert (correo.estado, correo.intentos, correo.ultimo_error) == ("enviado", 3, None)
+    assert len(transporte.enviados) == 1
+
+
+def test_fallido_tras_el_maximo_de_intentos(db, monkeypatch):
+    monkeypatch.setattr(outbox, "MAX_INTENTOS", 3)
+    correo, = _encolar(db)
+    caido = TransporteFalso(fallar=True)
+
+    resumenes = []
+    momento = INICIO
+    for _ in range(3):
+        resumenes.append(outbox.entregar_pendientes(caido, ahora=momento))
+        momento = correo.proximo_intento
+    assert [r["reintentos"] for r in resumenes] == [1, 1, 0]
+    assert resumenes[-1]["fallidos"] == 1
+    assert (correo.estado, correo.intentos) == ("fallido", 3)
+
+    # Un correo fallido no se vuelve a enviar aunque el transporte funcione
+    transporte = TransporteFalso()
+    assert outbox.entregar_pendientes(transporte, ahora=momento + timedelta(days=1))["enviados"] == 0
+    assert transporte.enviados == []
+
+
+def test_sin_correo_si_la_escritura_se_deshace(db, crear_restaurantes):
+    restaurante, = crear_restaurantes(1)
+    db.session.add(Venta(fecha=date(2025, 3, 1), monto=10, turno="comida", restaurante_id=restaurante.id))
+    db.session.commit()
+
+    # La misma venta otra vez: el commit falla y el correo se va con ella
+    db.session.add(Venta(fecha=date(2025, 3, 1), monto=20, turno="comida", restaurante_id=restaurante.id))
+    outbox.encolar_email("admin@example.com", "Nueva venta", "<p>20</p>")
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+    assert db.session.query(Outbox).count() == 0
+    assert outbox.entregar_pendientes(TransporteFalso(), ahora=INICIO + timedelta(days=1)) == \
+        {"enviados": 0, "reintentos": 0, "fallidos": 0}
@@ -0,0 +1,102 @@
+"""
+/admin/overview devuelve en una respuesta los mismos bloques que los
+endpoints individuales del panel de administración, y el número de
+sentencias no depende de cuántos restaurantes haya.
+"""
+from datetime import date
+
+import pytest
+
+from api.models import Gasto, Proveedor, Venta
+from api.overview import overview_admin, SECCIONES
+
+INDIVIDUALES = {
+    "resumen_gastos": "/api/resumen-gastos",
+    "resumen_ventas": "/api/resumen-ventas",
+    "gasto_por_restaurante": "/api/gasto-por-restaurante",
+    "ventas_por_restaurante": "/api/ventas-por-restaurante",
+    "proveedores_top": "/api/proveedores-top",
+    "restaurantes_top": "/api/restaurantes-top",
+    "resumen_general": "/api/admin/resumen-general",
+}
+
+
+def _movimientos(db, restaurantes, usuario):
+    for n, restaurante in enumerate(restaurantes, start=1):
+        proveedores = [Proveedor(nombre=f"P{n}-{j}", categoria="alimentos", restaurante_id=restaurante.id)
+                       for j in range(2)]
+        db.session.add_all(proveedores)
+        db.session.flush()
+        for dia in range(1, n + 2):
+            db.session.add(Venta(fecha=date(2025, 3, dia), monto=100 * n + 0.15, turno="comida",
+                                 restaurante_id=restaurante.id))
+            for j, proveedor in enumerate(proveedores):
+                db.session.add(Gasto(fecha=date(2025, 3, dia), monto=7.5 * n + j, proveedor_id=proveedor.id,
+                                     usuario_id=usuario.id, restaurante_id=restaurante.id))
+        # Otro mes: no cuenta
+        db.session.add(Venta(fecha=date(2025, 2, 1), monto=5000, turno="comida", restaurante_id=restaurante.id))
+    db.session.commit()
+
+
+@pytest.fixture
+def admin(crear_usuario):
+    return crear_usuario("admin")
+
+
+def test_bloques_iguales_a_los_endpoints_individuales(db, cliente, cabeceras, crear_restaurantes, admin):
+    # Un restaurante sin movimientos también aparece en los listados
+    restaurantes = crear_restaurantes(7)
+    _movimientos(db, restaurantes[:6], admin)
+    autorizacion = cabeceras(admin)
+
+    agrupado = cliente.get("/api/admin/overview?mes=3&ano=2025", headers=autorizacion)
+    assert agrupado.status_code == 200
+    agrupado = agrupado.get_json()
+    assert set(agrupado) == set(SECCIONES)
+
+    for seccion, url in INDIVIDUALES.items():
+        individual = cliente.get(f"{url}?mes=3&ano=2025", headers=autorizacion)
+        assert individual.status_code == 200, seccion
+        assert individual.get_json() == agrupado[seccion], seccion
+
+    assert agrupado["resumen_ventas"]["total_vendido"] == sum((100 * n + 0.15) * (n + 1) for n in range(1, 7))
+    assert [r["nombre"] for r in agrupado["restaurantes_top"]] == ["R5", "R4", "R3", "R2", "R1"]
+    assert agrupado["resumen_general"][-1] == {"restaurante_id": restaurantes[6].id, "nombre": "R6",
+                                               "venta_total": 0, "porcentaje_gasto": 0}
+
+
+def test_solo_admin_y_secciones_validas(cliente, cabeceras, crear_restaurantes, crear_usuario, admin):
+    encargado = crear_usuario("encargado", crear_restaurantes(1)[0])
+    assert cliente.get("/api/admin/overview?mes=3&ano=2025", headers=cabeceras(encargado)).status_code == 403
+
+    autorizacion = cabeceras(admin)
+    respuesta = cliente.get("/api/admin/overview?mes=3&ano=2025&secciones=resumen_general,proveedores_top",
+                            headers=autorizacion)
+    assert set(respuesta.get_json()) == {"resumen_general", "proveedores_top"}
+    respuesta = cliente.get("/api/admin/overview?mes=3&ano=2025&secciones=otra", headers=autorizacion)
+    assert respuesta.status_code == 400
+
+
+def test_dos_consultas(db, crear_restaurantes, contar_consultas, admin):
+    _movimientos(db, crear_restaurantes(3), admin)
+    db.session.expire_all()
+    assert contar_consultas(lambda: overview_admin(3, 2025)) == 2
+
+
+def test_consultas_constantes_con_el_numero_de_restaurantes(db, cliente, cabeceras, crear_restaurantes,
+                                                           contar_consultas, admin):
+    autorizacion = cabeceras(admin)
+
+    def consultas_con(restaurantes):
+        _movimientos(db, restaurantes, admin)
+        respuestas = []
+        numero = contar_consultas(lambda: respuestas.append(
+            cliente.get("/api/admin/overview?mes=3&ano=2025", headers=autorizacion)))
+        assert respuestas[0].status_code == 200
+        return numero, respuestas[0].get_json()
+
+    pocos, datos = consultas_con(crear_restaurantes(2, "N"))
+    assert len(datos["resumen_general"]) == 2
+    muchos, datos = consultas_con(crear_restaurantes(10, "M"))
+    assert len(datos["resumen_general"]) == 12
+    assert muchos == pocos
@@ -0,0 +1,76 @@
+"""Paginación por cursor de los listados (api/paginacion.py) a través de /api/ventas."""
+from datetime import date
+
+import pytest
+
+from api import paginacion
+from api.models import Venta
+
+
+@pytest.fixture
+def ventas(db, crear_restaurantes):
+    restaurante, = crear_restaurantes(1)
+    # Muchas ventas con la misma fecha: el orden se desempata por id
+    filas = [Venta(fecha=date(2025, 3, dia), monto=10, turno=f"t{turno}", restaurante_id=restaurante.id)
+             for turno in range(4) for dia in (2, 1, 3)]
+    db.session.add_all(filas)
+    db.session.commit()
+    return sorted(filas, key=lambda v: (v.fecha, v.id))
+
+
+@pytest.fixture
+def admin(crear_usuario, cabeceras):
+    return cabeceras(crear_usuario("admin"))
+
+
+def _paginas(cliente, admin, limite):
+    ids, cursor, paginas = [], None, 0
+    while True:
+        url = f"/api/ventas?limit={limite}" + (f"&cursor={cursor}" if cursor else "")
+        cuerpo = cliente.get(url, headers=admin).get_json()
+        ids += [v["id"] for v in cuerpo["items"]]
+        paginas += 1
+        cursor = cuerpo["next_cursor"]
+        if not cursor:
+            return ids, paginas
+
+
+@pytest.mark.parametrize("limite", [1, 5, 12, 50])
+def test_recorrer_las_paginas_devuelve_cada_fila_una_vez(cliente, admin, ventas, limite):
+    ids, paginas = _paginas(cliente, admin, limite)
+
+    assert ids == [v.id for v in ventas]
+    assert paginas == max(1, -(-len(ventas) // limite))
+
+
+def test_cursor_estable_con_altas_anteriores(db, cliente, admin, ventas):
+    primera = cliente.get("/api/ventas?limit=5", headers=admin).get_json()
+    # Una venta nueva con una fecha ya recorrida no desplaza la página siguiente
+    db.session.add(Venta(fecha=date(2025, 3, 1), monto=10, turno="nuevo", restaurante_id=ventas[0].restaurante_id))
+    db.session.commit()
+
+    segunda = cliente.get(f"/api/ventas?limit=5&cursor={primera['next_cursor']}", headers=admin).get_json()
+
+    assert [v["id"] for v in segunda["items"]] == [v.id for v in ventas[5:10]]
+
+
+def test_limit_acotado(cliente, admin, ventas, monkeypatch):
+    monkeypatch.setattr(paginacion, "LIMITE_MAXIMO", 4)
+
+    assert len(cliente.get("/api/ventas?limit=100", headers=admin).get_json()["items"]) == 4
+    assert len(cliente.get("/api/ventas?limit=0", headers=admin).get_json()["items"]) == 1
+    assert len(cliente.get("/api/ventas?cursor=", headers=admin).get_json()["items"]) == 4
+
+
+def test_sin_limit_ni_cursor_devuelve_la_lista(cliente, admin, ventas):
+    cuerpo = cliente.get("/api/ventas", headers=admin).get_json()
+
+    assert isinstance(cuerpo, list)
+    assert [v["id"] for v in cuerpo] == [v.id for v in ventas]
+
+
+def test_cursor_no_valido(cliente, admin, ventas):
+    respuesta = cliente.get("/api/ventas?limit=5&cursor=no-es-un-cursor", headers=admin)
+
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["msg"] == "Cursor no válido"
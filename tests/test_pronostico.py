@@ -0,0 +1,47 @@
+"""Proyección a fin de mes (/api/pronostico): alcance por rol."""
+from datetime import date
+
+from api.models import Venta
+
+PARAMETROS = "mes=3&ano=2025&fecha=2025-03-10"
+
+
+def _ventas(db, restaurantes):
+    for restaurante in restaurantes:
+        for dia in range(1, 11):
+            db.session.add(Venta(fecha=date(2025, 3, dia), monto=100, turno="noche",
+                                 restaurante_id=restaurante.id))
+    db.session.commit()
+
+
+def _restaurantes(respuesta):
+    return [r["restaurante_id"] for r in respuesta.get_json()["restaurantes"]]
+
+
+def test_encargado_solo_ve_su_restaurante(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    propio, otro = crear_restaurantes(2)
+    _ventas(db, [propio, otro])
+    encargado = cabeceras(crear_usuario("encargado", propio))
+
+    respuesta = cliente.get(f"/api/pronostico?{PARAMETROS}&restaurante_id={otro.id}", headers=encargado)
+
+    assert respuesta.status_code == 200
+    assert _restaurantes(respuesta) == [propio.id]
+    assert respuesta.get_json()["restaurantes"][0]["ventas_actuales"] == 1000.0
+
+
+def test_usuario_sin_restaurante_no_ve_pronostico(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    _ventas(db, crear_restaurantes(2))
+
+    respuesta = cliente.get(f"/api/pronostico?{PARAMETROS}", headers=cabeceras(crear_usuario("chef")))
+
+    assert respuesta.status_code == 403
+
+
+def test_admin_ve_todos_los_restaurantes(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    restaurantes = crear_restaurantes(2)
+    _ventas(db, restaurantes)
+
+    respuesta = cliente.get(f"/api/pronostico?{PARAMETROS}", headers=cabeceras(crear_usuario("admin")))
+
+    assert _restaurantes(respuesta) == [r.id for r in restaurantes]
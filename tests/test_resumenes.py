@@ -0,0 +1,142 @@
+"""
+Los resúmenes que se mantienen con cada alta, edición y borrado de ventas y
+gastos deben coincidir con los que sale de reconstruirlos desde cero.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from api.models import Venta, Gasto, Proveedor, ResumenDiario, ResumenMensual
+from api.resumenes import reconstruir_resumen_diario, reconstruir_resumen_mensual
+
+
+@pytest.fixture
+def datos(db, crear_restaurantes, crear_usuario):
+    uno, dos = crear_restaurantes(2)
+    usuario = crear_usuario("admin")
+    proveedores = [Proveedor(nombre="P1", categoria="alimentos", restaurante_id=uno.id),
+                   Proveedor(nombre="P2", categoria="bebidas", restaurante_id=uno.id)]
+    db.session.add_all(proveedores)
+    db.session.flush()
+    venta = Venta(fecha=date(2025, 3, 10), monto=100.25, turno="noche", restaurante_id=uno.id)
+    gasto = Gasto(fecha=date(2025, 3, 10), monto=40.10, categoria="alimentos",
+                  proveedor_id=proveedores[0].id, usuario_id=usuario.id, restaurante_id=uno.id)
+    db.session.add_all([
+        venta, gasto,
+        Venta(fecha=date(2025, 3, 10), monto=55, turno="comida", restaurante_id=uno.id),
+        Venta(fecha=date(2025, 3, 11), monto=70, turno="noche", restaurante_id=dos.id),
+        Gasto(fecha=date(2025, 3, 10), monto=9.99, categoria="alimentos",
+              proveedor_id=proveedores[0].id, usuario_id=usuario.id, restaurante_id=uno.id),
+    ])
+    db.session.commit()
+    return {"venta": venta, "gasto": gasto, "dos": dos, "proveedor": proveedores[1], "usuario": usuario}
+
+
+def _filas(db, modelo):
+    """Filas del resumen sin las que se han quedado a cero tras restar."""
+    columnas = [c for c in modelo.__table__.columns]
+    filas = db.session.execute(select(*columnas)).all()
+    return sorted(tuple(f) for f in filas if any(f._mapping[c.name] for c in columnas
+                                                  if c.name.startswith(("total", "num", "cantidad"))))
+
+
+def _comparar_con_reconstruccion(db, modelo, reconstruir):
+    mantenido = _filas(db, modelo)
+    reconstruir()
+    assert mantenido == _filas(db, modelo)
+
+
+def _sin_cambios(db, d):
+    pass
+
+
+def _nueva_venta(db, d):
+    db.session.add(Venta(fecha=date(2025, 3, 12), monto=12.5, turno="noche",
+                         restaurante_id=d["venta"].restaurante_id))
+
+
+def _cambiar_monto_venta(db, d):
+    d["venta"].monto = 80.01
+
+
+def _mover_venta_de_dia(db, d):
+    d["venta"].fecha = date(2025, 3, 20)
+
+
+def _mover_venta_de_mes(db, d):
+    d["venta"].fecha = date(2025, 4, 2)
+
+
+def _venta_a_otro_restaurante(db, d):
+    d["venta"].restaurante_id = d["dos"].id
+
+
+def _borrar_venta(db, d):
+    db.session.delete(d["venta"])
+
+
+def _cambiar_monto_gasto(db, d):
+    d["gasto"].monto = 1.01
+
+
+def _mover_gasto_de_mes(db, d):
+    d["gasto"].fecha = date(2025, 2, 28)
+
+
+def _gasto_a_otro_restaurante(db, d):
+    d["gasto"].restaurante_id = d["dos"].id
+
+
+def _cambiar_categoria_gasto(db, d):
+    d["gasto"].categoria = "limpieza"
+
+
+def _gasto_sin_categoria(db, d):
+    d["gasto"].categoria = None
+
+
+def _cambiar_proveedor_gasto(db, d):
+    d["gasto"].proveedor_id = d["proveedor"].id
+
+
+def _borrar_gasto(db, d):
+    db.session.delete(d["gasto"])
+
+
+def _varios_cambios(db, d):
+    d["venta"].monto = 300
+    d["venta"].fecha = date(2025, 5, 1)
+    d["gasto"].fecha = date(2025, 5, 1)
+    d["gasto"].categoria = "bebidas"
+    d["gasto"].proveedor_id = d["proveedor"].id
+
+
+CAMBIOS = [
+    _sin_cambios, _nueva_venta, _cambiar_monto_venta, _mover_venta_de_dia, _mover_venta_de_mes,
+    _venta_a_otro_restaurante, _borrar_venta, _cambiar_monto_gasto, _mover_gasto_de_mes,
+    _gasto_a_otro_restaurante, _cambiar_categoria_gasto, _gasto_sin_categoria, _cambiar_proveedor_gasto,
+    _borrar_gasto, _varios_cambios,
+]
+
+
+@pytest.mark.parametrize("cambiar", CAMBIOS, ids=lambda f: f.__name__.lstrip("_"))
+def test_resumen_diario_igual_a_reconstruirlo(db, datos, cambiar):
+    cambiar(db, datos)
+    db.session.commit()
+    _comparar_con_reconstruccion(db, ResumenDiario, reconstruir_resumen_diario)
+
+
+@pytest.mark.parametrize("cambiar", CAMBIOS, ids=lambda f: f.__name__.lstrip("_"))
+def test_resumen_mensual_igual_a_reconstruirlo(db, datos, cambiar):
+    cambiar(db, datos)
+    db.session.commit()
+    _comparar_con_reconstruccion(db, ResumenMensual, reconstruir_resumen_mensual)
+
+
+def test_ventas_en_resumen_mensual_sin_categoria_ni_proveedor(db, datos):
+    ventas = db.session.scalars(select(ResumenMensual).where(ResumenMensual.tipo == "venta")).all()
+    assert {(v.categoria, v.proveedor_id) for v in ventas} == {("", 0)}
+    gasto = db.session.get(ResumenMensual, ("gasto", datos["venta"].restaurante_id, 2025, 3, "alimentos",
+                                            datos["gasto"].proveedor_id))
+    assert (gasto.total_cent, gasto.cantidad) == (5009, 2)
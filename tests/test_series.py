@@ -0,0 +1,40 @@
+"""Series temporales (/api/series): alcance por rol."""
+from datetime import date
+
+from api.models import Venta
+
+PARAMETROS = "metrica=ventas&granularidad=mes&desde=2025-03-01&hasta=2025-03-31"
+
+
+def _ventas(db, restaurantes):
+    for monto, restaurante in enumerate(restaurantes, start=1):
+        db.session.add(Venta(fecha=date(2025, 3, 1), monto=100 * monto, turno="noche",
+                             restaurante_id=restaurante.id))
+    db.session.commit()
+
+
+def test_encargado_solo_ve_su_restaurante(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    propio, otro = crear_restaurantes(2)
+    _ventas(db, [propio, otro])
+    encargado = cabeceras(crear_usuario("encargado", propio))
+
+    respuesta = cliente.get(f"/api/series?{PARAMETROS}&restaurante_id={otro.id}", headers=encargado)
+
+    assert respuesta.status_code == 200
+    assert [s["valores"] for s in respuesta.get_json()["series"]] == [[100.0]]
+
+
+def test_usuario_sin_restaurante_no_ve_series(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    _ventas(db, crear_restaurantes(2))
+
+    respuesta = cliente.get(f"/api/series?{PARAMETROS}", headers=cabeceras(crear_usuario("chef")))
+
+    assert respuesta.status_code == 403
+
+
+def test_admin_ve_todos_los_restaurantes(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    _ventas(db, crear_restaurantes(2))
+
+    respuesta = cliente.get(f"/api/series?{PARAMETROS}", headers=cabeceras(crear_usuario("admin")))
+
+    assert [s["valores"] for s in respuesta.get_json()["series"]] == [[300.0]]
@@ -0,0 +1,53 @@
+"""
+Las operaciones destructivas de admin comprueban el rol en la base de datos,
+no solo en los claims del token.
+"""
+import pytest
+from werkzeug.security import generate_password_hash
+
+
+def _peticiones(restaurante, usuario):
+    return [
+        ("post", "/api/register", {"email": "nuevo@example.com", "password": "x", "rol": "admin", "nombre": "Nuevo"}),
+        ("delete", f"/api/usuarios/{usuario.id}", None),
+        ("delete", f"/api/restaurantes/{restaurante.id}", {"adminPassword": "secreta"}),
+    ]
+
+
+@pytest.mark.parametrize("indice", range(3), ids=["register", "eliminar_usuario", "eliminar_restaurante"])
+def test_admin_degradado_no_usa_su_token(db, cliente, crear_restaurantes, crear_usuario, cabeceras, indice):
+    restaurante, = crear_restaurantes(1)
+    otro = crear_usuario("chef", restaurante)
+    admin = crear_usuario("admin")
+    admin.password = generate_password_hash("secreta")
+    db.session.commit()
+    token = cabeceras(admin)
+
+    admin.rol = "chef"
+    db.session.commit()
+
+    metodo, ruta, cuerpo = _peticiones(restaurante, otro)[indice]
+    assert getattr(cliente, metodo)(ruta, json=cuerpo, headers=token).status_code == 403
+
+
+@pytest.mark.parametrize("indice", range(3), ids=["register", "eliminar_usuario", "eliminar_restaurante"])
+def test_admin_borrado_no_usa_su_token(db, cliente, crear_restaurantes, crear_usuario, cabeceras, indice):
+    restaurante, = crear_restaurantes(1)
+    otro = crear_usuario("chef", restaurante)
+    admin = crear_usuario("admin")
+    token = cabeceras(admin)
+
+    db.session.delete(admin)
+    db.session.commit()
+
+    metodo, ruta, cuerpo = _peticiones(restaurante, otro)[indice]
+    assert getattr(cliente, metodo)(ruta, json=cuerpo, headers=token).status_code == 403
+
+
+def test_admin_vigente_elimina_usuario(db, cliente, crear_restaurantes, crear_usuario, cabeceras):
+    restaurante, = crear_restaurantes(1)
+    otro = crear_usuario("chef", restaurante)
+
+    respuesta = cliente.delete(f"/api/usuarios/{otro.id}", headers=cabeceras(crear_usuario("admin")))
+
+    assert respuesta.status_code == 200
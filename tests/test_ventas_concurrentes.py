@@ -0,0 +1,62 @@
+"""
+Dos sesiones que guardan a la vez la misma venta (restaurante, fecha, turno):
+el índice único deja una sola fila y el modo decide su monto.
+"""
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from api.models import Venta, ResumenDiario
+from api.ventas import guardar_ventas
+
+FECHA = date(2025, 3, 1)
+# (estado de la segunda sesión, monto final en céntimos) con 100 € y luego 50 €
+ESPERADO = {
+    "rechazar": ("duplicada", 10000),
+    "reemplazar": ("reemplazada", 5000),
+    "acumular": ("acumulada", 15000),
+}
+
+
+@pytest.mark.parametrize("modo", list(ESPERADO))
+def test_misma_venta_desde_dos_sesiones(app, db, crear_restaurantes, modo):
+    restaurante_id = crear_restaurantes(1)[0].id
+    db.session.remove()
+    primera_guardada = threading.Event()
+    estados, errores = {}, []
+
+    def guardar(nombre, monto, antes=None, despues=None):
+        # Cada hilo tiene su propio contexto de aplicación y, por tanto, su sesión
+        with app.app_context():
+            try:
+                if antes:
+                    antes.wait(10)
+                estados[nombre] = guardar_ventas([{"restaurante_id": restaurante_id, "fecha": FECHA,
+                                                   "monto": monto, "turno": "noche"}], modo)[0]
+                if despues:
+                    despues.set()
+                    # La transacción sigue abierta mientras la segunda choca con la fila
+                    time.sleep(0.3)
+                db.session.commit()
+            except Exception as e:
+                errores.append(e)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+    hilos = [threading.Thread(target=guardar, args=("primera", 100), kwargs={"despues": primera_guardada}),
+             threading.Thread(target=guardar, args=("segunda", 50), kwargs={"antes": primera_guardada})]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(30)
+
+    assert errores == []
+    estado_segunda, monto = ESPERADO[modo]
+    assert estados == {"primera": "creada", "segunda": estado_segunda}
+    assert db.session.scalars(select(Venta.monto_cent)).all() == [monto]
+    resumen = db.session.get(ResumenDiario, (restaurante_id, FECHA))
+    assert (resumen.total_ventas_cent, resumen.num_ventas) == (monto, 1)